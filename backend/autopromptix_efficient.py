@@ -3,134 +3,575 @@ AutoPromptix Simple: 간단하고 안전한 프롬프트 최적화
 기본적인 변이와 점수 계산만 사용
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Dict
-from llm import ask_llm
-from scorer_simple import composite_score
+import math
+import time
+from dataclasses import dataclass, field, asdict
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional
+from config import settings
+from llm import LLMError, ask_llm, ask_llm_stream
+from metrics import judge_parses, stage_latency
+from usage import UsageTracker
+from prompt_templates import (
+    ANALYSIS_PREFIX,
+    FALLBACK_MUTATION_TEMPLATES,
+    MUTATION_TEMPLATES,
+    analysis_input,
+    evaluation_context,
+    judge_batch_input,
+    judge_input,
+    judge_prefix,
+)
+from scorer_simple import ScoringContext
 
 logger = logging.getLogger(__name__)
 
+JUDGE_MODES = ("single", "batch")
+
+def extract_json(text: str):
+    """LLM 응답에서 JSON 부분만 추출하여 파싱 (없으면 None)"""
+    if '{' in text and '}' in text:
+        start = text.find('{')
+        end = text.rfind('}') + 1
+        return json.loads(text[start:end])
+    return None
+
+def parse_judgment(evaluation_result: Dict) -> Dict:
+    """AI 평가 JSON을 0-1 점수, breakdown, reasoning으로 변환"""
+    score = float(evaluation_result.get('score', 50)) / 100.0  # 0-1 범위로 변환
+    return {
+        "score": max(0.0, min(1.0, score)),  # 0-1 범위 보장
+        "breakdown": evaluation_result.get('breakdown', {}),
+        "reasoning": evaluation_result.get('reasoning', '')
+    }
+
+@dataclass
+class TrialResult:
+    """변이 하나의 평가 기록 - 출력은 한 번만 생성되어 점수 계산과 결과 표시에 함께 사용됨"""
+    name: str
+    prompt: str
+    output: str
+    score: float
+    breakdown: Dict = field(default_factory=dict)
+    reasoning: str = ""
+    generation_latency: float = 0.0
+    judge_latency: float = 0.0
+    judged: bool = True  # False면 로컬 사전 필터에서 제외되어 로컬 점수만 가짐
+    error: Optional[str] = None  # 출력 생성 실패 시 오류 메시지 (점수 0, 평가하지 않음)
+
+    @classmethod
+    def failed(cls, name: str, prompt: str, error: Exception, generation_latency: float = 0.0) -> "TrialResult":
+        """출력 생성에 실패한 변이 - 오류 메시지를 출력으로 채점하지 않고 0점 처리"""
+        return cls(
+            name=name,
+            prompt=prompt,
+            output="",
+            score=0.0,
+            reasoning=f"출력 생성 실패로 평가하지 않음: {error}",
+            generation_latency=generation_latency,
+            judged=False,
+            error=str(error)
+        )
+
+    @property
+    def latency(self) -> float:
+        """출력 생성 + 평가에 걸린 시간 (초)"""
+        return self.generation_latency + self.judge_latency
+
+    def to_dict(self) -> Dict:
+        trial = asdict(self)
+        trial["generation_latency"] = round(self.generation_latency, 3)
+        trial["judge_latency"] = round(self.judge_latency, 3)
+        trial["latency"] = round(self.latency, 3)
+        return trial
+
+@dataclass
+class VariantRace:
+    """여러 테스트 입력에 대한 변이 하나의 평가 기록 (trials는 입력 순서대로 쌓임)"""
+    name: str
+    prompt: str
+    trials: List[TrialResult] = field(default_factory=list)
+    eliminated_round: Optional[int] = None  # 탈락한 라운드 (None이면 끝까지 생존)
+
+    @property
+    def scored_trials(self) -> List[TrialResult]:
+        """
+        순위에 반영할 기록 - AI 평가를 받았거나 생성에 실패한(0점) 입력
+
+        사전 필터에서 제외된 입력의 로컬 점수는 AI 평가 점수와 척도가 달라 섞지 않으며,
+        AI 평가를 받은 입력이 하나도 없을 때만 사용한다 (이런 변이는 레이스 순위에서 평가받은 변이보다 뒤).
+        """
+        scored = [trial for trial in self.trials if trial.judged or trial.error is not None]
+        return scored if any(trial.judged for trial in scored) else self.trials
+
+    @property
+    def score(self) -> float:
+        """평가한 입력들에 대한 평균 점수 (scored_trials 기준)"""
+        trials = self.scored_trials
+        return sum(trial.score for trial in trials) / len(trials) if trials else 0.0
+
+    @property
+    def judged(self) -> bool:
+        return any(trial.judged for trial in self.trials)
+
+    @property
+    def primary(self) -> TrialResult:
+        """대표 입력(첫 번째 입력)에 대한 평가 기록"""
+        return self.trials[0]
+
+    def to_dict(self) -> Dict:
+        race = self.primary.to_dict()
+        race["score"] = round(self.score, 3) if len(self.trials) > 1 else self.primary.score
+        race["input_scores"] = [round(trial.score, 3) for trial in self.trials]
+        race["inputs_evaluated"] = len(self.trials)
+        race["eliminated_round"] = self.eliminated_round
+        return race
+
+def race_schedule(total_inputs: int, initial_inputs: int = 1) -> List[int]:
+    """
+    연속 반감(successive halving) 라운드별 누적 입력 수
+
+    예: race_schedule(8, 1) -> [1, 2, 4, 8]
+    """
+    size = max(1, min(initial_inputs, total_inputs))
+    schedule = [size]
+    while size < total_inputs:
+        size = min(total_inputs, size * 2)
+        schedule.append(size)
+    return schedule
+
+def build_evaluation_set(user_input: str, test_inputs: Optional[List[str]] = None) -> List[str]:
+    """대표 입력 + 추가 테스트 입력 (빈 값/중복 제거, 순서 유지)"""
+    inputs = [user_input]
+    for test_input in test_inputs or []:
+        if test_input and test_input.strip() and test_input not in inputs:
+            inputs.append(test_input)
+    return inputs
+
 class SimpleOptimizer:
     """간단한 프롬프트 최적화 (빠른 버전)"""
     
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, judge_mode: Optional[str] = None, prefilter_top_k: Optional[int] = None, prefilter_margin: Optional[float] = None, race_initial_inputs: Optional[int] = None):
         self.max_generations = 1  # 2 → 1로 줄임
+        # 레이스에서 1위가 2위보다 이만큼 앞서면 남은 라운드를 건너뜀 (should_continue)
         self.improvement_threshold = 0.05
+        # 동시에 평가할 변이 수 상한
+        self.max_concurrency = max(1, max_concurrency or settings.optimizer_max_concurrency)
+        # 평가 방식: single(변이별 평가 요청) / batch(모든 변이를 한 번에 평가)
+        self.judge_mode = judge_mode or settings.optimizer_judge_mode
+        if self.judge_mode not in JUDGE_MODES:
+            raise ValueError(f"Unknown judge mode: {self.judge_mode}")
+        # 로컬 점수 사전 필터: 상위 k개만 AI 평가 (0이면 사용 안 함)
+        self.prefilter_top_k = settings.optimizer_prefilter_top_k if prefilter_top_k is None else prefilter_top_k
+        self.prefilter_margin = settings.optimizer_prefilter_margin if prefilter_margin is None else prefilter_margin
+        # 다중 입력 레이스: 첫 라운드에서 모든 변이를 평가할 입력 수 (라운드마다 두 배)
+        self.race_initial_inputs = max(1, race_initial_inputs or settings.optimizer_race_initial_inputs)
+        self._scoring_contexts: Dict[tuple, ScoringContext] = {}
+        # 이번 실행의 단계별 누적 소요 시간 (final_results의 timings)
+        self.timings: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        # 이번 실행의 토큰 사용량 (단계별)
+        self.usage = UsageTracker()
+    
+    def record_stage(self, stage: str, seconds: float):
+        """단계 소요 시간을 /metrics 히스토그램과 이번 실행의 누적 시간에 기록"""
+        stage_latency.observe(seconds, stage=stage)
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def stage_timings(self) -> Dict[str, float]:
+        """단계별 소요 시간(초)과 전체 경과 시간 - generation/judge는 동시에 실행된 호출들의 합계"""
+        return {
+            **{stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+            "total": round(time.perf_counter() - self.started, 3),
+        }
+
+    def get_scoring_context(self, expected_output: str, keywords: List[str], exclude_keywords: List[str]) -> ScoringContext:
+        """기대 결과/키워드/금지어 조합별 로컬 채점 컨텍스트 (최적화 실행 동안 한 번만 생성)"""
+        key = (expected_output, tuple(keywords), tuple(exclude_keywords))
+        if key not in self._scoring_contexts:
+            self._scoring_contexts[key] = ScoringContext(expected_output, keywords, exclude_keywords)
+        return self._scoring_contexts[key]
     
-    async def evaluate_prompt(self, prompt: str, user_input: str, expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = [], evaluation_weights: Dict = {}) -> float:
-        """AI 기반 프롬프트 평가 (0-100점)"""
+    async def generate_output(self, prompt: str, user_input: str, on_delta: Optional[Callable[[str], Awaitable[None]]] = None) -> tuple:
+        """
+        변이 프롬프트로 출력 생성 (출력, 소요 시간)
+
+        on_delta가 주어지면 스트리밍으로 생성하고 토큰 조각이 도착할 때마다 호출한다.
+        샘플링 결과가 매번 달라야 하므로 응답 캐시를 사용하지 않는다.
+
+        Raises:
+            LLMError: 재시도 후에도 생성에 실패한 경우 (오류 메시지가 출력으로 채점되지 않도록)
+        """
+        started = time.perf_counter()
         try:
-            output = await ask_llm(prompt, user_input)
-            
-            # 가중치 설정 (비율 기반)
-            raw_weights = {
-                'exclude_keywords': evaluation_weights.get('exclude_keywords', 25),
-                'product_name': evaluation_weights.get('product_name', 25), 
-                'expected_output': evaluation_weights.get('expected_output', 25),
-                'custom_requirements': evaluation_weights.get('custom_requirements', 25)
-            }
-            
-            # 총합을 구해서 비율로 변환 (0-100점 기준)
-            total_weight = sum(raw_weights.values())
-            if total_weight > 0:
-                weights = {key: (value / total_weight) * 100 for key, value in raw_weights.items()}
+            if on_delta is None:
+                output = await ask_llm(prompt, user_input, raise_errors=True, use_cache=False, call_site="generation", usage=self.usage)
             else:
-                weights = {key: 25 for key in raw_weights.keys()}  # 기본값
-            
+                chunks = []
+                async for delta in ask_llm_stream(prompt, user_input, raise_errors=True, use_cache=False, call_site="generation", usage=self.usage):
+                    chunks.append(delta)
+                    await on_delta(delta)
+                output = "".join(chunks).strip()
+        finally:
+            latency = time.perf_counter() - started
+            self.record_stage("generation", latency)
+        return output, latency
+
+    def build_weights(self, evaluation_weights: Dict = {}) -> Dict[str, float]:
+        """평가 기준별 가중치를 0-100점 기준 비율로 변환"""
+        # 가중치 설정 (비율 기반)
+        raw_weights = {
+            'exclude_keywords': evaluation_weights.get('exclude_keywords', 25),
+            'product_name': evaluation_weights.get('product_name', 25), 
+            'expected_output': evaluation_weights.get('expected_output', 25),
+            'custom_requirements': evaluation_weights.get('custom_requirements', 25)
+        }
+        
+        # 총합을 구해서 비율로 변환 (0-100점 기준)
+        total_weight = sum(raw_weights.values())
+        if total_weight > 0:
+            return {key: (value / total_weight) * 100 for key, value in raw_weights.items()}
+        return {key: 25 for key in raw_weights.keys()}  # 기본값
+
+    def fallback_judgment(self, output: str, expected_output: str, keywords: List[str], exclude_keywords: List[str]) -> Dict:
+        """AI 평가 파싱 실패시 로컬 점수로 대체"""
+        final_score = self.get_scoring_context(expected_output, keywords, exclude_keywords).final_score(output)
+        
+        logger.info(f"Fallback score: {final_score}")
+        return {"score": final_score, "breakdown": {}, "reasoning": "AI 평가 파싱 실패로 기본 평가 사용"}
+
+    async def judge_output(self, output: str, expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = [], evaluation_weights: Dict = {}) -> Dict:
+        """생성된 출력에 대한 AI 평가 (0-100점 → 0-1 점수, breakdown, reasoning)"""
+        try:
+            weights = self.build_weights(evaluation_weights)
             logger.info(f"Evaluation weights: {weights}")
             
-            # AI 평가 프롬프트 생성
-            evaluation_prompt = f"""
-다음 응답을 4가지 기준으로 평가하여 0-100점 사이의 점수를 매겨라:
-
-**평가 대상 응답:**
-{output}
-
-**평가 기준 (가중치 적용):**
-
-1. **제외 키워드 준수 ({weights['exclude_keywords']}점)**: 다음 단어들이 포함되지 않았는가?
-   제외 키워드: {', '.join(exclude_keywords) if exclude_keywords else '없음'}
-   - 제외 키워드가 하나도 없으면 {weights['exclude_keywords']}점
-   - 제외 키워드가 1개 있으면 {weights['exclude_keywords'] * 0.6:.0f}점
-   - 제외 키워드가 2개 이상 있으면 0점
-
-2. **제품/서비스 이름 포함 ({weights['product_name']}점)**: 다음 이름이 적절히 포함되었는가?
-   필수 포함: {', '.join(keywords) if keywords else '없음'}
-   - 자연스럽게 여러 번 포함되면 {weights['product_name']}점
-   - 1-2번 포함되면 {weights['product_name'] * 0.6:.0f}점
-   - 포함되지 않으면 0점
-
-3. **기대 결과 달성 ({weights['expected_output']}점)**: 다음 기대 결과를 얼마나 잘 충족했는가?
-   기대 결과: {expected_output}
-   - 완벽히 충족하면 {weights['expected_output']}점
-   - 대부분 충족하면 {weights['expected_output'] * 0.8:.0f}점
-   - 부분적으로 충족하면 {weights['expected_output'] * 0.4:.0f}점
-   - 충족하지 못하면 0점
-
-4. **추가 요구사항 반영 ({weights['custom_requirements']}점)**: 다음 요구사항이 얼마나 잘 반영되었는가?
-   추가 요구사항: {', '.join(custom_mutators) if custom_mutators else '없음'}
-   - 모든 요구사항 반영하면 {weights['custom_requirements']}점
-   - 대부분 반영하면 {weights['custom_requirements'] * 0.8:.0f}점
-   - 일부만 반영하면 {weights['custom_requirements'] * 0.4:.0f}점
-   - 반영되지 않으면 0점
-
-**총점 계산:**
-각 기준별 점수를 합산하여 최종 점수 산출 (최대 100점)
-
-**응답 형식:**
-{{"score": 점수(0-100), "breakdown": {{"exclude_keywords": 점수1, "product_name": 점수2, "expected_output": 점수3, "custom_requirements": 점수4}}, "reasoning": "각 기준별 평가 이유와 점수 산정 근거"}}
-
-점수를 정확히 계산하여 JSON 형태로 응답해라.
-"""
+            # 고정 지시문(가중치별 캐시)은 system, 평가 정보와 평가 대상 응답은 user 메시지로 전달
+            evaluation_prefix = judge_prefix(weights)
+            evaluation_input = judge_input(evaluation_context(expected_output, keywords, exclude_keywords, custom_mutators), output)
             
             # AI 평가 실행
-            evaluation_response = await ask_llm(evaluation_prompt, "평가 요청")
+            started = time.perf_counter()
+            evaluation_response = await ask_llm(evaluation_prefix, evaluation_input, call_site="judge", usage=self.usage)
+            self.record_stage("judge", time.perf_counter() - started)
             logger.info(f"AI evaluation response: {evaluation_response}")
             
             # JSON 파싱 시도
             try:
-                import json
-                # 응답에서 JSON 부분만 추출
-                if '{' in evaluation_response and '}' in evaluation_response:
-                    start = evaluation_response.find('{')
-                    end = evaluation_response.rfind('}') + 1
-                    json_str = evaluation_response[start:end]
-                    evaluation_result = json.loads(json_str)
-                    
-                    score = evaluation_result.get('score', 50) / 100.0  # 0-1 범위로 변환
-                    breakdown = evaluation_result.get('breakdown', {})
-                    reasoning = evaluation_result.get('reasoning', '')
+                evaluation_result = extract_json(evaluation_response)
+                if isinstance(evaluation_result, dict):
+                    judgment = parse_judgment(evaluation_result)
                     
-                    logger.info(f"AI Evaluation - Score: {score*100:.1f}/100")
-                    logger.info(f"Breakdown: {breakdown}")
-                    logger.info(f"Reasoning: {reasoning}")
+                    logger.info(f"AI Evaluation - Score: {judgment['score']*100:.1f}/100")
+                    logger.info(f"Breakdown: {judgment['breakdown']}")
+                    logger.info(f"Reasoning: {judgment['reasoning']}")
+                    judge_parses.inc(mode="single", result="ok")
                     
                     # AI 평가 결과를 그대로 사용 (기존 점수 보정 제거)
-                    return max(0.0, min(1.0, score))  # 0-1 범위 보장
+                    return judgment
                     
             except Exception as parse_error:
                 logger.error(f"Failed to parse AI evaluation: {parse_error}")
                 
             # 파싱 실패시 기본 평가로 폴백
             logger.info("Falling back to basic evaluation")
-            base_score = composite_score(output, expected_output, keywords)
-            from scorer_simple import final_score_with_forbidden_check
-            final_score = final_score_with_forbidden_check(base_score, output, exclude_keywords)
-            
-            logger.info(f"Fallback score: {final_score}")
-            return final_score
+            judge_parses.inc(mode="single", result="failed")
+            return self.fallback_judgment(output, expected_output, keywords, exclude_keywords)
             
         except Exception as e:
             logger.error(f"Evaluation failed: {e}")
-            return 0.5  # 기본 점수
+            return {"score": 0.5, "breakdown": {}, "reasoning": ""}  # 기본 점수
+
+    async def judge_outputs_batch(self, outputs: List[str], expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = [], evaluation_weights: Dict = {}) -> List[Dict]:
+        """여러 출력을 한 번의 AI 평가 요청으로 채점 (응답별로 파싱 실패시 기본 평가로 폴백)"""
+        if not outputs:
+            return []
+        
+        weights = self.build_weights(evaluation_weights)
+        evaluation_prefix = judge_prefix(weights, batch=True)
+        evaluation_input = judge_batch_input(evaluation_context(expected_output, keywords, exclude_keywords, custom_mutators), outputs)
+        
+        parsed: Dict[int, Dict] = {}
+        try:
+            # 응답 수에 비례하여 출력 토큰 여유를 둠
+            started = time.perf_counter()
+            evaluation_response = await ask_llm(evaluation_prefix, evaluation_input, max_tokens=min(4000, 300 * len(outputs) + 200), call_site="judge_batch", usage=self.usage)
+            self.record_stage("judge", time.perf_counter() - started)
+            logger.info(f"AI batch evaluation response: {evaluation_response}")
+            
+            evaluation_result = extract_json(evaluation_response)
+            results = evaluation_result.get("results", []) if isinstance(evaluation_result, dict) else []
+            for position, item in enumerate(results, start=1):
+                try:
+                    parsed[int(item.get("id", position))] = parse_judgment(item)
+                except Exception as parse_error:
+                    logger.error(f"Failed to parse batch evaluation item {position}: {parse_error}")
+        except Exception as e:
+            logger.error(f"Batch evaluation failed: {e}")
+        
+        judgments = []
+        for i, output in enumerate(outputs, start=1):
+            judge_parses.inc(mode="batch", result="ok" if i in parsed else "failed")
+            if i in parsed:
+                judgments.append(parsed[i])
+            else:
+                logger.info(f"Falling back to basic evaluation for candidate {i}")
+                judgments.append(self.fallback_judgment(output, expected_output, keywords, exclude_keywords))
+        return judgments
+
+    async def evaluate_prompt(self, prompt: str, user_input: str, expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = [], evaluation_weights: Dict = {}, name: str = "") -> TrialResult:
+        """프롬프트 평가: 출력을 한 번만 생성하고 평가하여 TrialResult로 반환"""
+        started = time.perf_counter()
+        try:
+            output, generation_latency = await self.generate_output(prompt, user_input)
+        except LLMError as e:
+            logger.warning(f"Generation failed for variation {name}: {e}")
+            return TrialResult.failed(name, prompt, e, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        judgment = await self.judge_output(output, expected_output, keywords, exclude_keywords, custom_mutators, evaluation_weights)
+
+        return TrialResult(
+            name=name,
+            prompt=prompt,
+            output=output,
+            generation_latency=generation_latency,
+            judge_latency=time.perf_counter() - started,
+            **judgment
+        )
     
-    def should_continue(self, current_score: float, best_score: float, generation: int) -> bool:
-        """최적화 계속 여부"""
-        if generation >= self.max_generations:
+
+    @property
+    def judges_after_generation(self) -> bool:
+        """모든 출력이 생성된 뒤에 평가해야 하는지 (배치 평가 또는 사전 필터 사용 시)"""
+        return self.judge_mode == "batch" or self.prefilter_top_k > 0
+
+    def prefilter_outputs(self, names: List[str], outputs: List[str], expected_output: str, keywords: List[str], exclude_keywords: List[str]) -> tuple:
+        """
+        로컬 점수로 AI 평가 대상을 추림
+
+        Returns:
+            (AI 평가 대상 인덱스 목록, 인덱스별 로컬 점수)
+        """
+        context = self.get_scoring_context(expected_output, keywords, exclude_keywords)
+        found_sets = [context.scan(output) for output in outputs]
+        local_scores = dict(enumerate(context.final_score_batch(outputs, found_sets).tolist()))
+        forbidden_penalties = context.forbidden_penalty_batch(outputs, found_sets)
+        leader = max(local_scores.values())
+
+        # 금지어가 포함되었거나 선두와 격차가 큰 변이 제외
+        candidates = [
+            i for i in range(len(outputs))
+            if forbidden_penalties[i] >= 1.0
+            and local_scores[i] >= leader - self.prefilter_margin
+        ]
+        candidates.sort(key=lambda i: local_scores[i], reverse=True)
+        survivors = set(candidates[:self.prefilter_top_k])
+
+        # 개선 폭 계산 기준이 되는 base는 항상 AI 평가
+        if "base" in names:
+            survivors.add(names.index("base"))
+
+        logger.info(f"Prefilter: {len(survivors)}/{len(outputs)} variations sent to judge (local scores: {local_scores})")
+        return sorted(survivors), local_scores
+
+    async def judge_generated(self, generated: List[tuple], expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = [], evaluation_weights: Dict = {}) -> List[TrialResult]:
+        """
+        생성이 끝난 변이들을 평가하여 TrialResult 목록 반환 (입력 순서 유지)
+
+        Args:
+            generated: (name, prompt, output, generation_latency) 튜플 목록
+        """
+        names = [name for name, _, _, _ in generated]
+        outputs = [output for _, _, output, _ in generated]
+
+        survivors = list(range(len(generated)))
+        local_scores: Dict[int, float] = {}
+        if self.prefilter_top_k > 0 and generated:
+            survivors, local_scores = self.prefilter_outputs(names, outputs, expected_output, keywords, exclude_keywords)
+
+        started = time.perf_counter()
+        if self.judge_mode == "batch":
+            judgments = await self.judge_outputs_batch(
+                [outputs[i] for i in survivors], expected_output, keywords, exclude_keywords, custom_mutators, evaluation_weights
+            )
+        else:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def judge(output: str) -> Dict:
+                async with semaphore:
+                    return await self.judge_output(output, expected_output, keywords, exclude_keywords, custom_mutators, evaluation_weights)
+
+            judgments = await asyncio.gather(*(judge(outputs[i]) for i in survivors))
+        judge_latency = time.perf_counter() - started
+        judged = dict(zip(survivors, judgments))
+
+        trials = []
+        for i, (name, prompt, output, generation_latency) in enumerate(generated):
+            if i in judged:
+                trials.append(TrialResult(
+                    name=name,
+                    prompt=prompt,
+                    output=output,
+                    generation_latency=generation_latency,
+                    judge_latency=judge_latency,
+                    **judged[i]
+                ))
+            else:
+                trials.append(TrialResult(
+                    name=name,
+                    prompt=prompt,
+                    output=output,
+                    score=local_scores[i],
+                    reasoning="로컬 사전 필터에서 제외되어 AI 평가를 건너뜀",
+                    generation_latency=generation_latency,
+                    judged=False
+                ))
+        return trials
+
+    async def evaluate_variations(self, variations: List[tuple], user_input: str, expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = [], evaluation_weights: Dict = {}, semaphore: Optional[asyncio.Semaphore] = None) -> List[TrialResult]:
+        """변이들을 동시에 평가 (결과 순서는 변이 순서 유지, semaphore를 넘기면 여러 호출이 동시성 한도를 공유)"""
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+
+        if self.judges_after_generation:
+            async def generate_variation(name: str, prompt: str):
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        output, generation_latency = await self.generate_output(prompt, user_input)
+                    except LLMError as e:
+                        logger.warning(f"Generation failed for variation {name}: {e}")
+                        return TrialResult.failed(name, prompt, e, time.perf_counter() - started)
+                return name, prompt, output, generation_latency
+
+            # 출력은 동시에 생성하고, 평가는 사전 필터/배치 평가를 거쳐 처리 (생성 실패한 변이는 평가에서 제외)
+            results = await asyncio.gather(
+                *(generate_variation(name, prompt) for name, prompt in variations)
+            )
+            generated = [result for result in results if isinstance(result, tuple)]
+            judged = iter(
+                await self.judge_generated(generated, expected_output, keywords, exclude_keywords, custom_mutators, evaluation_weights)
+                if generated else []
+            )
+            return [result if isinstance(result, TrialResult) else next(judged) for result in results]
+
+        async def evaluate_variation(name: str, prompt: str) -> TrialResult:
+            async with semaphore:
+                return await self.evaluate_prompt(prompt, user_input, expected_output, keywords, exclude_keywords, custom_mutators, evaluation_weights, name=name)
+
+        return await asyncio.gather(
+            *(evaluate_variation(name, prompt) for name, prompt in variations)
+        )
+
+    def should_continue(self, current_score: float, best_score: float, generation: int, max_generations: Optional[int] = None) -> bool:
+        """
+        다음 라운드 진행 여부
+
+        선두 점수가 0.85를 넘으면 종료하는 기존 규칙에, 레이스용 격차 규칙을 더했다.
+        두 규칙 모두 두 라운드 이상 지난 뒤에만 적용한다 (첫 라운드 점수는 적은 입력에서 나온 값이라 잡음이 큼).
+        레이스에서 호출되므로 current_score는 직전 세대의 점수가 아니라 2위 변이의 점수다.
+
+        Args:
+            current_score: 추격 중인 변이(2위)의 점수
+            best_score: 선두 변이의 점수
+            generation: 완료한 라운드 수
+            max_generations: 최대 라운드 수 (기본값: self.max_generations)
+        """
+        if generation >= (max_generations or self.max_generations):
             return False
+        # 한 라운드의 점수/격차는 단일 샘플의 잡음일 수 있으므로 두 라운드 이상 지난 뒤에만 조기 종료
+        if generation < 2:
+            return True
         if best_score > 0.85:  # 0.8 → 0.85로 높임 (더 빠른 종료)
             return False
+        # 선두가 improvement_threshold 이상 앞서면 승자가 분명하므로 종료
+        if best_score - current_score >= self.improvement_threshold:
+            return False
         return True
+
+    async def race_variations(
+        self,
+        variations: List[tuple],
+        inputs: List[str],
+        expected_output: str,
+        keywords: List[str],
+        exclude_keywords: List[str],
+        custom_mutators: List[str] = [],
+        evaluation_weights: Dict = {},
+        races: Optional[Dict[str, VariantRace]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        연속 반감 레이스 - 모든 변이를 적은 입력으로 평가한 뒤 하위 절반을 탈락시키고,
+        남은 변이만 더 많은 입력으로 평가한다 (라운드마다 입력 수 두 배).
+
+        변이 x 입력 전체를 평가하는 것보다 훨씬 적은 LLM 호출로 단일 샘플의 잡음에 덜 민감한 승자를 고른다.
+        개선 폭 계산 기준인 base는 사전 필터와 마찬가지로 탈락시키지 않는다.
+
+        Args:
+            variations: (name, prompt) 목록
+            inputs: 평가 입력 목록 (첫 번째가 대표 입력)
+            races: 이미 일부 입력을 평가한 기록 (스트리밍에서 대표 입력 결과를 재사용), 결과도 여기에 누적됨
+
+        Yields:
+            라운드 요약 {"round", "inputs", "survivors", "eliminated", "scores", "finished"}
+        """
+        races = races if races is not None else {}
+        for name, prompt in variations:
+            races.setdefault(name, VariantRace(name=name, prompt=prompt))
+        survivors = [name for name, _ in variations]
+        schedule = race_schedule(len(inputs), self.race_initial_inputs)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        for round_index, size in enumerate(schedule):
+            # 생존 변이를 아직 평가하지 않은 입력에 대해 평가 (입력 간에도 동시성 한도 공유)
+            pending = {
+                input_index: [(name, races[name].prompt) for name in survivors if len(races[name].trials) <= input_index]
+                for input_index in range(size)
+            }
+            pending = {input_index: batch for input_index, batch in pending.items() if batch}
+            results = await asyncio.gather(*(
+                self.evaluate_variations(batch, inputs[input_index], expected_output, keywords, exclude_keywords, custom_mutators, evaluation_weights, semaphore=semaphore)
+                for input_index, batch in pending.items()
+            ))
+            for trials in results:
+                for trial in trials:
+                    races[trial.name].trials.append(trial)
+
+            # AI 평가를 하나도 받지 못한 변이는 로컬 점수만 있어 척도가 다르므로 평가받은 변이보다 뒤에 둔다
+            ranked = sorted(survivors, key=lambda name: (races[name].judged, races[name].score), reverse=True)
+            contenders = [name for name in ranked if races[name].judged] or ranked
+            leader_score = races[contenders[0]].score
+            runner_up_score = races[contenders[1]].score if len(contenders) > 1 else 0.0
+            finished = len(ranked) <= 1 or not self.should_continue(runner_up_score, leader_score, round_index + 1, len(schedule))
+
+            eliminated = []
+            if not finished:
+                keep = set(ranked[:math.ceil(len(ranked) / 2)])
+                if "base" in races and "base" in survivors:
+                    keep.add("base")
+                eliminated = [name for name in survivors if name not in keep]
+                for name in eliminated:
+                    races[name].eliminated_round = round_index
+                survivors = [name for name in survivors if name in keep]
+
+            logger.info(f"Race round {round_index} | inputs={size} | survivors={survivors} | eliminated={eliminated}")
+            yield {
+                "round": round_index,
+                "inputs": size,
+                "survivors": list(survivors),
+                "eliminated": eliminated,
+                "scores": {name: round(races[name].score, 3) for name in ranked},
+                "finished": finished,
+            }
+            if finished:
+                return
+
+    def select_race_winner(self, races: Dict[str, VariantRace]) -> VariantRace:
+        """끝까지 생존한 변이 중 평균 점수가 가장 높은 변이 (AI 평가를 받은 변이 우선)"""
+        finalists = [race for race in races.values() if race.trials and race.eliminated_round is None]
+        return max([race for race in finalists if race.judged] or finalists, key=lambda race: race.score)
     
     async def optimize_prompt_simple(
         self,
@@ -138,9 +579,14 @@ class SimpleOptimizer:
         expected_output: str,
         product_name: str,
         exclude_keywords: List[str],
-        custom_mutators: List[str] = []
+        custom_mutators: List[str] = [],
+        test_inputs: Optional[List[str]] = None
     ) -> Dict:
-        """간단한 프롬프트 최적화"""
+        """
+        간단한 프롬프트 최적화
+
+        test_inputs가 주어지면 user_input과 함께 평가 세트로 사용하여 연속 반감 레이스로 승자를 고른다.
+        """
         logger.info(f"Starting simple optimization for: {user_input}")
         
         # 기본 프롬프트
@@ -165,30 +611,29 @@ class SimpleOptimizer:
         base_mutations = await self.generate_smart_mutations(base_prompt, user_input, analysis, custom_mutators)
         logger.info(f"생성된 변이: {[name for name, _ in base_mutations]}")
         
-        # 1세대: 스마트 변이들
+        # 1세대: 스마트 변이들 (테스트 입력이 여러 개면 라운드별로 하위 절반 탈락)
         logger.info("=== Generation 0 (Smart Mutations) ===")
-        gen0_results = {}
-        for name, prompt in base_mutations:
-            score = await self.evaluate_prompt(prompt, user_input, expected_output, keywords, exclude_keywords_filtered, custom_mutators)
-            gen0_results[name] = score
-            logger.info(f"Gen 0 | {name} | score={score}")
+        inputs = build_evaluation_set(user_input, test_inputs)
+        races: Dict[str, VariantRace] = {}
+        rounds = 0
+        async for race_round in self.race_variations(base_mutations, inputs, expected_output, keywords, exclude_keywords_filtered, custom_mutators, races=races):
+            rounds += 1
+        for race in races.values():
+            logger.info(f"Gen 0 | {race.name} | score={race.score} | inputs={len(race.trials)}")
+        gen0_results = {name: race.score for name, race in races.items()}
         
-        # 최고 점수 선택
-        best_gen0 = max(gen0_results.items(), key=lambda x: x[1])
-        current_best_score = best_gen0[1]
-        best_prompt = base_mutations[0][1]  # 기본값
+        # 최고 점수 선택 (사전 필터에서 제외된 변이, 레이스에서 탈락한 변이는 후보에서 제외)
+        final_started = time.perf_counter()
+        best_race = self.select_race_winner(races)
+        best_trial = best_race.primary
+        current_best_score = best_race.score
+        best_prompt = best_race.prompt
         
-        # 최고 점수에 해당하는 프롬프트 찾기
-        for name, prompt in base_mutations:
-            if name == best_gen0[0]:
-                best_prompt = prompt
-                break
-        
-        logger.info(f"Adopt => {best_gen0[0]} ({current_best_score})")
+        logger.info(f"Adopt => {best_race.name} ({current_best_score})")
         
         # 2세대 제거 - 속도 향상을 위해
         generation = 1
-        total_evaluations = len(gen0_results)
+        total_evaluations = sum(len(race.trials) for race in races.values())
         
         # 2세대 최적화 제거 (속도 향상)
         logger.info("2세대 최적화 건너뛰기 (속도 향상)")
@@ -199,56 +644,38 @@ class SimpleOptimizer:
         logger.info(f"Final: {initial_score} -> {current_best_score} (+{improvement:.3f})")
         logger.info(f"Total evaluations: {total_evaluations}, Generations: {generation}")
         
-        # 최종 출력 생성
+        # 평가에 사용된 출력을 그대로 재사용 (추가 LLM 호출 없음)
+        self.record_stage("final_output", time.perf_counter() - final_started)
         return {
             "best_prompt": best_prompt,
-            "best_output": await ask_llm(best_prompt, user_input), # 최종 프롬프트로 LLM 호출
+            "best_output": best_trial.output,
             "best_score": round(current_best_score, 3),
-            "all_trials": [
-                {"name": name, "prompt": prompt_tuple[1], "score": score, "output": await ask_llm(prompt_tuple[1], user_input)}
-                for name, score in gen0_results.items()
-                for prompt_tuple in base_mutations if prompt_tuple[0] == name
-            ],
+            "all_trials": [race.to_dict() for race in races.values()],
             "total_evaluations": total_evaluations,
             "generations_completed": generation,
             "best_variant": "fast_optimization",
             "improvement_achieved": improvement > 0,
             "score_improvement": round(improvement, 3),
+            "evaluation_inputs": len(inputs),
+            "race_rounds": rounds,
+            "timings": self.stage_timings(),
+            "usage": self.usage.to_dict(),
         }
 
     async def analyze_user_input(self, user_input: str) -> Dict[str, str]:
         """사용자 입력을 분석하여 적합한 변이 전략 결정"""
         try:
-            analysis_prompt = f"""
-            다음 사용자 요청을 분석하여 가장 적합한 프롬프트 개선 방향을 제시해라:
-            
-            사용자 요청: {user_input}
-            
-            다음 중 가장 적합한 방향을 선택하고 구체적인 지시사항을 작성해라:
-            1. 구조화 (문서, 계획서, 보고서 등)
-            2. 전문성 (전문 용어, 데이터, 분석 등)
-            3. 구체성 (수치, 예시, 단계별 설명 등)
-            4. 설득력 (투자자, 고객 대상 등)
-            5. 실행성 (실행 가능한 액션 플랜 등)
-            
-            선택한 방향과 구체적 지시사항을 JSON 형태로 응답해라:
-            {{"direction": "선택한 방향", "instructions": "구체적 지시사항"}}
-            """
+            started = time.perf_counter()
+            response = await ask_llm(ANALYSIS_PREFIX, analysis_input(user_input), call_site="analyze_user_input", usage=self.usage)
+            self.record_stage("analyze_user_input", time.perf_counter() - started)
             
-            response = await ask_llm(analysis_prompt, "분석 요청")
-            
-            # JSON 파싱 시도
+            # 응답에서 JSON 부분만 추출하여 파싱
             try:
-                import json
-                # 응답에서 JSON 부분만 추출
-                if '{' in response and '}' in response:
-                    start = response.find('{')
-                    end = response.rfind('}') + 1
-                    json_str = response[start:end]
-                    result = json.loads(json_str)
-                    return result
-            except:
-                pass
+                result = extract_json(response)
+            except ValueError:
+                result = None
+            if isinstance(result, dict):
+                return result
             
             # 파싱 실패시 기본값
             return {"direction": "구체성", "instructions": "구체적인 수치와 예시를 포함하여 작성"}
@@ -259,6 +686,7 @@ class SimpleOptimizer:
 
     async def generate_smart_mutations(self, base_prompt: str, user_input: str, analysis: Dict[str, str], custom_mutators: List[str] = [], exclude_keywords: List[str] = [], product_name: str = "") -> List[tuple]:
         """사용자 입력 분석 결과를 바탕으로 스마트한 변이 생성"""
+        started = time.perf_counter()
         
         direction = analysis.get("direction", "구체성")
         instructions = analysis.get("instructions", "구체적인 내용을 포함하여 작성")
@@ -283,35 +711,40 @@ class SimpleOptimizer:
         # 사용자 정의 변이 추가 (우선순위 높음) - 기본 변이와 동일하게 모든 요구사항 포함
         mutations.append(("custom", base_prompt + f"\n\n강화된 사용자 맞춤 접근법 적용"))
         
-        # 방향에 따른 맞춤형 변이 (모든 요구사항 포함)
-        if "구조화" in direction or "문서" in direction or "계획서" in direction:
-            mutations.append(("structure", base_prompt + f"\n\n답변은 반드시 다음 구조로 작성해라:\n{instructions}"))
-        
-        elif "전문성" in direction or "전문" in direction or "분석" in direction:
-            mutations.append(("professional", base_prompt + f"\n\n답변은 반드시 다음 요구사항을 만족해라:\n{instructions}"))
-        
-        elif "구체성" in direction or "구체" in direction or "수치" in direction:
-            mutations.append(("specific", base_prompt + f"\n\n답변은 반드시 다음 요소를 포함해라:\n{instructions}"))
-        
-        elif "설득력" in direction or "투자자" in direction or "고객" in direction:
-            mutations.append(("persuasive", base_prompt + f"\n\n답변은 반드시 다음 관점에서 작성해라:\n{instructions}"))
-        
-        elif "실행성" in direction or "실행" in direction or "액션" in direction:
-            mutations.append(("actionable", base_prompt + f"\n\n답변은 반드시 다음 형태로 제시해라:\n{instructions}"))
+        # 방향에 따른 맞춤형 변이 (모든 요구사항 포함) - 공유되는 기본 프롬프트 뒤에 변이별 지시문을 붙임
+        for markers, name, template in MUTATION_TEMPLATES:
+            if any(marker in direction for marker in markers):
+                mutations.append((name, base_prompt + template.format(instructions=instructions)))
+                break
         
         # 기본 변이도 추가 (안전장치)
         if len(mutations) == 1:  # base만 있는 경우
-            mutations.extend([
-                ("tone", base_prompt + f"\n\n답변은 반드시 다음 형식으로 작성해라:\n1. 전문적이고 설득력 있는 어조 사용\n2. 구체적인 수치와 데이터 포함\n3. 투자자/고객이 원하는 핵심 정보 우선 배치\n4. 각 섹션마다 명확한 제목과 요약 포함{exclude_text}"),
-                ("format", base_prompt + f"\n\n답변은 반드시 다음 구조로 작성해라:\n- 제목: [명확한 제목]\n- 요약: [핵심 내용 2-3줄]\n- 상세 내용: [번호와 불릿으로 구체적 단계 제시]\n- 결론: [실행 가능한 다음 단계 제시]\n- 부록: [참고 자료나 추가 정보]{exclude_text}")
-            ])
+            mutations.extend(
+                (name, base_prompt + template.format(exclude_text=exclude_text))
+                for name, template in FALLBACK_MUTATION_TEMPLATES
+            )
         
+        self.record_stage("generate_smart_mutations", time.perf_counter() - started)
         return mutations
 
 # 기존 함수명과의 호환성
-async def optimize_prompt_simple(*args, **kwargs):
+async def optimize_prompt_simple(
+    *args,
+    max_concurrency: Optional[int] = None,
+    judge_mode: Optional[str] = None,
+    prefilter_top_k: Optional[int] = None,
+    prefilter_margin: Optional[float] = None,
+    race_initial_inputs: Optional[int] = None,
+    **kwargs
+):
     """기존 함수명과의 호환성"""
-    optimizer = SimpleOptimizer()
+    optimizer = SimpleOptimizer(
+        max_concurrency=max_concurrency,
+        judge_mode=judge_mode,
+        prefilter_top_k=prefilter_top_k,
+        prefilter_margin=prefilter_margin,
+        race_initial_inputs=race_initial_inputs
+    )
     return await optimizer.optimize_prompt_simple(*args, **kwargs)
 
 async def optimize_prompt_streaming(
@@ -321,10 +754,36 @@ async def optimize_prompt_streaming(
     exclude_keywords: List[str],
     custom_mutators: List[str] = [],
     evaluation_weights: Dict = {},
-    stop_event=None
+    stop_event=None,
+    max_concurrency: Optional[int] = None,
+    judge_mode: Optional[str] = None,
+    prefilter_top_k: Optional[int] = None,
+    prefilter_margin: Optional[float] = None,
+    stream_tokens: Optional[bool] = None,
+    test_inputs: Optional[List[str]] = None,
+    race_initial_inputs: Optional[int] = None
 ):
-    """Streaming version of prompt optimization that yields results as they're generated"""
-    optimizer = SimpleOptimizer()
+    """
+    Streaming version of prompt optimization that yields results as they're generated
+
+    With stream_tokens (default: settings.optimizer_stream_tokens) each variant's output is
+    forwarded as llm_delta events while it is being generated; llm_response still carries
+    the complete output and judging starts once the variant has finished.
+
+    With test_inputs, the variants are first streamed on user_input as usual and then raced
+    on the remaining inputs (successive halving); each round is reported as a race_round event.
+    """
+    if stream_tokens is None:
+        stream_tokens = settings.optimizer_stream_tokens
+
+    optimizer = SimpleOptimizer(
+        max_concurrency=max_concurrency,
+        judge_mode=judge_mode,
+        prefilter_top_k=prefilter_top_k,
+        prefilter_margin=prefilter_margin,
+        race_initial_inputs=race_initial_inputs
+    )
+    inputs = build_evaluation_set(user_input, test_inputs)
     
     # Send initial status
     yield {
@@ -335,7 +794,6 @@ async def optimize_prompt_streaming(
         }
     }
     # Force async yield to allow message to be sent
-    import asyncio
     await asyncio.sleep(0)
     
     # 키워드 설정 (제품명만)
@@ -415,101 +873,204 @@ async def optimize_prompt_streaming(
     
     gen0_results = {}
     all_trials = []
-    
-    # Process variations one by one but with immediate streaming
-    for i, (name, prompt) in enumerate(base_mutations):
-        # Check for stop signal
-        if stop_event and stop_event.is_set():
-            logger.info("Stop signal received, breaking optimization loop")
-            return
-            
-        # Send evaluation start
-        yield {
-            "type": "evaluation_start",
+    generated = []  # batch/prefilter mode: outputs judged once all are generated
+    total = len(base_mutations)
+
+    def record_trial(trial: TrialResult) -> Dict:
+        gen0_results[trial.name] = trial.score
+        all_trials.append(trial)
+        return {
+            "type": "evaluation_result",
             "data": {
-                "name": name,
-                "index": i,
-                "total": len(base_mutations),
-                "message": f"Evaluating variation {i+1}/{len(base_mutations)}: {name}"
+                "trial": trial.to_dict(),
+                "message": f"Variation '{trial.name}' failed: {trial.error}" if trial.error
+                else f"Variation '{trial.name}' scored {trial.score:.3f}" if trial.judged
+                else f"Variation '{trial.name}' pruned by local prefilter ({trial.score:.3f})"
             }
         }
-        await asyncio.sleep(0)
-        
+
+    # Evaluate variations concurrently; events are streamed in completion order
+    events: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    semaphore = asyncio.Semaphore(optimizer.max_concurrency)
+
+    async def evaluate_variation(i: int, name: str, prompt: str):
         try:
-            # Generate output
-            from llm import ask_llm
-            output = await ask_llm(prompt, user_input)
-            
-            # Send LLM response immediately
-            yield {
-                "type": "llm_response",
-                "data": {
-                    "name": name,
-                    "prompt": prompt,
-                    "output": output,
-                    "message": f"Generated response for '{name}'"
-                }
-            }
+            async with semaphore:
+                # Check for stop signal
+                if stop_event and stop_event.is_set():
+                    return
+
+                # Send evaluation start
+                await events.put({
+                    "type": "evaluation_start",
+                    "data": {
+                        "name": name,
+                        "index": i,
+                        "total": total,
+                        "message": f"Evaluating variation {i+1}/{total}: {name}"
+                    }
+                })
+
+                async def forward_delta(delta: str):
+                    await events.put({
+                        "type": "llm_delta",
+                        "data": {"name": name, "index": i, "delta": delta}
+                    })
+
+                # Generate output (once; the same output is judged below)
+                generation_started = time.perf_counter()
+                try:
+                    output, generation_latency = await optimizer.generate_output(
+                        prompt, user_input, forward_delta if stream_tokens else None
+                    )
+                except LLMError as e:
+                    # Record the failure instead of scoring the error message as output
+                    logger.warning(f"Generation failed for variation {name}: {e}")
+                    await events.put(record_trial(TrialResult.failed(name, prompt, e, time.perf_counter() - generation_started)))
+                    return
+
+                # Send LLM response immediately
+                await events.put({
+                    "type": "llm_response",
+                    "data": {
+                        "name": name,
+                        "prompt": prompt,
+                        "output": output,
+                        "message": f"Generated response for '{name}'"
+                    }
+                })
+
+                if optimizer.judges_after_generation:
+                    # Judged together with the other variations once all are generated
+                    generated.append((name, prompt, output, generation_latency))
+                    return
+
+                # Judge the generated output
+                judge_started = time.perf_counter()
+                judgment = await optimizer.judge_output(output, expected_output, keywords, exclude_keywords_filtered, custom_mutators, evaluation_weights)
+                trial = TrialResult(
+                    name=name,
+                    prompt=prompt,
+                    output=output,
+                    generation_latency=generation_latency,
+                    judge_latency=time.perf_counter() - judge_started,
+                    **judgment
+                )
+
+                # Send evaluation result immediately
+                await events.put(record_trial(trial))
+
+        except Exception as e:
+            logger.error(f"Error processing variation {name}: {e}")
+        finally:
+            events.put_nowait(finished)
+
+    tasks = [
+        asyncio.create_task(evaluate_variation(i, name, prompt))
+        for i, (name, prompt) in enumerate(base_mutations)
+    ]
+
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await events.get()
+            if event is finished:
+                remaining -= 1
+                continue
+
+            yield event
             await asyncio.sleep(0)
-            
-            # Evaluate the prompt
-            score = await optimizer.evaluate_prompt(prompt, user_input, expected_output, keywords, exclude_keywords_filtered, custom_mutators, evaluation_weights)
-            gen0_results[name] = score
-            
-            trial_result = {
-                "name": name,
-                "prompt": prompt,
-                "score": score,
-                "output": output
+
+            if stop_event and stop_event.is_set():
+                logger.info("Stop signal received, breaking optimization loop")
+                return
+    finally:
+        # 중단되었거나 제너레이터가 닫힌 경우 남은 평가 작업(진행 중인 LLM 요청 포함) 취소
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # 취소가 끝날 때까지 대기하여 제너레이터가 닫힌 뒤에는 LLM 요청이 남아 있지 않도록 함
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    if generated:
+        # Batch/prefilter mode: prune locally, then judge the survivors
+        for trial in await optimizer.judge_generated(generated, expected_output, keywords, exclude_keywords_filtered, custom_mutators, evaluation_weights):
+            yield record_trial(trial)
+            await asyncio.sleep(0)
+    
+    # 최고 점수 선택 (안전 체크)
+    if not all_trials:
+        logger.error("No results generated - all variations failed")
+        return
+
+    final_started = time.perf_counter()
+    race_latency = 0.0
+    best_trial = max(
+        [trial for trial in all_trials if trial.judged] or all_trials,
+        key=lambda trial: trial.score
+    )
+    current_best_score = best_trial.score
+    best_prompt = best_trial.prompt
+    trial_dicts = [trial.to_dict() for trial in all_trials]
+    total_evaluations = len(gen0_results)
+
+    if len(inputs) > 1:
+        # 대표 입력 결과를 첫 라운드로 재사용하고 나머지 테스트 입력으로 레이스 진행
+        yield {
+            "type": "status",
+            "data": {
+                "message": f"Racing variations on {len(inputs)} test inputs...",
+                "step": "race"
             }
-            all_trials.append(trial_result)
-            
-            # Send evaluation result immediately
+        }
+        race_started = time.perf_counter()
+        races = {trial.name: VariantRace(name=trial.name, prompt=trial.prompt, trials=[trial]) for trial in all_trials}
+        async for race_round in optimizer.race_variations(base_mutations, inputs, expected_output, keywords, exclude_keywords_filtered, custom_mutators, evaluation_weights, races=races):
             yield {
-                "type": "evaluation_result",
+                "type": "race_round",
                 "data": {
-                    "trial": trial_result,
-                    "message": f"Variation '{name}' scored {score:.3f}"
+                    **race_round,
+                    "message": f"Race round {race_round['round'] + 1}: {len(race_round['survivors'])} variations remain after {race_round['inputs']} inputs"
                 }
             }
             await asyncio.sleep(0)
-            
-        except Exception as e:
-            logger.error(f"Error processing variation {name}: {e}")
-            continue
-    
-    # 최고 점수 선택 (안전 체크)
-    if not gen0_results:
-        logger.error("No results generated - all variations failed")
-        return
-        
-    best_gen0 = max(gen0_results.items(), key=lambda x: x[1])
-    current_best_score = best_gen0[1]
-    
-    # 최고 점수에 해당하는 프롬프트 찾기
-    best_prompt = base_mutations[0][1]  # 기본값
-    for name, prompt in base_mutations:
-        if name == best_gen0[0]:
-            best_prompt = prompt
-            break
+            if stop_event and stop_event.is_set():
+                logger.info("Stop signal received, ending race early")
+                break
+        race_latency = time.perf_counter() - race_started
+        optimizer.record_stage("race", race_latency)
+
+        best_race = optimizer.select_race_winner(races)
+        best_trial = best_race.primary
+        current_best_score = best_race.score
+        best_prompt = best_race.prompt
+        gen0_results = {name: race.score for name, race in races.items()}
+        trial_dicts = [race.to_dict() for race in races.values()]
+        total_evaluations = sum(len(race.trials) for race in races.values())
     
     initial_score = gen0_results.get("base", 0.5)
     improvement = current_best_score - initial_score
+    # 최종 결과 선택/구성 시간 (레이스는 별도 단계로 기록)
+    optimizer.record_stage("final_output", time.perf_counter() - final_started - race_latency)
     
     # Send final results
     yield {
         "type": "final_results",
         "data": {
             "best_prompt": best_prompt,
-            "best_output": await ask_llm(best_prompt, user_input),
+            "best_output": best_trial.output,
             "best_score": round(current_best_score, 3),
-            "all_trials": all_trials,
-            "total_evaluations": len(gen0_results),
+            "all_trials": trial_dicts,
+            "total_evaluations": total_evaluations,
+            "evaluation_inputs": len(inputs),
             "generations_completed": 1,
-            "best_variant": best_gen0[0],
+            "best_variant": best_trial.name,
             "improvement_achieved": improvement > 0,
             "score_improvement": round(improvement, 3),
             "initial_score": round(initial_score, 3),
+            "timings": optimizer.stage_timings(),
+            "usage": optimizer.usage.to_dict(),
             "message": f"Optimization complete! Best score: {current_best_score:.3f} (improvement: {improvement:.3f})"
         }
     }
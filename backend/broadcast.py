@@ -0,0 +1,147 @@
+"""
+채팅 메시지 브로드캐스터 - 세션별 여러 구독자(상담원/고객 탭)에게 메시지 전달
+
+- 연결마다 크기 제한 송신 큐와 전용 송신 태스크를 두어 느린 클라이언트가 수신 루프를 막지 않도록 함
+- 큐가 가득 찬 느린 구독자는 정책에 따라 가장 오래된 메시지를 버리거나(drop_oldest) 연결을 끊음(disconnect)
+- 메시지는 브로드캐스트마다 한 번만 직렬화하여 모든 구독자가 공유
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+from fastapi import WebSocket
+from config import settings
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+class Subscriber:
+    """WebSocket 연결 하나와 송신 큐/태스크"""
+
+    def __init__(self, session_id: str, websocket: WebSocket, queue_size: int):
+        self.session_id = session_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+
+class Broadcaster:
+    """세션 ID별 구독자 목록과 송신 태스크 관리"""
+
+    def __init__(self, queue_size: Optional[int] = None, send_timeout: Optional[float] = None, slow_consumer_policy: Optional[str] = None):
+        self.queue_size = max(1, queue_size or settings.chat_send_queue_size)
+        self.send_timeout = send_timeout or settings.chat_send_timeout
+        self.slow_consumer_policy = slow_consumer_policy or settings.chat_slow_consumer_policy
+        if self.slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {self.slow_consumer_policy}")
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.counters = {"published": 0, "delivered": 0, "dropped": 0, "disconnected": 0}
+        # publish()에서 시작한 연결 종료 태스크 (완료 전에 가비지 컬렉션되지 않도록 보관)
+        self._closing: Set[asyncio.Task] = set()
+
+    def subscribe(self, session_id: str, websocket: WebSocket) -> Subscriber:
+        """구독자 등록 후 송신 태스크 시작 (이벤트 루프 안에서 호출)"""
+        subscriber = Subscriber(session_id, websocket, self.queue_size)
+        subscriber._writer = asyncio.create_task(self._write(subscriber))
+        self.subscribers.setdefault(session_id, set()).add(subscriber)
+        logger.info(f"Subscriber added to session {session_id} ({self.subscriber_count(session_id)} connected)")
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        """구독 해제 후 송신 태스크 종료 (남은 메시지는 버림)"""
+        self._remove(subscriber)
+        if subscriber._writer is not None and subscriber._writer is not asyncio.current_task():
+            subscriber._writer.cancel()
+            await asyncio.gather(subscriber._writer, return_exceptions=True)
+
+    def subscriber_count(self, session_id: str) -> int:
+        return len(self.subscribers.get(session_id, ()))
+
+    def publish(self, session_id: str, message: Dict) -> int:
+        """
+        세션의 모든 구독자 송신 큐에 메시지 추가 (기다리지 않음)
+
+        Returns:
+            메시지를 넣은 구독자 수
+        """
+        subscribers = list(self.subscribers.get(session_id, ()))
+        if not subscribers:
+            return 0
+        payload = dumps(message)
+        self.counters["published"] += 1
+        queued = 0
+        for subscriber in subscribers:
+            if self._enqueue(subscriber, payload):
+                queued += 1
+        return queued
+
+    def _enqueue(self, subscriber: Subscriber, payload: bytes) -> bool:
+        try:
+            subscriber.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.slow_consumer_policy == "disconnect":
+            logger.warning(f"Disconnecting slow subscriber on session {subscriber.session_id} (send queue full)")
+            self.counters["disconnected"] += 1
+            # 이후 브로드캐스트 대상에서 바로 제외하고, 소켓 종료는 별도 태스크에서 처리
+            self._remove(subscriber)
+            task = asyncio.create_task(self._close(subscriber, code=1008, reason="Too slow to receive messages"))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+            return False
+        # drop_oldest: 가장 오래된 메시지를 버리고 최신 메시지를 넣음
+        subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(payload)
+        subscriber.dropped += 1
+        self.counters["dropped"] += 1
+        return True
+
+    async def _write(self, subscriber: Subscriber):
+        try:
+            # wait_for는 전송 완료와 동시에 들어온 취소를 삼킬 수 있으므로 (Python 3.11) 구독 해제 여부도 확인
+            while not subscriber.closed:
+                payload = await subscriber.queue.get()
+                await asyncio.wait_for(subscriber.websocket.send_bytes(payload), timeout=self.send_timeout)
+                self.counters["delivered"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 전송 시간 초과 또는 끊어진 연결 - 구독 해제 후 소켓 정리
+            if subscriber.closed:
+                return
+            logger.error(f"Error sending message to session {subscriber.session_id}: {e!r}")
+            self.counters["disconnected"] += 1
+            await self._close(subscriber, code=1011, reason="Send failed")
+
+    async def _close(self, subscriber: Subscriber, code: int, reason: str):
+        await self.unsubscribe(subscriber)
+        try:
+            await subscriber.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    def _remove(self, subscriber: Subscriber):
+        subscriber.closed = True
+        subscribers = self.subscribers.get(subscriber.session_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.session_id]
+
+    def stats(self) -> Dict:
+        queued: List[int] = [subscriber.queue.qsize() for subscribers in self.subscribers.values() for subscriber in subscribers]
+        return {
+            "sessions": len(self.subscribers),
+            "subscribers": len(queued),
+            "queued_messages": sum(queued),
+            "max_queued_per_subscriber": max(queued, default=0),
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            **self.counters,
+        }
+
+broadcaster = Broadcaster()
@@ -0,0 +1,108 @@
+"""
+채팅 응답용 대화 컨텍스트 구성 - 응답마다 입력 토큰이 settings.max_context_length 이내가 되도록 유지
+
+- 최근 턴은 원문 그대로 전달 (슬라이딩 윈도우)
+- 윈도우를 넘친 이전 턴은 세션별 요약에 누적 반영하여 시스템 프롬프트에 포함
+- 요약은 윈도우가 넘칠 때만 갱신하고, 갱신할 때 윈도우를 절반까지 비워 매 턴 요약하지 않도록 함
+"""
+
+import logging
+from typing import Dict, List, Optional
+from config import settings
+from llm import LLMError, ask_llm, estimate_text_tokens
+from sessions import ChatSessionEntry
+from usage import UsageTracker
+
+logger = logging.getLogger(__name__)
+
+SENDER_ROLES = {"customer": "user", "agent": "assistant"}
+SENDER_LABELS = {"customer": "고객", "agent": "상담원"}
+
+# 메시지마다 붙는 역할/구분자 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+# 윈도우가 넘치면 윈도우 예산의 이 비율까지만 최근 턴을 남기고 나머지를 요약
+WINDOW_REFILL_RATIO = 0.5
+
+SUMMARY_PROMPT = """다음은 고객 지원 대화의 기존 요약과 그 이후의 대화 내용이다.
+기존 요약에 새 대화 내용을 반영하여 하나의 요약으로 다시 작성해라.
+고객 정보, 문의 내용, 이미 안내한 해결 방법, 아직 해결되지 않은 문제를 중심으로 간결하게 정리하고 요약만 출력해라."""
+
+def message_tokens(message: Dict) -> int:
+    return estimate_text_tokens(message.get("message", "")) + MESSAGE_OVERHEAD_TOKENS
+
+def build_system_prompt(customer_name: str, summary: str = "") -> str:
+    prompt = f"{settings.system_prompt}\n\n고객 이름: {customer_name}"
+    if summary:
+        prompt += f"\n\n이전 대화 요약:\n{summary}"
+    return prompt
+
+async def summarize_turns(summary: str, turns: List[Dict], usage: Optional[UsageTracker] = None) -> str:
+    """기존 요약에 새 턴들을 반영한 요약 (요약 길이는 chat_summary_max_tokens로 제한)"""
+    transcript = "\n".join(
+        f"{SENDER_LABELS.get(turn.get('sender'), turn.get('sender'))}: {turn.get('message', '')}"
+        for turn in turns
+    )
+    return await ask_llm(
+        SUMMARY_PROMPT,
+        f"기존 요약:\n{summary or '(없음)'}\n\n이후 대화:\n{transcript}",
+        max_tokens=settings.chat_summary_max_tokens,
+        raise_errors=True,
+        use_cache=False,
+        call_site="chat_summary",
+        usage=usage
+    )
+
+def select_window(turns: List[tuple], budget: int) -> List[tuple]:
+    """최근 턴부터 budget 토큰 이내로 선택 (가장 최근 턴은 항상 포함)"""
+    window, used = [], 0
+    for seq, turn in reversed(turns):
+        tokens = message_tokens(turn)
+        if window and used + tokens > budget:
+            break
+        window.append((seq, turn))
+        used += tokens
+    window.reverse()
+    return window
+
+async def build_chat_messages(entry: ChatSessionEntry, customer_name: str, budget: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    세션의 대화 이력으로 chat completion 메시지 목록 구성
+
+    Args:
+        entry: 채팅 세션 (마지막 메시지가 이번에 응답할 고객 메시지)
+        customer_name: 고객 이름
+        budget: 입력 토큰 예산 (기본값: settings.max_context_length)
+
+    Returns:
+        [시스템 프롬프트(+요약), 최근 턴...] 메시지 목록
+    """
+    budget = budget or settings.max_context_length
+    async with entry.summary_lock:
+        pending = [(seq, turn) for seq, turn in entry.numbered_messages() if seq >= entry.summary_upto]
+        # 요약 자리는 최대 길이만큼 미리 확보하여 요약 갱신 여부와 관계없이 예산을 넘지 않도록 함
+        summary_tokens = max(estimate_text_tokens(entry.summary), settings.chat_summary_max_tokens)
+        window_budget = max(0, budget - estimate_text_tokens(build_system_prompt(customer_name)) - summary_tokens)
+
+        if len(pending) > 1 and sum(message_tokens(turn) for _, turn in pending) > window_budget:
+            keep = select_window(pending, int(window_budget * WINDOW_REFILL_RATIO))
+            folded = pending[:len(pending) - len(keep)]
+            try:
+                entry.summary = await summarize_turns(entry.summary, [turn for _, turn in folded], entry.usage)
+                entry.summary_upto = folded[-1][0] + 1
+                pending = keep
+                logger.info(f"Folded {len(folded)} chat turns into the session summary ({estimate_text_tokens(entry.summary)} tokens)")
+            except LLMError as e:
+                # 기존 요약을 유지하고 이번 응답은 윈도우만 잘라서 사용 (다음 턴에 다시 요약 시도)
+                logger.warning(f"Failed to update chat summary: {e}")
+
+        window = select_window(pending, window_budget)
+        summary = entry.summary
+
+    messages = [{"role": "system", "content": build_system_prompt(customer_name, summary)}]
+    for _, turn in window:
+        content = turn.get("message", "")
+        # 한 턴만으로 예산을 넘으면 앞부분만 사용
+        if message_tokens(turn) > window_budget:
+            content = content[:max(1, window_budget - MESSAGE_OVERHEAD_TOKENS) * 2]
+        messages.append({"role": SENDER_ROLES.get(turn.get("sender"), "user"), "content": content})
+    return messages
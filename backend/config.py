@@ -8,6 +8,59 @@ class Settings(BaseSettings):
     # OpenAI Configuration
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "")  # OpenAI 호환 서버 (예: mock_llm.py)
+
+    # LLM Backend: auto | openai | mock | dummy
+    llm_backend: str = os.getenv("LLM_BACKEND", "auto")
+
+    # LLM Client Configuration
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "60"))
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    llm_max_keepalive_connections: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    llm_keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+    llm_max_in_flight: int = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+    llm_warmup_connections: int = int(os.getenv("LLM_WARMUP_CONNECTIONS", "1"))  # 시작 시 미리 열어 둘 커넥션 수 (모델 목록 요청), 0이면 열지 않음
+
+    # LLM Rate Limit Configuration (동시성 한도는 llm_min_in_flight ~ llm_max_in_flight 사이에서 자동 조절)
+    llm_rpm_limit: float = float(os.getenv("LLM_RPM_LIMIT", "0"))  # 분당 요청 수, 0이면 제한 없음
+    llm_tpm_limit: float = float(os.getenv("LLM_TPM_LIMIT", "0"))  # 분당 토큰 수, 0이면 제한 없음
+    llm_min_in_flight: int = int(os.getenv("LLM_MIN_IN_FLIGHT", "1"))
+    llm_latency_spike_factor: float = float(os.getenv("LLM_LATENCY_SPIKE_FACTOR", "2.0"))  # 기준 지연의 몇 배를 급증으로 볼지
+    llm_latency_spike_samples: int = int(os.getenv("LLM_LATENCY_SPIKE_SAMPLES", "2"))  # 연속 몇 번 급증해야 동시성을 줄일지
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    llm_retry_base_delay: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    llm_retry_max_delay: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+
+    # LLM Usage Cost Configuration (USD / 1K 토큰, 모델 구분 없이 적용)
+    llm_prompt_cost_per_1k: float = float(os.getenv("LLM_PROMPT_COST_PER_1K", "0.0005"))
+    llm_completion_cost_per_1k: float = float(os.getenv("LLM_COMPLETION_COST_PER_1K", "0.0015"))
+
+    # LLM Response Cache Configuration
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    llm_cache_ttl: float = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", "")  # 비어 있으면 디스크 캐시 사용 안 함
+
+    # Optimizer Configuration
+    optimizer_max_concurrency: int = int(os.getenv("OPTIMIZER_MAX_CONCURRENCY", "4"))
+    optimizer_judge_mode: str = os.getenv("OPTIMIZER_JUDGE_MODE", "single")  # single | batch
+    optimizer_prefilter_top_k: int = int(os.getenv("OPTIMIZER_PREFILTER_TOP_K", "0"))  # 0이면 사전 필터 사용 안 함
+    optimizer_prefilter_margin: float = float(os.getenv("OPTIMIZER_PREFILTER_MARGIN", "0.1"))
+    optimizer_race_initial_inputs: int = int(os.getenv("OPTIMIZER_RACE_INITIAL_INPUTS", "1"))  # 다중 입력 레이스 첫 라운드 입력 수
+    optimizer_stream_tokens: bool = os.getenv("OPTIMIZER_STREAM_TOKENS", "true").lower() == "true"  # WebSocket으로 토큰 단위 출력 전달
+
+    # Background Job Configuration
+    job_workers: int = int(os.getenv("JOB_WORKERS", "2"))  # 동시에 실행할 최적화 작업 수
+    job_queue_size: int = int(os.getenv("JOB_QUEUE_SIZE", "20"))  # 대기열이 가득 차면 429 반환
+    job_result_ttl: float = float(os.getenv("JOB_RESULT_TTL", "600"))  # 완료된 작업 결과 보관 시간(초)
+    
+    # Shared State Configuration (여러 uvicorn 워커 실행 시 sqlite 사용)
+    state_backend: str = os.getenv("STATE_BACKEND", "memory")  # memory | sqlite
+    state_path: str = os.getenv("STATE_PATH", "autopromptix_state.db")  # sqlite 상태 파일 (워커들이 같은 경로 사용)
+    state_socket_dir: str = os.getenv("STATE_SOCKET_DIR", "")  # pub/sub 소켓 디렉터리 (기본값: <STATE_PATH>.sockets)
+    
+    # Startup Configuration
+    startup_warmup: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"  # 시작 후 백그라운드에서 LLM 클라이언트/채점 의존성 미리 로드
     
     # Application Configuration
     app_name: str = "Autopromtix Customer Support Chat API"
@@ -17,7 +70,15 @@ class Settings(BaseSettings):
     allowed_origins: list = ["http://localhost:3000", "http://localhost:5173"]
     
     # Chat Configuration
-    max_context_length: int = 4000
+    max_context_length: int = int(os.getenv("MAX_CONTEXT_LENGTH", "4000"))  # 채팅 응답 입력 토큰 예산 (시스템 프롬프트 + 요약 + 최근 턴)
+    chat_summary_max_tokens: int = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))  # 예산을 넘친 이전 턴 요약의 최대 길이
+    chat_max_sessions: int = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))  # 초과 시 가장 오래 사용하지 않은 세션부터 제거
+    chat_max_messages_per_session: int = int(os.getenv("CHAT_MAX_MESSAGES_PER_SESSION", "200"))  # 세션별 최근 메시지만 보관
+    chat_session_idle_ttl: float = float(os.getenv("CHAT_SESSION_IDLE_TTL", "3600"))  # 활동 없는 세션 보관 시간(초), 0이면 제거 안 함
+    chat_reap_interval: float = float(os.getenv("CHAT_REAP_INTERVAL", "60"))  # 유휴 세션 정리 주기(초)
+    chat_send_queue_size: int = int(os.getenv("CHAT_SEND_QUEUE_SIZE", "64"))  # 연결별 송신 대기 메시지 수
+    chat_send_timeout: float = float(os.getenv("CHAT_SEND_TIMEOUT", "10"))  # 메시지 하나 전송 제한 시간(초), 넘으면 연결 종료
+    chat_slow_consumer_policy: str = os.getenv("CHAT_SLOW_CONSUMER_POLICY", "drop_oldest")  # drop_oldest | disconnect
     system_prompt: str = """You are a helpful customer support agent for Autopromtix, a technology company specializing in AI-powered solutions and automation tools. 
     You should be friendly, professional, and knowledgeable about Autopromtix's products and services.
     Always provide accurate and helpful information based on the available context.
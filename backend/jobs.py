@@ -0,0 +1,263 @@
+"""
+백그라운드 작업 큐 - 최적화 요청을 작업 ID로 접수하고 고정 크기 워커 풀에서 실행
+
+- 큐가 가득 차면 QueueFullError (API에서는 429로 변환)
+- 작업별 상태/결과/이벤트 기록 제공, 이벤트는 실행 중에도 구독 가능
+- 완료된 작업은 result_ttl이 지나면 제거
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+class QueueFullError(Exception):
+    """작업 큐가 가득 차서 새 작업을 받을 수 없음"""
+
+    def __init__(self, max_queue_size: int, retry_after: float):
+        super().__init__(f"Job queue is full ({max_queue_size} jobs waiting)")
+        self.retry_after = retry_after
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+@dataclass
+class Job:
+    """작업 하나의 상태와 이벤트 기록"""
+    runner: Callable[["Job"], Awaitable[Dict]]
+    params: Dict = field(default_factory=dict)
+    kind: str = "optimization"
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._updated = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    async def emit(self, event: Dict):
+        """이벤트 기록 후 구독자 깨우기 (seq는 1부터 증가)"""
+        self.events.append({**event, "seq": len(self.events) + 1, "timestamp": datetime.now().isoformat()})
+        async with self._updated:
+            self._updated.notify_all()
+
+    async def iter_events(self, after: int = 0) -> AsyncIterator[Dict]:
+        """seq가 after보다 큰 이벤트를 순서대로 전달하고, 작업이 끝나면 종료"""
+        position = after
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.finished:
+                return
+            async with self._updated:
+                await self._updated.wait_for(lambda: position < len(self.events) or self.finished)
+
+    async def wait(self) -> "Job":
+        """작업이 끝날 때까지 대기"""
+        async with self._updated:
+            await self._updated.wait_for(lambda: self.finished)
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+            "events": len(self.events),
+        }
+
+class JobManager:
+    """고정 크기 워커 풀과 크기 제한 큐로 작업 실행"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue_size: Optional[int] = None, result_ttl: Optional[float] = None):
+        self.workers = max(1, workers or settings.job_workers)
+        self.max_queue_size = max(1, max_queue_size or settings.job_queue_size)
+        self.result_ttl = settings.job_result_ttl if result_ttl is None else result_ttl
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._reaper: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self):
+        """워커 시작 (이벤트 루프 안에서 호출, 이미 실행 중이면 무시)"""
+        if self._workers:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        # 요청이 없는 동안에도 만료된 작업이 쌓이지 않도록 주기적으로 정리
+        self._reaper = asyncio.create_task(self._reap_loop())
+        logger.info(f"Job manager started with {self.workers} workers (queue size: {self.max_queue_size})")
+
+    async def stop(self):
+        """워커와 실행 중인 작업 취소"""
+        self._stopping = True
+        for job in self.jobs.values():
+            if not job.finished:
+                await self.cancel(job.id)
+        for task in [*self._workers, self._reaper]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*self._workers, *([self._reaper] if self._reaper else []), return_exceptions=True)
+        self._workers = []
+        self._reaper = None
+        self._queue = None
+
+    def submit(self, runner: Callable[[Job], Awaitable[Dict]], params: Optional[Dict] = None, kind: str = "optimization") -> Job:
+        """
+        작업 접수
+
+        Args:
+            runner: 작업을 실행하고 결과 딕셔너리를 반환하는 코루틴 함수 (job.emit으로 진행 이벤트 기록)
+            params: 작업 파라미터 (runner에서 job.params로 사용)
+
+        Raises:
+            QueueFullError: 대기 중인 작업이 max_queue_size개 이상인 경우
+        """
+        self.start()
+        self.evict_expired()
+        job = Job(runner=runner, params=params or {}, kind=kind)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.max_queue_size, retry_after=self.retry_after_hint())
+        self.jobs[job.id] = job
+        job.events.append({"type": "job_queued", "data": {"position": self.queued_count()}, "seq": 1, "timestamp": datetime.now().isoformat()})
+        logger.info(f"Job {job.id} queued ({self.queued_count()}/{self.max_queue_size})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.evict_expired()
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """대기 중인 작업은 건너뛰도록 표시하고, 실행 중인 작업은 태스크를 취소 (진행 중인 LLM 요청도 취소됨)"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job._task is not None and not job._task.done():
+            job._task.cancel()
+            try:
+                await job._task
+            except asyncio.CancelledError:
+                pass
+            # 워커가 상태를 cancelled로 기록할 때까지 대기
+            await job.wait()
+        else:
+            await self._finish(job, "cancelled")
+        return job
+
+    def queued_count(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after_hint(self) -> float:
+        """최근 완료된 작업의 평균 소요 시간으로 추정한 재시도 대기 시간 (초)"""
+        durations = [
+            job.finished_at - job.started_at
+            for job in self.jobs.values()
+            if job.started_at and job.finished_at
+        ][-20:]
+        if not durations:
+            return 5.0
+        return round(max(1.0, sum(durations) / len(durations) * self.queued_count() / self.workers), 1)
+
+    def evict_expired(self):
+        """완료 후 result_ttl이 지난 작업 제거"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished and job.finished_at and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        if expired:
+            logger.info(f"Evicted {len(expired)} expired jobs")
+
+    def list_jobs(self) -> List[Job]:
+        """만료된 작업을 제거한 뒤 남은 작업 목록"""
+        self.evict_expired()
+        return list(self.jobs.values())
+
+    async def _reap_loop(self):
+        interval = max(1.0, min(60.0, self.result_ttl))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_expired()
+            except Exception as e:
+                logger.error(f"Error evicting expired jobs: {e}")
+
+    def stats(self) -> Dict:
+        self.evict_expired()
+        counts = {status: 0 for status in JOB_STATUSES}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {
+            "workers": self.workers,
+            "max_queue_size": self.max_queue_size,
+            "queued": self.queued_count(),
+            "result_ttl": self.result_ttl,
+            "jobs": counts,
+        }
+
+    async def _finish(self, job: Job, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        await job.emit({"type": f"job_{status}", "data": {"error": error} if error else {}})
+
+    async def _worker(self, index: int):
+        while True:
+            job: Job = await self._queue.get()
+            try:
+                if job.finished:
+                    # 대기 중에 취소된 작업
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+                await job.emit({"type": "job_started", "data": {"worker": index}})
+                logger.info(f"Job {job.id} started on worker {index}")
+
+                job._task = asyncio.create_task(job.runner(job))
+                try:
+                    result = await job._task
+                except asyncio.CancelledError:
+                    await self._finish(job, "cancelled")
+                    if self._stopping:
+                        # 워커 자체가 취소된 경우 (종료 시)
+                        raise
+                except Exception as e:
+                    logger.error(f"Job {job.id} failed: {e}")
+                    await self._finish(job, "failed", error=str(e))
+                else:
+                    await self._finish(job, "succeeded", result=result)
+                logger.info(f"Job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s")
+            finally:
+                self._queue.task_done()
+
+job_manager = JobManager()
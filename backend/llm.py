@@ -1,93 +1,960 @@
 """
 LLM 통합 모듈 - OpenAI API와의 통신을 담당
+
+- import 비용이 큰 openai/httpx는 처음 필요할 때 불러오고, 백엔드(클라이언트)도 첫 사용 시 생성
+- 애플리케이션 시작 시 warm_up()으로 백그라운드에서 미리 준비하여 첫 요청의 지연을 줄임
 """
 
-import openai
+import asyncio
+import hashlib
+import json
 import os
 import logging
-from typing import Optional
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from config import settings
+from metrics import llm_calls, llm_errors, llm_latency, llm_tokens
+from usage import TokenUsage, UsageTracker, usage_totals
 
 logger = logging.getLogger(__name__)
 
-# OpenAI 클라이언트 초기화
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    logger.warning("OPENAI_API_KEY not found. LLM functionality will be limited.")
-    client = None
-else:
-    client = openai.OpenAI(
-        api_key=api_key,
+class LLMBackend:
+    """LLM 백엔드 인터페이스 - chat completion 요청을 실제로 처리하는 계층"""
 
-    )
+    name = "base"
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: Optional[float] = None,
+        max_tokens: int = 500,
+        timeout: Optional[float] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """응답 텍스트 반환 - usage가 주어지면 제공자가 보고한 토큰 사용량을 기록"""
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: Optional[float] = None,
+        max_tokens: int = 500,
+        timeout: Optional[float] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> AsyncIterator[str]:
+        """응답을 델타(토큰 조각) 단위로 전달 - 기본 구현은 전체 응답을 한 번에 전달"""
+        yield await self.complete(messages, model, temperature=temperature, max_tokens=max_tokens, timeout=timeout, usage=usage)
+
+    async def list_models(self) -> List[str]:
+        raise NotImplementedError
+
+    async def warm_up(self, connections: int):
+        """커넥션을 미리 열어 둠 (원격 서버를 쓰지 않는 백엔드는 할 일 없음)"""
+        pass
+
+    async def aclose(self):
+        pass
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI (또는 OpenAI 호환 서버) 백엔드 - 커넥션 풀을 공유하는 비동기 클라이언트 사용"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        import httpx
+        import openai
+
+        # keep-alive 커넥션을 재사용하여 요청마다 TLS 핸드셰이크를 반복하지 않도록 함
+        http_client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry,
+            ),
+            timeout=settings.llm_timeout,
+        )
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=http_client,
+            timeout=settings.llm_timeout,
+            # 재시도는 공용 제한기에서 처리 (SDK 재시도와 겹치면 429 시 요청이 몰림)
+            max_retries=0,
+        )
+
+    def _params(self, messages, model, temperature, max_tokens, timeout) -> Dict:
+        params = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "timeout": timeout if timeout is not None else settings.llm_timeout,
+        }
+        if temperature is not None:
+            params["temperature"] = temperature
+        return params
+
+    @staticmethod
+    def _record_usage(reported, usage: Optional[TokenUsage]):
+        if usage is not None and reported is not None:
+            usage.prompt_tokens = reported.prompt_tokens or 0
+            usage.completion_tokens = reported.completion_tokens or 0
+
+    async def complete(self, messages, model, temperature=None, max_tokens=500, timeout=None, usage=None) -> str:
+        response = await self.client.chat.completions.create(
+            **self._params(messages, model, temperature, max_tokens, timeout)
+        )
+        self._record_usage(response.usage, usage)
+        return response.choices[0].message.content.strip()
+
+    async def stream(self, messages, model, temperature=None, max_tokens=500, timeout=None, usage=None) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            **self._params(messages, model, temperature, max_tokens, timeout),
+            stream=True,
+            # 마지막 조각(choices 없음)으로 토큰 사용량을 받음
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in response:
+                self._record_usage(chunk.usage, usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # 중간에 소비를 멈춘 경우에도 커넥션을 풀에 반환
+            await response.close()
+
+    async def list_models(self) -> List[str]:
+        models = await self.client.models.list()
+        return [model.id for model in models.data]
+
+    async def warm_up(self, connections: int):
+        # 가벼운 요청을 동시에 보내 keep-alive 커넥션(TLS 포함)을 미리 열어 둠
+        await asyncio.gather(*(self.client.models.list() for _ in range(connections)))
+
+    async def aclose(self):
+        await self.client.close()
+
+class DummyBackend(LLMBackend):
+    """API 키가 없을 때 사용하는 고정 응답 백엔드 (테스트용)"""
+
+    name = "dummy"
+
+    async def complete(self, messages, model, temperature=None, max_tokens=500, timeout=None, usage=None) -> str:
+        user_input = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return f"테스트 응답: {user_input}에 대한 답변입니다."
+
+    async def list_models(self) -> List[str]:
+        return ["gpt-3.5-turbo", "gpt-4"]
+
+class MockBackend(LLMBackend):
+    """
+    인프로세스 모의 LLM 백엔드 - 실제와 비슷한 지연 시간, 429/500 오류, 평가 JSON 응답을 재현
+
+    주입된 오류는 OpenAI SDK와 같은 예외 타입으로 변환되므로 오류 처리 경로도 그대로 실행된다.
+    """
+
+    name = "mock"
+
+    def __init__(self, config=None):
+        from mock_llm import MockLLM, MockLLMConfig
+        self.mock = MockLLM(config or MockLLMConfig.from_env())
+
+    @staticmethod
+    def _request():
+        import httpx
+        return httpx.Request("POST", "http://mock-llm/v1/chat/completions")
+
+    def _to_openai_error(self, error) -> "openai.APIStatusError":
+        """주입된 오류를 OpenAI SDK 예외로 변환"""
+        import httpx
+        import openai
+
+        headers = {"retry-after": str(error.retry_after)} if error.retry_after is not None else {}
+        response = httpx.Response(error.status_code, request=self._request(), headers=headers)
+        error_class = openai.RateLimitError if error.status_code == 429 else openai.InternalServerError
+        return error_class(str(error), response=response, body=None)
+
+    async def complete(self, messages, model, temperature=None, max_tokens=500, timeout=None, usage=None) -> str:
+        import openai
+        from mock_llm import MockLLMError
+
+        try:
+            result = await asyncio.wait_for(
+                self.mock.complete(messages, max_tokens),
+                timeout if timeout is not None else settings.llm_timeout
+            )
+        except asyncio.TimeoutError:
+            raise openai.APITimeoutError(request=self._request())
+        except MockLLMError as e:
+            raise self._to_openai_error(e)
+        if usage is not None:
+            usage.prompt_tokens = result["prompt_tokens"]
+            usage.completion_tokens = result["completion_tokens"]
+        return result["content"]
+
+    async def stream(self, messages, model, temperature=None, max_tokens=500, timeout=None, usage=None) -> AsyncIterator[str]:
+        import openai
+        from mock_llm import MockLLMError
+
+        # OpenAI SDK와 같이 조각 사이의 대기 시간에 타임아웃 적용
+        timeout = timeout if timeout is not None else settings.llm_timeout
+        deltas = self.mock.stream(messages, max_tokens)
+        try:
+            while True:
+                try:
+                    delta = await asyncio.wait_for(deltas.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise openai.APITimeoutError(request=self._request())
+                except MockLLMError as e:
+                    raise self._to_openai_error(e)
+                yield delta
+        finally:
+            await deltas.aclose()
+
+    async def list_models(self) -> List[str]:
+        return ["gpt-3.5-turbo", "gpt-4"]
+
+def create_backend() -> LLMBackend:
+    """settings.llm_backend에 따라 백엔드 생성 (auto: API 키가 있으면 openai, 없으면 dummy)"""
+    kind = settings.llm_backend
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    if kind == "auto":
+        kind = "openai" if api_key else "dummy"
+
+    if kind == "openai":
+        if not api_key:
+            raise ValueError("LLM_BACKEND=openai requires OPENAI_API_KEY")
+        return OpenAIBackend(api_key, settings.openai_base_url or None)
+    if kind == "mock":
+        logger.info("Using in-process mock LLM backend")
+        return MockBackend()
+    if kind == "dummy":
+        logger.warning("OPENAI_API_KEY not found. LLM functionality will be limited.")
+        return DummyBackend()
+    raise ValueError(f"Unknown LLM backend: {kind}")
+
+# LLM 백엔드 (첫 사용 시 생성)
+_backend: Optional[LLMBackend] = None
+
+def get_backend() -> LLMBackend:
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+def set_backend(new_backend: Optional[LLMBackend]) -> Optional[LLMBackend]:
+    """백엔드 교체 (테스트/벤치마크용) - 이전 백엔드 반환 (아직 생성 전이면 None, None으로 되돌리면 다시 지연 생성)"""
+    global _backend
+    previous, _backend = _backend, new_backend
+    return previous
+
+class LLMError(Exception):
+    """재시도 후에도 실패한 LLM 호출 (raise_errors=True일 때 ask_llm에서 발생)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class TokenBucket:
+    """분당 허용량을 초당 비율로 채우는 토큰 버킷 (per_minute가 0이면 제한 없음)"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """amount만큼 토큰이 찰 때까지 대기 후 차감"""
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class RateLimiter:
+    """
+    OpenAI 호출 공용 제한기
+
+    - RPM/TPM 토큰 버킷으로 분당 요청 수/토큰 수 제한
+    - AIMD 동시성: 정상 응답마다 한도를 조금씩 늘리고(가산), 429나 지연 급증 시 절반으로 줄임(승산)
+    - 429의 Retry-After 동안은 모든 요청을 멈추고, 재시도는 지터를 섞은 지수 백오프로 분산
+    """
+
+    def __init__(
+        self,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        decrease_factor: float = 0.5,
+        latency_spike_factor: float = 2.0,
+        latency_spike_samples: int = 2,
+        cooldown: float = 2.0
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        # 지연 분포의 꼬리에 걸린 호출 하나로 한도를 줄이지 않도록, 같은 기준선에서 연속으로 이만큼 급증해야 감소
+        self.latency_spike_samples = max(1, latency_spike_samples)
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        # (호출 위치, 스트리밍 여부)별 지연 시간 기준선 (EWMA) - 긴 자유 생성과 짧은 JSON 평가처럼 응답 길이가 다르거나
+        # 첫 토큰 지연(스트리밍)과 전체 완료 지연(일반)처럼 성격이 다른 요청끼리 비교하지 않도록 분리
+        self._baselines: Dict[Tuple[str, bool], float] = {}
+        self._spike_streaks: Dict[Tuple[str, bool], int] = {}
+        self._slot_freed = asyncio.Condition()
+        self.stats_counters = {"requests": 0, "rate_limited": 0, "retries": 0, "latency_backoffs": 0}
+
+    async def acquire(self, estimated_tokens: int):
+        """요청 슬롯 확보 (Retry-After 대기 → 동시성 한도 → RPM/TPM 버킷 순)"""
+        while (delay := self.paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        async with self._slot_freed:
+            await self._slot_freed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+        except BaseException:
+            await self.release()
+            raise
+        self.stats_counters["requests"] += 1
+
+    async def release(self):
+        async with self._slot_freed:
+            self.in_flight -= 1
+            self._slot_freed.notify_all()
+
+    def record_success(self, latency: float, call_site: str = "other", streamed: bool = False):
+        """
+        정상 응답: 지연 급증이면 감소, 아니면 한도 가산 증가 (한도당 +1/limit → 한 라운드에 약 +1)
+
+        streamed=True이면 latency는 첫 토큰까지의 시간이며 일반 호출과 별도의 기준선과 비교
+        급증은 같은 기준선에서 latency_spike_samples번 연속일 때만 반영 (급증한 호출은 한도를 늘리지 않음)
+        """
+        key = (call_site, streamed)
+        baseline = self._baselines.get(key)
+        self._baselines[key] = latency if baseline is None else 0.8 * baseline + 0.2 * latency
+        if baseline is not None and latency > baseline * self.latency_spike_factor:
+            streak = self._spike_streaks[key] = self._spike_streaks.get(key, 0) + 1
+            if streak >= self.latency_spike_samples and self._decrease("latency spike"):
+                self.stats_counters["latency_backoffs"] += 1
+            return
+        self._spike_streaks[key] = 0
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    def record_rate_limited(self, retry_after: Optional[float]):
+        """429: 동시성 한도 감소 및 Retry-After 동안 전체 요청 일시 중지"""
+        self.stats_counters["rate_limited"] += 1
+        self._decrease("rate limited")
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def _decrease(self, reason: str) -> bool:
+        # 동시에 실패한 요청들로 한도가 연쇄적으로 줄지 않도록 cooldown 동안 한 번만 감소
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return False
+        self._last_decrease = now
+        previous = self.limit
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+        logger.warning(f"LLM concurrency limit {previous:.1f} -> {self.limit:.1f} ({reason})")
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "rpm_limit": round(self.requests.rate * 60),
+            "tpm_limit": round(self.tokens.rate * 60),
+            **self.stats_counters,
+        }
+
+# 공용 제한기 (이벤트 루프 안에서 지연 생성)
+_rate_limiter: Optional[RateLimiter] = None
+
+def _get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            rpm=settings.llm_rpm_limit,
+            tpm=settings.llm_tpm_limit,
+            max_concurrency=settings.llm_max_in_flight,
+            min_concurrency=settings.llm_min_in_flight,
+            latency_spike_factor=settings.llm_latency_spike_factor,
+            latency_spike_samples=settings.llm_latency_spike_samples,
+        )
+    return _rate_limiter
+
+def get_rate_limiter_stats() -> Dict:
+    return _get_rate_limiter().stats()
+
+def estimate_text_tokens(text: str) -> int:
+    """대략적인 토큰 수 (한글 기준 약 2글자당 1토큰)"""
+    return (len(text) + 1) // 2
+
+def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """TPM 차감량 추정 - 제공자와 같이 프롬프트 토큰 + max_tokens 기준"""
+    return sum(estimate_text_tokens(m.get("content", "")) for m in messages) + max_tokens
+
+def _record_usage(call_site: str, call_usage: TokenUsage, messages: List[Dict[str, str]], output: str, tracker: Optional[UsageTracker] = None):
+    """호출 한 번의 토큰 사용량을 전역/호출자 집계와 /metrics에 기록 (백엔드가 보고하지 않았으면 추정)"""
+    if not call_usage.reported:
+        call_usage.prompt_tokens = sum(estimate_text_tokens(m.get("content", "")) for m in messages)
+        call_usage.completion_tokens = estimate_text_tokens(output)
+        call_usage.estimated = True
+    for target in (usage_totals, tracker):
+        if target is not None:
+            target.record(call_site, call_usage)
+    llm_tokens.inc(call_usage.prompt_tokens, call_site=call_site, kind="prompt")
+    llm_tokens.inc(call_usage.completion_tokens, call_site=call_site, kind="completion")
+
+def _record_cache_hit(call_site: str, tracker: Optional[UsageTracker] = None):
+    for target in (usage_totals, tracker):
+        if target is not None:
+            target.record_cache_hit(call_site)
+
+def _retryable_errors() -> tuple:
+    """재시도할 예외 타입 (except 절에서 예외가 발생했을 때만 평가되므로 openai를 미리 import하지 않음)"""
+    import openai
+    return (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """응답의 retry-after-ms / retry-after 헤더 (초)"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP 날짜 형식은 지원하지 않음 (백오프로 대체)
+        return None
+    return None
+
+def _retry_delay(attempt: int, retry_after: Optional[float]) -> float:
+    """full jitter 지수 백오프, Retry-After가 있으면 그 이상 대기 (동시 재시도가 몰리지 않도록 지터 추가)"""
+    backoff = random.uniform(0, min(settings.llm_retry_max_delay, settings.llm_retry_base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        backoff = max(backoff, retry_after + random.uniform(0, settings.llm_retry_base_delay))
+    return min(backoff, settings.llm_retry_max_delay)
+
+async def _handle_retryable(error: Exception, attempt: int) -> None:
+    """재시도 가능한 오류 처리 - 재시도 횟수를 넘으면 다시 발생, 아니면 백오프 후 반환"""
+    import openai
+
+    limiter = _get_rate_limiter()
+    retry_after = _retry_after(error)
+    if isinstance(error, openai.RateLimitError):
+        limiter.record_rate_limited(retry_after)
+    if attempt >= settings.llm_max_retries:
+        raise error
+    delay = _retry_delay(attempt, retry_after)
+    limiter.stats_counters["retries"] += 1
+    logger.warning(f"LLM request failed ({type(error).__name__}), retry {attempt + 1}/{settings.llm_max_retries} in {delay:.2f}s")
+    await asyncio.sleep(delay)
+
+async def _create_chat_completion(
+    messages: List[Dict[str, str]],
+    model: str,
+    temperature: Optional[float] = None,
+    max_tokens: int = 500,
+    timeout: Optional[float] = None,
+    usage: Optional[TokenUsage] = None,
+    call_site: str = "other"
+) -> str:
+    """
+    공용 제한기(RPM/TPM, 적응형 동시성)와 재시도, 호출별 타임아웃을 적용하여 chat completion 요청
+
+    call_site는 지연 급증 판단 기준선을 호출 위치별로 나누는 데 사용
+    """
+    limiter = _get_rate_limiter()
+    for attempt in range(settings.llm_max_retries + 1):
+        await limiter.acquire(_estimate_tokens(messages, max_tokens))
+        started = time.monotonic()
+        try:
+            result = await get_backend().complete(
+                messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                usage=usage
+            )
+        except _retryable_errors() as e:
+            await limiter.release()
+            await _handle_retryable(e, attempt)
+            continue
+        except BaseException:
+            await limiter.release()
+            raise
+        limiter.record_success(time.monotonic() - started, call_site)
+        await limiter.release()
+        return result
+
+async def _stream_chat_completion(
+    messages: List[Dict[str, str]],
+    model: str,
+    temperature: Optional[float] = None,
+    max_tokens: int = 500,
+    timeout: Optional[float] = None,
+    usage: Optional[TokenUsage] = None,
+    call_site: str = "other"
+) -> AsyncIterator[str]:
+    """
+    _create_chat_completion의 스트리밍 버전 - 스트림이 끝날 때까지 슬롯을 점유
+
+    첫 조각을 받기 전의 실패만 재시도하고(이미 전달한 내용을 되돌릴 수 없으므로), 지연 시간은 첫 토큰 기준으로
+    일반 호출과 분리된 스트리밍 기준선에 기록
+    """
+    limiter = _get_rate_limiter()
+    for attempt in range(settings.llm_max_retries + 1):
+        await limiter.acquire(_estimate_tokens(messages, max_tokens))
+        started = time.monotonic()
+        received = False
+        try:
+            async for delta in get_backend().stream(
+                messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                usage=usage
+            ):
+                if not received:
+                    received = True
+                    limiter.record_success(time.monotonic() - started, call_site, streamed=True)
+                yield delta
+            return
+        except _retryable_errors() as e:
+            if received:
+                raise
+            error = e
+        finally:
+            await limiter.release()
+        await _handle_retryable(error, attempt)
+
+class ResponseCache:
+    """
+    LLM 응답 캐시 - (모델, 메시지, temperature, max_tokens)를 해시한 키로 응답을 저장
+
+    메모리 LRU(TTL 적용)를 먼저 조회하고, db_path가 지정되면 재시작 후에도
+    유지되는 SQLite 계층을 추가로 조회한다.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, db_path: str = ""):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: Optional[float], max_tokens: int) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if time.time() - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: str, created_at: float):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_disk(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row[1] > self.ttl:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+        return row
+
+    def _set_disk(self, key: str, value: str, created_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, created_at),
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._get_memory(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._get_disk, key)
+            if row:
+                # 디스크에서 찾은 항목은 메모리 계층으로 승격
+                self._set_memory(key, row[0], row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        created_at = time.time()
+        self._set_memory(key, value, created_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, value, created_at)
+
+    def clear(self):
+        self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "disk_enabled": self._db is not None,
+        }
+
+# 응답 캐시 초기화
+response_cache = ResponseCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl=settings.llm_cache_ttl,
+    db_path=settings.llm_cache_path,
+) if settings.llm_cache_enabled else None
+
+def get_usage_stats() -> Dict:
+    """프로세스 전체 토큰 사용량/비용 (호출 위치별)"""
+    return usage_totals.to_dict()
 
-async def ask_llm(prompt: str, user_input: str, model: str = "gpt-3.5-turbo") -> str:
+def get_cache_stats() -> Dict:
+    """응답 캐시 통계 반환"""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+async def close_client():
+    """커넥션 풀 정리 (애플리케이션 종료 시 호출, 생성되지 않은 백엔드는 건너뜀)"""
+    if _backend is not None:
+        await _backend.aclose()
+
+def _import_sdk():
+    import openai  # noqa: F401
+
+async def warm_up(connections: Optional[int] = None):
+    """
+    첫 요청 전에 LLM 호출 경로를 미리 준비 (애플리케이션 시작 후 백그라운드에서 호출)
+
+    openai SDK import, 백엔드(클라이언트) 생성, 커넥션 열기를 미리 해 두어 첫 요청이 이 비용을 치르지 않게 한다.
+    실패해도 첫 요청에서 다시 시도되므로 경고만 남긴다.
+
+    Args:
+        connections: 미리 열어 둘 커넥션 수 (기본값: settings.llm_warmup_connections, 0이면 열지 않음)
+    """
+    started = time.perf_counter()
+    connections = settings.llm_warmup_connections if connections is None else connections
+    # import는 스레드에서 실행하여 그동안에도 이벤트 루프가 요청(/health 등)을 처리하도록 함
+    await asyncio.to_thread(_import_sdk)
+    backend = get_backend()
+    if connections > 0:
+        try:
+            await backend.warm_up(connections)
+        except Exception as e:
+            logger.warning(f"LLM warm-up request failed: {e!r}")
+    logger.info(f"LLM backend '{backend.name}' warmed up in {time.perf_counter() - started:.2f}s")
+
+async def ask_llm(
+    prompt: str,
+    user_input: str,
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.3,
+    max_tokens: int = 500,
+    timeout: Optional[float] = None,
+    use_cache: bool = True,
+    raise_errors: bool = False,
+    call_site: str = "other",
+    usage: Optional[UsageTracker] = None
+) -> str:
     """
     LLM에 프롬프트를 전송하고 응답을 받는 함수
-    
+
     Args:
         prompt: 시스템 프롬프트
         user_input: 사용자 입력
         model: 사용할 모델명
-        
+        temperature: 샘플링 temperature (일관성 있는 응답을 위해 기본값은 낮게 설정)
+        max_tokens: 최대 생성 토큰 수
+        timeout: 호출별 타임아웃(초), 지정하지 않으면 settings.llm_timeout 사용
+        use_cache: False이면 응답 캐시를 건너뜀 (샘플링 다양성이 필요한 경우)
+        raise_errors: True이면 오류 메시지를 반환하는 대신 LLMError 발생 (오류 메시지가 출력으로 채점되지 않도록)
+        call_site: 호출 위치 (/metrics 라벨, 토큰 사용량 집계 단위)
+        usage: 전역 집계 외에 토큰 사용량을 누적할 집계 (최적화 실행, 채팅 세션 등)
+
+    Returns:
+        LLM 응답 문자열
+
+    Raises:
+        LLMError: raise_errors=True이고 재시도 후에도 호출이 실패한 경우
+    """
+    messages = [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": user_input}
+    ]
+    return await ask_llm_messages(
+        messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        use_cache=use_cache,
+        raise_errors=raise_errors,
+        call_site=call_site,
+        usage=usage
+    )
+
+async def ask_llm_messages(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-3.5-turbo",
+    temperature: Optional[float] = 0.3,
+    max_tokens: int = 500,
+    timeout: Optional[float] = None,
+    use_cache: bool = True,
+    raise_errors: bool = False,
+    call_site: str = "other",
+    usage: Optional[UsageTracker] = None
+) -> str:
+    """
+    ask_llm의 메시지 목록 버전 - 대화 이력 등 여러 턴을 그대로 전달할 때 사용
+
+    Args:
+        messages: {"role", "content"} 메시지 목록
+        나머지는 ask_llm과 동일
+
     Returns:
         LLM 응답 문자열
     """
     try:
-        if not client:
-            # 환경변수가 없을 때는 더미 응답 반환 (테스트용)
-            logger.warning("LLM client not available, returning dummy response")
-            return f"테스트 응답: {user_input}에 대한 답변입니다."
-        
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": user_input}
-        ]
-        
+        cache_key = None
+        if use_cache and response_cache is not None:
+            cache_key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM cache hit for model: {model}")
+                _record_cache_hit(call_site, usage)
+                return cached
+
         logger.info(f"Sending request to LLM model: {model}")
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,  # 일관성 있는 응답을 위해 낮은 temperature
-            max_tokens=500
-        )
-        
-        result = response.choices[0].message.content.strip()
+
+        llm_calls.inc(call_site=call_site)
+        call_usage = TokenUsage()
+        with llm_latency.time(call_site=call_site):
+            result = await _create_chat_completion(
+                messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                usage=call_usage,
+                call_site=call_site
+            )
+        _record_usage(call_site, call_usage, messages, result, usage)
         logger.info(f"LLM response received: {result[:100]}...")
-        
+
+        # 정상 응답만 캐시 (오류 메시지는 저장하지 않음)
+        if cache_key is not None:
+            await response_cache.set(cache_key, result)
+
         return result
-        
-    except openai.APIConnectionError as e:
-        logger.error(f"LLM connection error: {e}")
+
+    except Exception as e:
+        llm_errors.inc(call_site=call_site, error=type(e).__name__)
+        message = _error_message(e)
+        if raise_errors:
+            raise LLMError(message, getattr(e, "status_code", None)) from e
+        return message
+
+async def ask_llm_stream(
+    prompt: str,
+    user_input: str,
+    model: str = "gpt-3.5-turbo",
+    temperature: float = 0.3,
+    max_tokens: int = 500,
+    timeout: Optional[float] = None,
+    use_cache: bool = True,
+    raise_errors: bool = False,
+    call_site: str = "other",
+    usage: Optional[UsageTracker] = None
+) -> AsyncIterator[str]:
+    """
+    ask_llm의 스트리밍 버전 - 응답을 토큰 조각(델타) 단위로 전달하는 비동기 이터레이터
+
+    첫 토큰이 도착하는 즉시 전달되므로 전체 응답을 기다리지 않고 화면에 표시할 수 있다.
+    캐시 적중 시에는 전체 응답을 한 번에 전달하고, 오류 발생 시 ask_llm과 같은 오류 메시지를
+    (아직 전달한 델타가 없으면) 하나의 델타로 전달한다. raise_errors=True이면 대신 LLMError가 발생한다.
+
+    Args:
+        ask_llm과 동일
+
+    Yields:
+        응답 텍스트 조각
+    """
+    messages = [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": user_input}
+    ]
+    chunks: List[str] = []
+
+    try:
+        cache_key = None
+        if use_cache and response_cache is not None:
+            cache_key = ResponseCache.make_key(model, messages, temperature, max_tokens)
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM cache hit for model: {model}")
+                _record_cache_hit(call_site, usage)
+                yield cached
+                return
+
+        logger.info(f"Sending streaming request to LLM model: {model}")
+
+        llm_calls.inc(call_site=call_site)
+        call_usage = TokenUsage()
+        started = time.perf_counter()
+        async for delta in _stream_chat_completion(
+            messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            usage=call_usage,
+            call_site=call_site
+        ):
+            # 전체 응답은 complete()와 같이 앞뒤 공백을 제거한 형태가 되도록 선행 공백 제거
+            if not chunks:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            chunks.append(delta)
+            yield delta
+        llm_latency.observe(time.perf_counter() - started, call_site=call_site)
+
+        result = "".join(chunks).rstrip()
+        _record_usage(call_site, call_usage, messages, result, usage)
+        logger.info(f"LLM streaming response received: {result[:100]}...")
+
+        if cache_key is not None and result:
+            await response_cache.set(cache_key, result)
+
+    except Exception as e:
+        llm_errors.inc(call_site=call_site, error=type(e).__name__)
+        message = _error_message(e)
+        if raise_errors:
+            raise LLMError(message, getattr(e, "status_code", None)) from e
+        if not chunks:
+            yield message
+
+def _error_message(error: Exception) -> str:
+    """LLM 호출 예외를 로그로 남기고 사용자에게 보여줄 오류 메시지로 변환"""
+    import openai
+
+    if isinstance(error, openai.APIConnectionError):
+        # APITimeoutError 포함
+        logger.error(f"LLM connection error: {error}")
         return "죄송합니다. LLM 서비스에 연결할 수 없습니다. 네트워크 연결을 확인해주세요."
-        
-    except openai.APIStatusError as e:
-        logger.error(f"LLM API error: {e.status_code} - {e.response}")
-        return f"LLM 서비스 오류가 발생했습니다. (코드: {e.status_code})"
-        
-    except openai.AuthenticationError as e:
-        logger.error(f"LLM authentication error: {e}")
+
+    if isinstance(error, openai.AuthenticationError):
+        logger.error(f"LLM authentication error: {error}")
         return "LLM 인증 오류가 발생했습니다. API 키를 확인해주세요."
-        
-    except Exception as e:
-        logger.error(f"Unexpected LLM error: {e}")
-        return "예상치 못한 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
+
+    if isinstance(error, openai.APIStatusError):
+        logger.error(f"LLM API error: {error.status_code} - {error.response}")
+        return f"LLM 서비스 오류가 발생했습니다. (코드: {error.status_code})"
+
+    logger.error(f"Unexpected LLM error: {error}")
+    return "예상치 못한 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
 
 async def ask_llm_with_context(
-    prompt: str, 
-    user_input: str, 
-    context: str = "", 
-    model: str = "gpt-3.5-turbo"
+    prompt: str,
+    user_input: str,
+    context: str = "",
+    model: str = "gpt-3.5-turbo",
+    timeout: Optional[float] = None,
+    usage: Optional[UsageTracker] = None
 ) -> str:
     """
     컨텍스트 정보를 포함하여 LLM에 질문하는 함수
-    
+
     Args:
         prompt: 시스템 프롬프트
         user_input: 사용자 입력
         context: 추가 컨텍스트 정보
         model: 사용할 모델명
-        
+        timeout: 호출별 타임아웃(초)
+        usage: 전역 집계 외에 토큰 사용량을 누적할 집계
+
     Returns:
         LLM 응답 문자열
     """
@@ -95,66 +962,75 @@ async def ask_llm_with_context(
         messages = [
             {"role": "system", "content": prompt}
         ]
-        
+
         if context:
             messages.append({"role": "system", "content": f"참고 정보: {context}"})
-            
+
         messages.append({"role": "user", "content": user_input})
-        
+
         logger.info(f"Sending contextual request to LLM model: {model}")
-        
-        response = client.chat.completions.create(
+
+        result = await ask_llm_messages(
+            messages,
             model=model,
-            messages=messages,
             temperature=0.3,
-            max_tokens=2000
+            max_tokens=2000,
+            timeout=timeout,
+            use_cache=False,
+            raise_errors=True,
+            call_site="context",
+            usage=usage
         )
-        
-        result = response.choices[0].message.content.strip()
         logger.info(f"LLM contextual response received: {result[:100]}...")
-        
+
         return result
-        
+
     except Exception as e:
         logger.error(f"Error in contextual LLM request: {e}")
         return "컨텍스트 기반 응답 생성 중 오류가 발생했습니다."
 
-def get_available_models() -> list:
+async def get_available_models() -> list:
     """
     사용 가능한 OpenAI 모델 목록을 반환
-    
+
     Returns:
         모델 목록
     """
     try:
-        models = client.models.list()
-        return [model.id for model in models.data]
+        return await get_backend().list_models()
     except Exception as e:
         logger.error(f"Error fetching models: {e}")
         return ["gpt-3.5-turbo", "gpt-4"]  # 기본값 반환
 
-def test_llm_connection() -> dict:
+async def test_llm_connection() -> dict:
     """
     LLM 연결 상태를 테스트
-    
+
     Returns:
         테스트 결과 딕셔너리
     """
     try:
         # 간단한 테스트 요청
-        response = client.chat.completions.create(
+        # 실제 연결을 확인해야 하므로 캐시 미사용
+        response = await ask_llm_messages(
+            [{"role": "user", "content": "Hello"}],
             model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": "Hello"}],
-            max_tokens=10
+            temperature=None,
+            max_tokens=10,
+            timeout=10,
+            use_cache=False,
+            raise_errors=True,
+            call_site="api_test"
         )
-        
+
         return {
             "status": "success",
+            "backend": get_backend().name,
             "model": "gpt-3.5-turbo",
-            "response": response.choices[0].message.content,
+            "response": response,
             "timestamp": "now"
         }
-        
+
     except Exception as e:
         return {
             "status": "error",
@@ -1,9 +1,11 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from typing import List, Dict, Optional
-import json
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from typing import List, Dict, Literal, Optional
 import uuid
 from datetime import datetime
 from pydantic import BaseModel
@@ -12,7 +14,18 @@ import logging
 from config import settings
 from threading import Event
 import traceback
-from autopromptix import optimize_prompt_simple, optimize_prompt_streaming, ask_llm
+import math
+import time
+from autopromptix_efficient import optimize_prompt_simple, optimize_prompt_streaming, ask_llm
+from llm import ask_llm_messages, close_client, get_cache_stats, get_rate_limiter_stats, get_usage_stats, warm_up as warm_up_llm
+from jobs import Job, QueueFullError, job_manager
+from state import state_backend
+from sessions import CHAT_MESSAGE_CHANNEL, session_registry
+from broadcast import broadcaster
+from chat_context import build_chat_messages
+from serialization import FastJSONResponse, dumps, loads, send_payload
+from metrics import chat_reply_latency, registry as metrics_registry, websocket_connections
+from scorer_simple import warm_up as warm_up_scorer
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +34,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="AI-Powered Customer Support & Prompt Optimization Platform", 
     version="2.0.0",
-    description="통합된 고객 지원 채팅 및 프롬프트 최적화 플랫폼"
+    description="통합된 고객 지원 채팅 및 프롬프트 최적화 플랫폼",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware for frontend communication
@@ -33,18 +47,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 한글 인코딩을 위한 미들웨어
-@app.middleware("http")
-async def add_charset_header(request: Request, call_next):
-    response = await call_next(request)
-    if "application/json" in response.headers.get("content-type", ""):
-        response.headers["content-type"] = "application/json; charset=utf-8"
-    return response
+# 오류 응답도 FastJSONResponse로 전송 (charset=utf-8 포함)
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    return FastJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    return FastJSONResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
+
+@app.on_event("startup")
+async def start_job_workers():
+    """공유 상태 pub/sub 수신, 최적화 작업 워커 풀, 유휴 채팅 세션 정리 태스크 시작"""
+    await state_backend.start()
+    job_manager.start()
+    session_registry.start()
+
+async def warm_up_dependencies():
+    """LLM 클라이언트 생성/커넥션 열기와 채점 의존성 로드 (첫 요청이 이 비용을 치르지 않도록)"""
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(warm_up_llm(), asyncio.to_thread(warm_up_scorer))
+    except Exception as e:
+        # 첫 사용 시 다시 시도되므로 경고만 남김
+        logger.warning(f"Startup warm-up failed: {e!r}")
+        return
+    logger.info(f"Startup warm-up finished in {time.perf_counter() - started:.2f}s")
+
+@app.on_event("startup")
+async def start_warm_up():
+    """워밍업은 백그라운드에서 실행 (/health 등은 기다리지 않고 바로 응답)"""
+    if settings.startup_warmup:
+        app.state.warm_up_task = asyncio.create_task(warm_up_dependencies())
+
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    """실행 중인 작업 취소 후 LLM 커넥션 풀 정리"""
+    warm_up_task = getattr(app.state, "warm_up_task", None)
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    await session_registry.stop()
+    await job_manager.stop()
+    await state_backend.close()
+    await close_client()
 
 # In-memory storage for demo purposes (in production, use a database)
-chat_sessions: Dict[str, Dict] = {}
-active_connections: Dict[str, WebSocket] = {}
+# 채팅 세션은 session_registry(공유 상태 백엔드 사용 가능), 최적화 태스크는 WebSocket이 연결된 워커에 보관
 optimization_stop_events: Dict[str, Event] = {}
+optimization_tasks: Dict[str, asyncio.Task] = {}
+# 세션별 (웹소켓, 완료된 평가 목록) - 다른 워커에서 온 중단 요청 처리용
+optimization_runs: Dict[str, tuple] = {}
+
+# 최적화 중단 요청 채널 - {"session_id"}, 웹소켓이 연결된 워커에서 처리
+OPTIMIZATION_STOP_CHANNEL = "optimization.stop"
 
 # ============================================================================
 # CHAT SYSTEM MODELS AND ENDPOINTS
@@ -56,13 +111,6 @@ class ChatMessage(BaseModel):
     sender: str
     timestamp: Optional[datetime] = None
 
-    def dict(self, *args, **kwargs):
-        # Convert datetime to ISO string for JSON serialization
-        d = super().dict(*args, **kwargs)
-        if d.get('timestamp'):
-            d['timestamp'] = d['timestamp'].isoformat()
-        return d
-
 class ChatSession(BaseModel):
     session_id: str
     customer_name: str
@@ -70,15 +118,6 @@ class ChatSession(BaseModel):
     created_at: datetime
     last_message_at: Optional[datetime] = None
 
-    def dict(self, *args, **kwargs):
-        # Convert datetime to ISO string for JSON serialization
-        d = super().dict(*args, **kwargs)
-        if d.get('created_at'):
-            d['created_at'] = d['created_at'].isoformat()
-        if d.get('last_message_at'):
-            d['last_message_at'] = d['last_message_at'].isoformat()
-        return d
-
 class CreateSessionRequest(BaseModel):
     customer_name: str
 
@@ -108,24 +147,28 @@ async def create_chat_session(request: CreateSessionRequest):
         customer_name=request.customer_name,
         created_at=datetime.now()
     )
-    chat_sessions[session_id] = {
-        "session": session.dict(),
-        "messages": []
-    }
+    await session_registry.create(session_id, session.model_dump(mode="json"))
     logger.info(f"Created chat session: {session_id} for {request.customer_name}")
     return session
 
 @app.get("/api/chat/sessions")
 async def get_chat_sessions():
     """Get all active chat sessions"""
-    return [session["session"] for session in chat_sessions.values()]
+    # 저장된 세션은 이미 JSON 값이므로 jsonable_encoder를 거치지 않고 바로 직렬화
+    return FastJSONResponse(await session_registry.list_sessions())
+
+@app.get("/api/chat/stats")
+async def get_chat_stats():
+    """채팅 세션 수, 메시지 수, 추정 메모리 사용량, 연결별 송신 큐 상태 (워커 크기 산정용)"""
+    return {**session_registry.stats(), "broadcast": broadcaster.stats()}
 
 @app.get("/api/chat/session/{session_id}")
 async def get_chat_session(session_id: str):
     """Get a specific chat session with messages"""
-    if session_id not in chat_sessions:
+    entry = await session_registry.load(session_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return chat_sessions[session_id]
+    return FastJSONResponse(entry.to_dict())
 
 @app.websocket("/ws/chat/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
@@ -133,13 +176,15 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
     logger.info(f"WebSocket connection accepted for session: {session_id}")
     
-    if session_id not in chat_sessions:
+    if await session_registry.load(session_id) is None:
         logger.error(f"Session not found: {session_id}")
         await websocket.close(code=4004, reason="Session not found")
         return
     
     # Store the connection
-    active_connections[session_id] = websocket
+    session_registry.connect(session_id)
+    subscriber = broadcaster.subscribe(session_id, websocket)
+    websocket_connections.inc(endpoint="chat")
     logger.info(f"WebSocket connection stored for session: {session_id}")
     
     try:
@@ -149,7 +194,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             data = await websocket.receive_text()
             logger.info(f"Received message from session {session_id}: {data}")
             
-            message_data = json.loads(data)
+            message_data = loads(data)
             
             # Create message object
             message = ChatMessage(
@@ -159,15 +204,10 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 timestamp=datetime.now()
             )
             
-            # Store message
-            chat_sessions[session_id]["messages"].append(message.dict())
-            chat_sessions[session_id]["session"]["last_message_at"] = message.timestamp.isoformat()
+            # Store message and broadcast it to all connections for this session (on every worker)
+            await session_registry.post_message(session_id, message.model_dump(mode="json"))
             logger.info(f"Stored message for session {session_id}: {message_data['message']}")
             
-            # Broadcast message to all connections for this session
-            await broadcast_message(session_id, message.dict())
-            logger.info(f"Broadcasted message for session {session_id}")
-            
             # If message is from customer, generate AI response
             if message_data["sender"] == "customer":
                 logger.info(f"Generating AI response for session {session_id}")
@@ -175,121 +215,210 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for session: {session_id}")
-        # Remove connection when client disconnects
-        if session_id in active_connections:
-            del active_connections[session_id]
     except Exception as e:
         logger.error(f"Error in WebSocket for session {session_id}: {e}")
-        if session_id in active_connections:
-            del active_connections[session_id]
+    finally:
+        # Remove connection when client disconnects (다른 탭/상담원의 연결은 유지)
+        session_registry.disconnect(session_id)
+        websocket_connections.dec(endpoint="chat")
+        await broadcaster.unsubscribe(subscriber)
+
+
+def build_partial_results(trials: List[Dict]) -> Dict:
+    """중단 시점까지 평가가 끝난 변이들로 부분 결과 구성"""
+    if not trials:
+        return {"completed_trials": 0, "all_trials": []}
+    best = max([trial for trial in trials if trial.get("judged", True)] or trials, key=lambda trial: trial["score"])
+    return {
+        "best_prompt": best["prompt"],
+        "best_output": best["output"],
+        "best_score": round(best["score"], 3),
+        "best_variant": best["name"],
+        "completed_trials": len(trials),
+        "all_trials": trials
+    }
+
+async def run_optimization(websocket: WebSocket, session_id: str, message_data: Dict, completed_trials: List[Dict]):
+    """최적화 스트림을 웹소켓으로 전달 (세션별 태스크로 실행되어 중단/연결 종료 시 취소됨)"""
+    stream = optimize_prompt_streaming(
+        user_input=message_data.get("user_input", ""),
+        expected_output=message_data.get("expected_output", ""),
+        product_name=message_data.get("product_name", ""),
+        exclude_keywords=message_data.get("exclude_keywords", []),
+        custom_mutators=message_data.get("custom_mutators", []),
+        evaluation_weights=message_data.get("evaluation_weights", {}),
+        stop_event=optimization_stop_events[session_id],
+        judge_mode=message_data.get("judge_mode"),
+        prefilter_top_k=message_data.get("prefilter_top_k"),
+        prefilter_margin=message_data.get("prefilter_margin"),
+        stream_tokens=message_data.get("stream_tokens"),
+        test_inputs=message_data.get("test_inputs", []),
+        race_initial_inputs=message_data.get("race_initial_inputs")
+    )
+    try:
+        # Send initial status
+        initial_status = {
+            "type": "status",
+            "data": {
+                "message": "Starting prompt optimization...",
+                "step": "init"
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+        logger.info(f"Sending initial status: {initial_status}")
+        await send_payload(websocket, initial_status)
+
+        # Start streaming optimization
+        logger.info(f"Starting streaming optimization for session {session_id}")
+        async for result in stream:
+            message = {
+                "type": result["type"],
+                "data": result["data"],
+                "timestamp": datetime.now().isoformat()
+            }
+            # 토큰 델타는 양이 많으므로 로그 생략
+            if result["type"] != "llm_delta":
+                logger.info(f"Sending streaming result: {result['type']} - {result.get('data', {}).get('message', 'No message')}")
+            if result["type"] == "llm_response":
+                logger.info(f"LLM Response for {result['data']['name']}: {result['data']['output'][:100]}...")
+            if result["type"] == "evaluation_result":
+                completed_trials.append(result["data"]["trial"])
+
+            # Send message immediately
+            await send_payload(websocket, message)
+
+        # Send completion message
+        completion_message = {
+            "type": "complete",
+            "message": "Optimization completed",
+            "timestamp": datetime.now().isoformat()
+        }
+        logger.info(f"Sending completion message: {completion_message}")
+        await send_payload(websocket, completion_message)
+
+    except asyncio.CancelledError:
+        logger.info(f"Optimization task cancelled for session {session_id}")
+        raise
+    except Exception as e:
+        logger.error(f"Error in optimization WebSocket: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        try:
+            await send_payload(websocket, {
+                "type": "error",
+                "message": f"Optimization error: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception:
+            pass
+    finally:
+        # 전송 중에 취소되어도 스트림 안의 평가 작업(진행 중인 LLM 요청)까지 즉시 정리
+        await stream.aclose()
+
+async def cancel_optimization(session_id: str):
+    """세션의 최적화 태스크를 취소하고 끝날 때까지 대기 (진행 중인 LLM 요청도 함께 취소됨)"""
+    if session_id in optimization_stop_events:
+        optimization_stop_events[session_id].set()
+    task = optimization_tasks.pop(session_id, None)
+    if task and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+async def stop_optimization(session_id: str, websocket: WebSocket, completed_trials: List[Dict]):
+    """최적화를 중단하고 그때까지의 부분 결과 전송"""
+    await cancel_optimization(session_id)
+    await send_payload(websocket, {
+        "type": "optimization_stopped",
+        "message": "Optimization stopped by user",
+        "data": {"partial_results": build_partial_results(completed_trials)},
+        "timestamp": datetime.now().isoformat()
+    })
 
+async def handle_optimization_stop(event: Dict):
+    """다른 워커(또는 REST)에서 보낸 중단 요청 - 이 워커에 연결된 세션이면 중단 후 연결 종료"""
+    session_id = event["session_id"]
+    run = optimization_runs.pop(session_id, None)
+    if run is None:
+        return
+    websocket, completed_trials = run
+    logger.info(f"Received remote stop signal for session {session_id}")
+    await stop_optimization(session_id, websocket, completed_trials)
+    await websocket.close()
+
+state_backend.subscribe(OPTIMIZATION_STOP_CHANNEL, handle_optimization_stop)
 
 @app.websocket("/ws/optimization/{session_id}")
 async def optimization_websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time prompt optimization streaming"""
     await websocket.accept()
     logger.info(f"Optimization WebSocket connection accepted for session: {session_id}")
+    completed_trials: List[Dict] = []
+    websocket_connections.inc(endpoint="optimization")
     
     try:
         while True:
-            # Receive message from client
+            # Receive message from client (최적화는 별도 태스크에서 실행되므로 진행 중에도 중단 요청을 받음)
             data = await websocket.receive_text()
             logger.info(f"Received message from session {session_id}: {data}")
             
-            message_data = json.loads(data)
+            message_data = loads(data)
             message_type = message_data.get("type", "optimization_request")
             
             if message_type == "stop_optimization":
                 logger.info(f"Received stop signal for session {session_id}")
-                # Set stop event for this session
-                if session_id in optimization_stop_events:
-                    optimization_stop_events[session_id].set()
-                    logger.info(f"Stop event set for session {session_id}")
-                await websocket.send_text(json.dumps({
-                    "type": "optimization_stopped",
-                    "message": "Optimization stopped by user",
-                    "timestamp": datetime.now().isoformat()
-                }))
+                optimization_runs.pop(session_id, None)
+                await stop_optimization(session_id, websocket, completed_trials)
                 break
             elif message_type == "optimization_request":
-                # Create stop event for this session
+                # 이전 최적화가 진행 중이면 취소하고 새로 시작
+                await cancel_optimization(session_id)
                 optimization_stop_events[session_id] = Event()
-                
-                # Send initial status
-                initial_status = {
-                    "type": "status",
-                    "data": {
-                        "message": "Starting prompt optimization...",
-                        "step": "init"
-                    },
-                    "timestamp": datetime.now().isoformat()
-                }
-                logger.info(f"Sending initial status: {initial_status}")
-                await websocket.send_text(json.dumps(initial_status))
-                
-                # Start streaming optimization
-                logger.info(f"Starting streaming optimization for session {session_id}")
-                async for result in optimize_prompt_streaming(
-                    user_input=message_data.get("user_input", ""),
-                    expected_output=message_data.get("expected_output", ""),
-                    product_name=message_data.get("product_name", ""),
-                    exclude_keywords=message_data.get("exclude_keywords", []),
-                    custom_mutators=message_data.get("custom_mutators", []),
-                    evaluation_weights=message_data.get("evaluation_weights", {}),
-                    stop_event=optimization_stop_events[session_id]
-                ):
-                    message = {
-                        "type": result["type"],
-                        "data": result["data"],
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    logger.info(f"Sending streaming result: {result['type']} - {result.get('data', {}).get('message', 'No message')}")
-                    if result["type"] == "llm_response":
-                        logger.info(f"LLM Response for {result['data']['name']}: {result['data']['output'][:100]}...")
-                    
-                    # Send message immediately
-                    await websocket.send_text(json.dumps(message))
-                
-                # Send completion message
-                completion_message = {
-                    "type": "complete",
-                    "message": "Optimization completed",
-                    "timestamp": datetime.now().isoformat()
-                }
-                logger.info(f"Sending completion message: {completion_message}")
-                await websocket.send_text(json.dumps(completion_message))
+                completed_trials = []
+                optimization_runs[session_id] = (websocket, completed_trials)
+                optimization_tasks[session_id] = asyncio.create_task(
+                    run_optimization(websocket, session_id, message_data, completed_trials)
+                )
             
     except WebSocketDisconnect:
         logger.info(f"Optimization WebSocket disconnected for session: {session_id}")
-        # Clean up stop event
-        if session_id in optimization_stop_events:
-            del optimization_stop_events[session_id]
     except Exception as e:
         logger.error(f"Error in optimization WebSocket: {e}")
-        import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         try:
-            await websocket.send_text(json.dumps({
+            await send_payload(websocket, {
                 "type": "error",
                 "message": f"Optimization error: {str(e)}",
                 "timestamp": datetime.now().isoformat()
-            }))
-        except:
+            })
+        except Exception:
             pass
+    finally:
+        # 중단/연결 종료/오류 등 모든 경로에서 진행 중인 작업 취소 및 세션 상태 정리
+        websocket_connections.dec(endpoint="optimization")
+        optimization_runs.pop(session_id, None)
+        await cancel_optimization(session_id)
+        optimization_stop_events.pop(session_id, None)
 
 async def generate_ai_response(session_id: str, user_message: str):
     """Generate and send AI response for customer messages"""
+    started = time.perf_counter()
     try:
         logger.info(f"Starting AI response generation for session {session_id}")
         # Get conversation history
-        conversation_history = chat_sessions[session_id]["messages"]
-        customer_name = chat_sessions[session_id]["session"]["customer_name"]
-        
+        entry = await session_registry.load(session_id)
+        if entry is None:
+            logger.warning(f"Session {session_id} was evicted before the AI response")
+            return
+        customer_name = entry.session["customer_name"]
+
+        # 최근 턴 + 이전 대화 요약으로 컨텍스트 구성 (입력 토큰은 max_context_length 이내)
+        messages = await build_chat_messages(entry, customer_name)
+
         # Generate AI response
-        ai_response = await ask_llm(
-            f"고객 지원: {user_message}",
-            f"고객 {customer_name}님의 문의에 대해 도움이 되는 답변을 제공해라."
-        )
+        # 같은 메시지를 반복해도 캐시된 동일한 답변이 나오지 않도록 캐시 미사용
+        ai_response = await ask_llm_messages(messages, use_cache=False, call_site="chat_reply", usage=entry.usage)
         
         logger.info(f"AI response generated for session {session_id}: {ai_response[:50]}...")
         
@@ -301,12 +430,8 @@ async def generate_ai_response(session_id: str, user_message: str):
             timestamp=datetime.now()
         )
         
-        # Store AI message
-        chat_sessions[session_id]["messages"].append(ai_message.dict())
-        chat_sessions[session_id]["session"]["last_message_at"] = ai_message.timestamp.isoformat()
-        
-        # Broadcast AI response
-        await broadcast_message(session_id, ai_message.dict())
+        # Store and broadcast AI response
+        await session_registry.post_message(session_id, ai_message.model_dump(mode="json"))
         logger.info(f"AI response broadcasted for session {session_id}")
         
     except Exception as e:
@@ -318,48 +443,63 @@ async def generate_ai_response(session_id: str, user_message: str):
             sender="agent",
             timestamp=datetime.now()
         )
-        chat_sessions[session_id]["messages"].append(fallback_message.dict())
-        await broadcast_message(session_id, fallback_message.dict())
+        await session_registry.post_message(session_id, fallback_message.model_dump(mode="json"))
+    finally:
+        chat_reply_latency.observe(time.perf_counter() - started)
 
-async def broadcast_message(session_id: str, message: dict):
-    """Broadcast message to all connections for a session"""
-    if session_id in active_connections:
-        try:
-            await active_connections[session_id].send_text(json.dumps(message))
-            logger.info(f"Message sent to session {session_id}")
-        except Exception as e:
-            logger.error(f"Error sending message to session {session_id}: {e}")
-            # Remove broken connection
-            del active_connections[session_id]
+async def broadcast_message(event: Dict):
+    """Broadcast a message posted on any worker to this worker's connections for the session (queued per connection, never blocks)"""
+    session_id = event["session_id"]
+    delivered = broadcaster.publish(session_id, event["message"])
+    if delivered:
+        logger.info(f"Message queued for {delivered} connection(s) on session {session_id}")
+
+state_backend.subscribe(CHAT_MESSAGE_CHANNEL, broadcast_message)
 
 @app.post("/api/chat/message")
 async def send_message(message: ChatMessage):
     """Send a message to a chat session (for non-WebSocket clients)"""
-    if message.session_id not in chat_sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
     message.timestamp = datetime.now()
-    chat_sessions[message.session_id]["messages"].append(message.dict())
-    chat_sessions[message.session_id]["session"]["last_message_at"] = message.timestamp.isoformat()
-    
-    # Broadcast to WebSocket connections
-    await broadcast_message(message.session_id, message.dict())
+    payload = message.model_dump(mode="json")
+    # Store and broadcast to WebSocket connections
+    if not await session_registry.post_message(message.session_id, payload):
+        raise HTTPException(status_code=404, detail="Session not found")
     
     # If message is from customer, generate AI response
     if message.sender == "customer":
         await generate_ai_response(message.session_id, message.message)
     
-    return {"status": "sent", "message": message.dict()}
+    return {"status": "sent", "message": payload}
 
 @app.get("/api/llm/test")
 async def test_llm_response(query: str = "Hello"):
     """Test endpoint for LLM responses"""
     try:
-        response = await ask_llm("테스트", query)
+        response = await ask_llm("테스트", query, call_site="api_test")
         return {"query": query, "response": response, "status": "success"}
     except Exception as e:
         return {"query": query, "error": str(e), "status": "error"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 텍스트 형식 지표 (단계별 지연 시간, LLM 호출/오류, 평가 파싱 실패, 웹소켓 연결 수, 채팅 응답 지연 시간)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/llm/usage")
+async def get_llm_usage():
+    """프로세스 전체 LLM 토큰 사용량과 추정 비용 (호출 위치별, 토큰이 많은 순)"""
+    return get_usage_stats()
+
+@app.get("/api/llm/cache")
+async def get_llm_cache_stats():
+    """LLM 응답 캐시 적중률 등 통계"""
+    return get_cache_stats()
+
+@app.get("/api/llm/limiter")
+async def get_llm_limiter_stats():
+    """LLM 호출 제한기 상태 (현재 동시성 한도, 429 횟수, 재시도 횟수 등)"""
+    return get_rate_limiter_stats()
+
 # ============================================================================
 # PROMPT OPTIMIZATION SYSTEM MODELS AND ENDPOINTS
 # ============================================================================
@@ -370,6 +510,11 @@ class OptimizeRequest(BaseModel):
     product_name: str
     exclude_keywords: List[str]
     custom_mutators: List[str] = []
+    judge_mode: Optional[Literal["single", "batch"]] = None  # 기본값은 설정값
+    prefilter_top_k: Optional[int] = None  # 로컬 점수 상위 k개만 AI 평가 (0이면 사용 안 함)
+    prefilter_margin: Optional[float] = None  # 선두 대비 이 값 이상 낮은 변이는 제외
+    test_inputs: List[str] = []  # 추가 평가 입력 (user_input과 함께 연속 반감 레이스로 평가)
+    race_initial_inputs: Optional[int] = None  # 레이스 첫 라운드에서 평가할 입력 수
 
 class PromptOptimizeResult(BaseModel):
     best_prompt: str
@@ -377,34 +522,89 @@ class PromptOptimizeResult(BaseModel):
     best_score: float
     all_trials: List[Dict]
 
+def build_optimization_params(req: OptimizeRequest) -> Dict:
+    """요청 검증/기본값 적용 후 optimize_prompt_* 키워드 인자로 변환"""
+    # 한글 인코딩 디버깅
+    logger.info(f"=== 입력 데이터 디버깅 ===")
+    logger.info(f"사용자 요청 (raw): {repr(req.user_input)}")
+    logger.info(f"기대 결과 (raw): {repr(req.expected_output)}")
+    logger.info(f"제품명 (raw): {repr(req.product_name)}")
+    logger.info(f"제외 키워드 (raw): {repr(req.exclude_keywords)}")
+    
+    # 인코딩 문제가 있는 경우 기본값으로 대체
+    if not req.user_input or req.user_input.strip() == "":
+        req.user_input = "프로젝트 계획서 만들기"
+        logger.warning("사용자 요청이 비어있어 기본값으로 대체")
+    
+    # 기대 결과가 비어있으면 기본값 설정
+    if not req.expected_output or req.expected_output.strip() == "":
+        req.expected_output = "구체적이고 실용적인 답변으로, 요청사항에 맞는 상세한 내용을 포함"
+        logger.warning("기대 결과가 비어있어 기본값으로 대체")
+
+    return {
+        "user_input": req.user_input,
+        "expected_output": req.expected_output,
+        "product_name": req.product_name,
+        "exclude_keywords": req.exclude_keywords,
+        "custom_mutators": req.custom_mutators,
+        "judge_mode": req.judge_mode,
+        "prefilter_top_k": req.prefilter_top_k,
+        "prefilter_margin": req.prefilter_margin,
+        "test_inputs": req.test_inputs,
+        "race_initial_inputs": req.race_initial_inputs
+    }
+
+def submit_job(runner, params: Dict, kind: str) -> Job:
+    """작업 큐에 접수 (큐가 가득 차면 429와 Retry-After 반환)"""
+    try:
+        return job_manager.submit(runner, params, kind=kind)
+    except QueueFullError as e:
+        logger.warning(f"작업 큐 포화로 요청 거절: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+
+async def run_simple_job(job: Job) -> Dict:
+    return await optimize_prompt_simple(**job.params)
+
+async def run_streaming_job(job: Job) -> Dict:
+    """스트리밍 최적화 이벤트를 작업 이벤트로 기록하고 최종 결과 반환"""
+    final_results = None
+    # 토큰 델타는 이벤트 기록에 남기지 않음
+    stream = optimize_prompt_streaming(**job.params, stream_tokens=False)
+    try:
+        async for result in stream:
+            await job.emit({"type": result["type"], "data": result["data"]})
+            if result["type"] == "final_results":
+                final_results = result["data"]
+    finally:
+        await stream.aclose()
+    if final_results is None:
+        raise RuntimeError("최적화 결과가 생성되지 않았습니다")
+    return final_results
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/api/prompt-optimization/optimize", response_model=PromptOptimizeResult)
 async def optimize_prompt_api(req: OptimizeRequest):
-    """AutoPromptix Simple: 간단하고 효과적인 프롬프트 최적화 API"""
+    """AutoPromptix Simple: 간단하고 효과적인 프롬프트 최적화 API (작업 큐를 거쳐 동시 실행 수 제한)"""
     try:
-        # 한글 인코딩 디버깅
-        logger.info(f"=== 입력 데이터 디버깅 ===")
-        logger.info(f"사용자 요청 (raw): {repr(req.user_input)}")
-        logger.info(f"기대 결과 (raw): {repr(req.expected_output)}")
-        logger.info(f"제품명 (raw): {repr(req.product_name)}")
-        logger.info(f"제외 키워드 (raw): {repr(req.exclude_keywords)}")
-        
-        # 인코딩 문제가 있는 경우 기본값으로 대체
-        if not req.user_input or req.user_input.strip() == "":
-            req.user_input = "프로젝트 계획서 만들기"
-            logger.warning("사용자 요청이 비어있어 기본값으로 대체")
-        
-        # 기대 결과가 비어있으면 기본값 설정
-        if not req.expected_output or req.expected_output.strip() == "":
-            req.expected_output = "구체적이고 실용적인 답변으로, 요청사항에 맞는 상세한 내용을 포함"
-            logger.warning("기대 결과가 비어있어 기본값으로 대체")
-        
-        result = await optimize_prompt_simple(
-            user_input=req.user_input,
-            expected_output=req.expected_output,
-            product_name=req.product_name,
-            exclude_keywords=req.exclude_keywords,
-            custom_mutators=req.custom_mutators
-        )
+        job = submit_job(run_simple_job, build_optimization_params(req), kind="optimize")
+        try:
+            await job.wait()
+        except asyncio.CancelledError:
+            # 클라이언트 연결이 끊기면 작업도 취소하여 워커 슬롯과 LLM 호출을 반환
+            await job_manager.cancel(job.id)
+            raise
+        if job.status != "succeeded":
+            raise RuntimeError(job.error or f"작업이 {job.status} 상태로 종료되었습니다")
+        result = job.result
         
         logger.info(f"=== 최적화 결과 ===")
         logger.info(f"최고 점수: {result['best_score']}")
@@ -412,11 +612,84 @@ async def optimize_prompt_api(req: OptimizeRequest):
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"프롬프트 최적화 실패: {str(e)}")
         logger.error(f"오류 상세: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"프롬프트 최적화 중 오류가 발생했습니다: {str(e)}")
 
+@app.post("/api/prompt-optimization/jobs", status_code=202)
+async def submit_optimization_job(req: OptimizeRequest):
+    """최적화 작업 접수 - 작업 ID를 바로 반환하고 워커 풀에서 실행"""
+    job = submit_job(run_streaming_job, build_optimization_params(req), kind="optimization")
+    return {
+        **job.to_dict(),
+        "position": job_manager.queued_count(),
+        "links": {
+            "status": f"/api/prompt-optimization/jobs/{job.id}",
+            "result": f"/api/prompt-optimization/jobs/{job.id}/result",
+            "events": f"/api/prompt-optimization/jobs/{job.id}/events"
+        }
+    }
+
+@app.get("/api/prompt-optimization/jobs")
+async def get_optimization_jobs():
+    """작업 큐 상태와 보관 중인 작업 목록"""
+    return {
+        **job_manager.stats(),
+        "items": [job.to_dict() for job in job_manager.list_jobs()]
+    }
+
+@app.get("/api/prompt-optimization/jobs/{job_id}")
+async def get_optimization_job(job_id: str):
+    """작업 상태 조회"""
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/api/prompt-optimization/jobs/{job_id}/result")
+async def get_optimization_job_result(job_id: str):
+    """작업 결과 조회 (완료 전이면 409)"""
+    job = get_job_or_404(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Job has no result", "status": job.status, "error": job.error}
+        )
+    return {**job.to_dict(), "result": job.result}
+
+@app.get("/api/prompt-optimization/jobs/{job_id}/events")
+async def stream_optimization_job_events(job_id: str, request: Request, after: int = 0):
+    """
+    작업 이벤트 스트림 (Server-Sent Events)
+
+    지난 이벤트부터 재생하고 작업이 끝나면 종료. after 또는 Last-Event-ID로 이어 받기 가능.
+    """
+    job = get_job_or_404(job_id)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def event_source():
+        async for event in job.iter_events(after):
+            if await request.is_disconnected():
+                break
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: ".encode("utf-8") + dumps(event) + b"\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+@app.delete("/api/prompt-optimization/jobs/{job_id}")
+async def cancel_optimization_job(job_id: str):
+    """작업 취소 (대기 중이면 건너뛰고, 실행 중이면 진행 중인 LLM 요청까지 취소)"""
+    get_job_or_404(job_id)
+    job = await job_manager.cancel(job_id)
+    return job.to_dict()
+
+@app.post("/api/prompt-optimization/sessions/{session_id}/stop")
+async def request_optimization_stop(session_id: str):
+    """WebSocket 최적화 중단 요청 (어느 워커로 요청이 와도 연결된 워커에서 중단)"""
+    await state_backend.publish(OPTIMIZATION_STOP_CHANNEL, {"session_id": session_id})
+    return {"status": "stop_requested", "session_id": session_id}
+
 @app.get("/api/prompt-optimization/examples")
 async def get_optimization_examples():
     """프롬프트 최적화 예시 데이터 반환 (확장된 버전)"""
@@ -522,6 +795,7 @@ async def get_optimization_status():
         ],
         "endpoints": {
             "optimize": "/api/prompt-optimization/optimize",
+            "jobs": "/api/prompt-optimization/jobs",
             "examples": "/api/prompt-optimization/examples",
             "status": "/api/prompt-optimization/status"
         }
@@ -0,0 +1,173 @@
+"""
+프로세스 내부 계측 - 최적화 단계별 지연 시간, LLM 호출/오류, 평가 JSON 파싱 실패, 웹소켓 연결 수 등을
+수집하여 /metrics에서 Prometheus 텍스트 형식으로 노출
+
+- 외부 의존성 없이 카운터/게이지/히스토그램만 구현 (값은 워커 프로세스별로 집계됨)
+- 값은 이벤트 루프에서만 갱신하므로 잠금을 사용하지 않음
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# 초 단위 지연 시간 버킷 (LLM 호출은 수 초~수십 초까지 걸림)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Metric:
+    """라벨 조합별 값을 보관하는 지표 (라벨 이름은 생성 시 고정)"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 라벨 조합별 [버킷별 누적 개수..., 합계]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        counts = self._values.setdefault(key, [0] * len(self.buckets) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """with 블록의 소요 시간 기록 (예외가 발생해도 기록)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        counts = self._values.get(self._key(labels))
+        return int(counts[-2]) if counts else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._values.items():
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _format_value(bound))])} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {_format_value(counts[-2])}")
+        return lines
+
+class MetricsRegistry:
+    """지표 등록과 Prometheus 텍스트 형식 출력"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# 최적화 단계: analyze_user_input, generate_smart_mutations, generation, judge, final_output
+stage_latency = registry.histogram(
+    "autopromptix_stage_latency_seconds", "Latency of prompt optimization stages (generation/judge per LLM call)", ("stage",)
+)
+llm_calls = registry.counter(
+    "autopromptix_llm_calls_total", "LLM requests sent (cache hits excluded) by call site", ("call_site",)
+)
+llm_errors = registry.counter(
+    "autopromptix_llm_errors_total", "LLM requests that failed after retries by call site and error type", ("call_site", "error")
+)
+llm_tokens = registry.counter(
+    "autopromptix_llm_tokens_total", "LLM tokens used by call site and kind (prompt/completion)", ("call_site", "kind")
+)
+llm_latency = registry.histogram(
+    "autopromptix_llm_call_latency_seconds", "LLM request latency including retries by call site", ("call_site",)
+)
+judge_parses = registry.counter(
+    "autopromptix_judge_parses_total", "Judge responses parsed (result=ok) or replaced by the local fallback (result=failed)", ("mode", "result")
+)
+websocket_connections = registry.gauge(
+    "autopromptix_websocket_connections", "Open WebSocket connections by endpoint", ("endpoint",)
+)
+chat_reply_latency = registry.histogram(
+    "autopromptix_chat_reply_latency_seconds", "Time from a customer chat message to the stored AI reply"
+)
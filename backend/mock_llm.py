@@ -0,0 +1,345 @@
+"""
+로컬 모의 LLM - OpenAI 호환 chat completion 서버 및 인프로세스 시뮬레이터
+
+네트워크 없이 최적화/채팅/웹소켓 경로를 실제와 비슷한 지연 시간으로 실행하기 위한 도구.
+지연 시간 분포, 토큰 처리 속도, 오류/429 주입, 평가(judge)/분석 요청에 대한 JSON 응답을 지원한다.
+
+실행:
+    python mock_llm.py --port 8001 --latency-ms 800 --tokens-per-second 40
+
+백엔드 연결:
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=mock
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, asdict, fields
+from typing import AsyncIterator, Dict, List, Optional
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+@dataclass
+class MockLLMConfig:
+    """모의 LLM 동작 설정"""
+    latency_ms: float = 500.0  # 첫 토큰까지의 평균 지연 시간
+    latency_jitter_ms: float = 150.0  # 분포의 폭 (uniform: ±, normal/lognormal: 표준편차)
+    latency_distribution: str = "lognormal"
+    tokens_per_second: float = 60.0  # 0이면 생성 시간 없이 즉시 응답
+    output_tokens: int = 150  # 일반 응답의 목표 토큰 수 (max_tokens로 제한)
+    error_rate: float = 0.0  # 500 오류 비율
+    rate_limit_rate: float = 0.0  # 429 오류 비율
+    retry_after: float = 1.0  # 429 응답의 Retry-After (초)
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MockLLMConfig":
+        """MOCK_LLM_<필드명> 환경변수로 설정 생성"""
+        values = {}
+        for config_field in fields(cls):
+            raw = os.getenv(f"MOCK_LLM_{config_field.name.upper()}")
+            if raw is None or raw == "":
+                continue
+            if config_field.name == "latency_distribution":
+                values[config_field.name] = raw
+            elif config_field.name == "seed":
+                values[config_field.name] = int(raw)
+            elif config_field.name == "output_tokens":
+                values[config_field.name] = int(raw)
+            else:
+                values[config_field.name] = float(raw)
+        return cls(**values)
+
+class MockLLMError(Exception):
+    """주입된 오류 (status_code: 429 또는 500)"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 (한글은 글자당, 영문은 단어당 토큰이 더 많이 드는 점을 단순화)"""
+    return max(1, math.ceil(len(text) / 2))
+
+class MockLLM:
+    """설정된 지연 시간과 오류율로 chat completion 응답을 흉내내는 시뮬레이터"""
+
+    FILLER_SENTENCES = [
+        "1. 요약: 요청하신 내용을 핵심 위주로 정리했습니다.",
+        "2. 구체적인 방법과 단계별 절차를 아래에 제시합니다.",
+        "3. 실행 계획과 일정, 담당자를 명확히 정리했습니다.",
+        "- 전략적 관점에서 분석한 결과를 바탕으로 제안드립니다.",
+        "- 예시와 수치를 포함하여 이해를 돕도록 구성했습니다.",
+        "- 결론적으로 단계적인 적용과 모니터링을 권장합니다.",
+    ]
+
+    def __init__(self, config: Optional[MockLLMConfig] = None):
+        self.config = config or MockLLMConfig()
+        self.random = random.Random(self.config.seed)
+        self.requests = 0
+        self.errors = 0
+
+    def sample_latency(self) -> float:
+        """첫 토큰까지의 지연 시간 (초)"""
+        mean = self.config.latency_ms / 1000.0
+        jitter = self.config.latency_jitter_ms / 1000.0
+        distribution = self.config.latency_distribution
+
+        if distribution == "constant" or mean <= 0:
+            latency = mean
+        elif distribution == "uniform":
+            latency = self.random.uniform(mean - jitter, mean + jitter)
+        elif distribution == "normal":
+            latency = self.random.gauss(mean, jitter)
+        elif distribution == "lognormal":
+            # 평균과 표준편차가 설정값이 되도록 변환 (긴 꼬리 지연 재현)
+            sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2))
+            mu = math.log(mean) - sigma ** 2 / 2
+            latency = self.random.lognormvariate(mu, sigma)
+        else:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        return max(0.0, latency)
+
+    def generation_time(self, completion_tokens: int) -> float:
+        if self.config.tokens_per_second <= 0:
+            return 0.0
+        return completion_tokens / self.config.tokens_per_second
+
+    def maybe_fail(self):
+        """설정된 비율로 429/500 오류 주입"""
+        roll = self.random.random()
+        if roll < self.config.rate_limit_rate:
+            self.errors += 1
+            raise MockLLMError(429, "Rate limit reached (mock)", retry_after=self.config.retry_after)
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.errors += 1
+            raise MockLLMError(500, "Internal server error (mock)")
+
+    def build_response(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """요청 종류에 맞는 응답 텍스트 생성 (평가/분석 요청은 JSON)"""
+        system = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+        if '"results"' in system and "평가" in system:
+            candidates = len(re.findall(r"\[응답 \d+\]", user)) or 1
+            return json.dumps({"results": [self.judge_result(i) for i in range(1, candidates + 1)]}, ensure_ascii=False)
+        if '"score"' in system and "평가" in system:
+            return json.dumps(self.judge_result(), ensure_ascii=False)
+        if '"direction"' in system:
+            return json.dumps({
+                "direction": self.random.choice(["구조화", "전문성", "구체성", "설득력", "실행성"]),
+                "instructions": "핵심 내용을 구조화하고 구체적인 수치와 예시를 포함하여 작성"
+            }, ensure_ascii=False)
+
+        target_tokens = min(max_tokens, self.config.output_tokens)
+        lines = [f"{user[:60]}에 대한 답변입니다."]
+        while estimate_tokens("\n".join(lines)) < target_tokens:
+            lines.append(self.random.choice(self.FILLER_SENTENCES))
+        return "\n".join(lines)
+
+    def judge_result(self, candidate_id: Optional[int] = None) -> Dict:
+        breakdown = {
+            "exclude_keywords": self.random.randint(15, 25),
+            "product_name": self.random.randint(10, 25),
+            "expected_output": self.random.randint(10, 25),
+            "custom_requirements": self.random.randint(10, 25),
+        }
+        result = {
+            "score": sum(breakdown.values()),
+            "breakdown": breakdown,
+            "reasoning": "모의 평가 결과입니다."
+        }
+        if candidate_id is not None:
+            result = {"id": candidate_id, **result}
+        return result
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 500) -> Dict:
+        """
+        chat completion 시뮬레이션
+
+        Returns:
+            {"content", "prompt_tokens", "completion_tokens"}
+        """
+        self.requests += 1
+        first_token_latency = self.sample_latency()
+        try:
+            self.maybe_fail()
+        except MockLLMError:
+            # 오류도 실제처럼 일정 시간 후에 반환
+            await asyncio.sleep(first_token_latency)
+            raise
+
+        content = self.build_response(messages, max_tokens)
+        completion_tokens = estimate_tokens(content)
+        await asyncio.sleep(first_token_latency + self.generation_time(completion_tokens))
+
+        return {
+            "content": content,
+            "prompt_tokens": sum(estimate_tokens(m.get("content", "")) for m in messages),
+            "completion_tokens": completion_tokens,
+        }
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int = 500) -> AsyncIterator[str]:
+        """
+        스트리밍 chat completion 시뮬레이션 - 첫 토큰 지연 후 tokens_per_second 속도로 조각 전달
+
+        Yields:
+            공백 단위로 나눈 응답 조각 (이어 붙이면 complete()의 content와 같음)
+        """
+        self.requests += 1
+        first_token_latency = self.sample_latency()
+        try:
+            self.maybe_fail()
+        except MockLLMError:
+            await asyncio.sleep(first_token_latency)
+            raise
+
+        content = self.build_response(messages, max_tokens)
+        await asyncio.sleep(first_token_latency)
+        for piece in re.findall(r"\s*\S+\s*", content) or [content]:
+            yield piece
+            await asyncio.sleep(self.generation_time(estimate_tokens(piece)))
+
+def create_app(config: Optional[MockLLMConfig] = None):
+    """OpenAI 호환 모의 서버 (FastAPI)"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Mock LLM Server")
+    app.state.mock = MockLLM(config or MockLLMConfig.from_env())
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        mock: MockLLM = app.state.mock
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock")
+
+        def error_response(e: MockLLMError) -> JSONResponse:
+            headers = {"retry-after": str(e.retry_after)} if e.retry_after is not None else {}
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"error": {"message": str(e), "type": "mock_error", "code": e.status_code}},
+                headers=headers,
+            )
+
+        if body.get("stream"):
+            deltas = mock.stream(body.get("messages", []), body.get("max_tokens") or 500)
+            # 오류는 첫 조각 전에만 주입되므로 첫 조각을 받아 본 뒤 상태 코드를 결정
+            try:
+                first = await deltas.__anext__()
+            except MockLLMError as e:
+                return error_response(e)
+            except StopAsyncIteration:
+                first = ""
+
+            def chunk(delta: Dict, finish_reason: Optional[str] = None, **extra) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    **extra,
+                }
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            async def events():
+                content = first
+                yield chunk({"role": "assistant", "content": first})
+                async for delta in deltas:
+                    content += delta
+                    yield chunk({"content": delta})
+                yield chunk({}, finish_reason="stop")
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    # OpenAI와 같이 choices가 빈 마지막 조각으로 사용량 전달
+                    prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in body.get("messages", []))
+                    completion_tokens = estimate_tokens(content)
+                    yield chunk({}, choices=[], usage={
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    })
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        try:
+            result = await mock.complete(body.get("messages", []), body.get("max_tokens") or 500)
+        except MockLLMError as e:
+            return error_response(e)
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": result["content"]},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": result["prompt_tokens"],
+                "completion_tokens": result["completion_tokens"],
+                "total_tokens": result["prompt_tokens"] + result["completion_tokens"],
+            },
+        }
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {
+            "object": "list",
+            "data": [
+                {"id": model_id, "object": "model", "created": 0, "owned_by": "mock"}
+                for model_id in ("gpt-3.5-turbo", "gpt-4")
+            ],
+        }
+
+    @app.get("/mock/config")
+    async def get_config():
+        mock: MockLLM = app.state.mock
+        return {"config": asdict(mock.config), "requests": mock.requests, "errors": mock.errors}
+
+    @app.put("/mock/config")
+    async def update_config(request: Request):
+        """부하 테스트 중 지연 시간/오류율 변경"""
+        mock: MockLLM = app.state.mock
+        updates = await request.json()
+        mock.config = MockLLMConfig(**{**asdict(mock.config), **updates})
+        return {"config": asdict(mock.config)}
+
+    return app
+
+def main():
+    defaults = MockLLMConfig.from_env()
+    parser = argparse.ArgumentParser(description="OpenAI 호환 모의 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-jitter-ms", type=float, default=defaults.latency_jitter_ms)
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default=defaults.latency_distribution)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = MockLLMConfig(**{
+        config_field.name: getattr(args, config_field.name) for config_field in fields(MockLLMConfig)
+    })
+
+    import uvicorn
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
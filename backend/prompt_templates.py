@@ -0,0 +1,141 @@
+"""
+평가/분석 프롬프트 템플릿 - 고정 지시문을 앞(system 메시지)에, 호출마다 바뀌는 내용을 뒤(user 메시지)에 배치
+
+- 고정 접두사는 호출 간에 바이트 단위로 동일하므로 제공자 측 프롬프트 접두사 캐시가 적중함
+- 평가 루브릭 접두사는 가중치 조합별로 한 번만 만들어 재사용 (가중치 외의 평가 정보는 user 메시지로 전달)
+- 한 최적화 실행 안에서는 평가 정보가 같으므로 user 메시지도 평가 대상 응답 앞까지 동일함
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+WEIGHT_KEYS = ("exclude_keywords", "product_name", "expected_output", "custom_requirements")
+
+RUBRIC_TEMPLATE = """**평가 기준 (가중치 적용):**
+
+1. **제외 키워드 준수 ({exclude_keywords}점)**: 평가 정보의 제외 키워드가 포함되지 않았는가?
+   - 제외 키워드가 하나도 없으면 {exclude_keywords}점
+   - 제외 키워드가 1개 있으면 {exclude_keywords_partial:.0f}점
+   - 제외 키워드가 2개 이상 있으면 0점
+
+2. **제품/서비스 이름 포함 ({product_name}점)**: 평가 정보의 필수 포함 이름이 적절히 포함되었는가?
+   - 자연스럽게 여러 번 포함되면 {product_name}점
+   - 1-2번 포함되면 {product_name_partial:.0f}점
+   - 포함되지 않으면 0점
+
+3. **기대 결과 달성 ({expected_output}점)**: 평가 정보의 기대 결과를 얼마나 잘 충족했는가?
+   - 완벽히 충족하면 {expected_output}점
+   - 대부분 충족하면 {expected_output_most:.0f}점
+   - 부분적으로 충족하면 {expected_output_partial:.0f}점
+   - 충족하지 못하면 0점
+
+4. **추가 요구사항 반영 ({custom_requirements}점)**: 평가 정보의 추가 요구사항이 얼마나 잘 반영되었는가?
+   - 모든 요구사항 반영하면 {custom_requirements}점
+   - 대부분 반영하면 {custom_requirements_most:.0f}점
+   - 일부만 반영하면 {custom_requirements_partial:.0f}점
+   - 반영되지 않으면 0점"""
+
+JUDGE_TEMPLATE = """주어진 응답을 4가지 기준으로 평가하여 0-100점 사이의 점수를 매겨라.
+평가 정보와 평가 대상 응답은 사용자 메시지로 주어진다.
+
+{rubric}
+
+**총점 계산:**
+각 기준별 점수를 합산하여 최종 점수 산출 (최대 100점)
+
+**응답 형식:**
+{{"score": 점수(0-100), "breakdown": {{"exclude_keywords": 점수1, "product_name": 점수2, "expected_output": 점수3, "custom_requirements": 점수4}}, "reasoning": "각 기준별 평가 이유와 점수 산정 근거"}}
+
+점수를 정확히 계산하여 JSON 형태로 응답해라."""
+
+JUDGE_BATCH_TEMPLATE = """주어진 여러 응답을 각각 4가지 기준으로 평가하여 0-100점 사이의 점수를 매겨라.
+평가 정보와 번호가 붙은 평가 대상 응답들은 사용자 메시지로 주어진다.
+
+{rubric}
+
+**총점 계산:**
+응답마다 각 기준별 점수를 합산하여 최종 점수 산출 (최대 100점)
+
+**응답 형식:**
+{{"results": [{{"id": 응답 번호, "score": 점수(0-100), "breakdown": {{"exclude_keywords": 점수1, "product_name": 점수2, "expected_output": 점수3, "custom_requirements": 점수4}}, "reasoning": "각 기준별 평가 이유와 점수 산정 근거"}}]}}
+
+모든 응답에 대해 빠짐없이 점수를 계산하여 JSON 형태로 응답해라."""
+
+# 입력 분석 지시문은 가변 값이 없으므로 그대로 접두사로 사용
+ANALYSIS_PREFIX = """다음 사용자 요청을 분석하여 가장 적합한 프롬프트 개선 방향을 제시해라.
+사용자 요청은 사용자 메시지로 주어진다.
+
+다음 중 가장 적합한 방향을 선택하고 구체적인 지시사항을 작성해라:
+1. 구조화 (문서, 계획서, 보고서 등)
+2. 전문성 (전문 용어, 데이터, 분석 등)
+3. 구체성 (수치, 예시, 단계별 설명 등)
+4. 설득력 (투자자, 고객 대상 등)
+5. 실행성 (실행 가능한 액션 플랜 등)
+
+선택한 방향과 구체적 지시사항을 JSON 형태로 응답해라:
+{"direction": "선택한 방향", "instructions": "구체적 지시사항"}"""
+
+def _weights_key(weights: Dict[str, float]) -> Tuple[float, ...]:
+    return tuple(weights[key] for key in WEIGHT_KEYS)
+
+@lru_cache(maxsize=64)
+def _judge_prefix(weights_key: Tuple[float, ...], batch: bool) -> str:
+    weights = dict(zip(WEIGHT_KEYS, weights_key))
+    rubric = RUBRIC_TEMPLATE.format(
+        **weights,
+        exclude_keywords_partial=weights["exclude_keywords"] * 0.6,
+        product_name_partial=weights["product_name"] * 0.6,
+        expected_output_most=weights["expected_output"] * 0.8,
+        expected_output_partial=weights["expected_output"] * 0.4,
+        custom_requirements_most=weights["custom_requirements"] * 0.8,
+        custom_requirements_partial=weights["custom_requirements"] * 0.4,
+    )
+    return (JUDGE_BATCH_TEMPLATE if batch else JUDGE_TEMPLATE).format(rubric=rubric)
+
+def judge_prefix(weights: Dict[str, float], batch: bool = False) -> str:
+    """가중치 조합별 평가 지시문과 루브릭 (system 메시지, 같은 가중치면 같은 문자열 객체를 반환)"""
+    return _judge_prefix(_weights_key(weights), batch)
+
+def evaluation_context(expected_output: str, keywords: List[str], exclude_keywords: List[str], custom_mutators: List[str] = []) -> str:
+    """실행별 평가 정보 (user 메시지 앞부분)"""
+    return f"""**평가 정보:**
+제외 키워드: {', '.join(exclude_keywords) if exclude_keywords else '없음'}
+필수 포함: {', '.join(keywords) if keywords else '없음'}
+기대 결과: {expected_output}
+추가 요구사항: {', '.join(custom_mutators) if custom_mutators else '없음'}"""
+
+def judge_input(context: str, output: str) -> str:
+    """단일 평가 user 메시지 - 평가 정보 뒤에 평가 대상 응답"""
+    return f"""{context}
+
+**평가 대상 응답:**
+{output}"""
+
+def judge_batch_input(context: str, outputs: List[str]) -> str:
+    """배치 평가 user 메시지 - 평가 정보 뒤에 번호를 붙인 평가 대상 응답들"""
+    candidates = "\n\n".join(
+        f"[응답 {i}]\n{output}" for i, output in enumerate(outputs, start=1)
+    )
+    return f"""{context}
+
+**평가 대상 응답 ({len(outputs)}개):**
+{candidates}"""
+
+def analysis_input(user_input: str) -> str:
+    """입력 분석 user 메시지"""
+    return f"사용자 요청: {user_input}"
+
+# 변이 프롬프트 접미사 - 한 실행의 모든 변이가 공유하는 기본 프롬프트 뒤에 붙임 (방향 표시어, 변이 이름, 접미사)
+MUTATION_TEMPLATES = (
+    (("구조화", "문서", "계획서"), "structure", "\n\n답변은 반드시 다음 구조로 작성해라:\n{instructions}"),
+    (("전문성", "전문", "분석"), "professional", "\n\n답변은 반드시 다음 요구사항을 만족해라:\n{instructions}"),
+    (("구체성", "구체", "수치"), "specific", "\n\n답변은 반드시 다음 요소를 포함해라:\n{instructions}"),
+    (("설득력", "투자자", "고객"), "persuasive", "\n\n답변은 반드시 다음 관점에서 작성해라:\n{instructions}"),
+    (("실행성", "실행", "액션"), "actionable", "\n\n답변은 반드시 다음 형태로 제시해라:\n{instructions}"),
+)
+
+# 방향을 알 수 없을 때 쓰는 기본 변이 접미사 (변이 이름, 접미사)
+FALLBACK_MUTATION_TEMPLATES = (
+    ("tone", "\n\n답변은 반드시 다음 형식으로 작성해라:\n1. 전문적이고 설득력 있는 어조 사용\n2. 구체적인 수치와 데이터 포함\n3. 투자자/고객이 원하는 핵심 정보 우선 배치\n4. 각 섹션마다 명확한 제목과 요약 포함{exclude_text}"),
+    ("format", "\n\n답변은 반드시 다음 구조로 작성해라:\n- 제목: [명확한 제목]\n- 요약: [핵심 내용 2-3줄]\n- 상세 내용: [번호와 불릿으로 구체적 단계 제시]\n- 결론: [실행 가능한 다음 단계 제시]\n- 부록: [참고 자료나 추가 정보]{exclude_text}"),
+)
@@ -4,18 +4,124 @@ cosine(0.4) + rouge(0.3) + keyword(0.2) + bonus(0.1)
 """
 
 import re
-from rapidfuzz import fuzz
-from typing import List
+from rapidfuzz import fuzz, process
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+# 유사어 매핑
+SIMILAR_WORDS = {
+    '고객서비스': ['고객', '서비스', '고객지원', '고객만족'],
+    '고객': ['고객', '클라이언트', '사용자'],
+    '서비스': ['서비스', '지원', '도움'],
+    '제품': ['제품', '상품', '물건'],
+    '프로젝트': ['프로젝트', '작업', '계획']
+}
+
+# 보너스 점수 지표
+STRUCTURE_INDICATORS = ['1.', '2.', '3.', '•', '-', '제목', '목차', '요약', '결론', '첫째', '둘째', '셋째']
+SPECIFIC_INDICATORS = ['구체적으로', '예시', '방법', '절차', '단계', '첫째', '둘째', '방안', '전략', '접근법']
+PROFESSIONAL_INDICATORS = ['전문', '전략', '분석', '평가', '검토', '검증', '테스트', '모니터링']
+ACTIONABLE_INDICATORS = ['실행', '구현', '적용', '진행', '완료', '달성', '성공', '결과']
+
+# 복합 점수 가중치
+SCORE_WEIGHTS = {"cosine": 0.35, "rouge": 0.25, "keyword": 0.15, "bonus": 0.25}
+
+class PatternMatcher:
+    """
+    키워드, 유사어, 금지어, 보너스 지표를 한 번의 스캔으로 찾는 사전 컴파일 매처
+
+    모든 패턴을 트라이 형태의 정규식 하나로 묶어 텍스트를 한 번만 훑는다.
+    정규식은 겹치지 않는 가장 긴 매칭만 돌려주므로, 매칭 안에 포함된 패턴은
+    미리 계산한 표로 보완하고, 매칭 끝에 걸쳐 시작할 수 있는 패턴(드묾)만
+    따로 확인한다.
+    최적화 요청마다 한 번 만들어 모든 변이 출력에 재사용한다.
+    """
+
+    def __init__(self, required_keywords: Optional[Iterable[str]] = None, forbidden_words: Optional[Iterable[str]] = None):
+        self.required_keywords = [kw.lower() for kw in required_keywords or []]
+        self.forbidden_words = [word.strip().lower() for word in forbidden_words or [] if word.strip()]
+
+        patterns: Set[str] = set(self.forbidden_words)
+        for kw_lower in self.required_keywords:
+            patterns.add(kw_lower)
+            patterns.update(part for part in kw_lower.split() if len(part) > 2)
+            patterns.update(get_similar_words(kw_lower))
+        for indicators in (STRUCTURE_INDICATORS, SPECIFIC_INDICATORS, PROFESSIONAL_INDICATORS, ACTIONABLE_INDICATORS):
+            patterns.update(indicator.lower() for indicator in indicators)
+        patterns.discard('')
+        self.patterns = frozenset(patterns)
+
+        self._regex = re.compile(_trie_regex(patterns)) if patterns else None
+        # 매칭된 패턴 안에 완전히 포함된 패턴들
+        self._contained: Dict[str, List[str]] = {
+            pattern: [other for other in patterns if other in pattern]
+            for pattern in patterns
+        }
+        # 매칭된 패턴 중간에서 시작해 매칭 끝을 넘어갈 수 있는 패턴들 (텍스트로 확인 필요)
+        self._straddling: Dict[str, List[str]] = {}
+        for pattern in patterns:
+            straddling = [
+                other for other in patterns
+                if any(
+                    len(other) > len(pattern) - k and other.startswith(pattern[k:])
+                    for k in range(1, len(pattern))
+                )
+            ]
+            if straddling:
+                self._straddling[pattern] = straddling
+
+    def scan(self, text: str) -> Set[str]:
+        """텍스트에 포함된 모든 패턴(소문자)을 반환"""
+        found: Set[str] = set()
+        if self._regex is None:
+            return found
+
+        text_lower = text.lower()
+        matched = set(self._regex.findall(text_lower))
+        for pattern in matched:
+            found.update(self._contained[pattern])
+        for pattern in matched.intersection(self._straddling):
+            for other in self._straddling[pattern]:
+                if other not in found and other in text_lower:
+                    found.add(other)
+        return found
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """패턴 목록을 트라이 구조의 정규식으로 변환 (각 위치에서 가장 긴 패턴에 매칭)"""
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        group = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # 현재 위치에서 끝나는 패턴이 있으면 뒤는 선택적으로 (탐욕적) 매칭
+            return '(?:' + group + ')?'
+        return group
+
+    return build(trie)
+
+def _contains(text: str, found: Optional[Set[str]] = None) -> Callable[[str], bool]:
+    """패턴 포함 여부 확인 함수 (매처 스캔 결과가 있으면 집합 조회로 대체)"""
+    if found is None:
+        return text.__contains__
+    return lambda pattern: not pattern or pattern in found
 
 def normalize(text):
-    """텍스트 정규화"""
-    text = re.sub(r'\s+', ' ', text.lower().strip())
-    return text
+    """텍스트 정규화 (소문자, 앞뒤 공백 제거, 연속 공백을 하나로)"""
+    # str.split()은 정규식 \s와 같은 공백 문자로 나누므로 re.sub(r'\s+', ' ', ...)와 결과가 같고 더 빠름
+    return ' '.join(text.lower().split())
 
 def cosine_similarity(output, reference):
     """rapidfuzz를 사용한 코사인 유사도 근사치 (개선 효과 극대화 버전)"""
-    base_score = fuzz.ratio(normalize(output), normalize(reference)) / 100.0
-    
+    return _cosine_curve(fuzz.ratio(normalize(output), normalize(reference)) / 100.0)
+
+def _cosine_curve(base_score: float) -> float:
     # 기본 점수를 낮춰서 개선 효과를 극대화
     if base_score < 0.5:
         return 0.4  # 0.8 → 0.4로 낮춤
@@ -28,8 +134,9 @@ def cosine_similarity(output, reference):
 
 def rouge_l_score(output, reference):
     """ROUGE-L 점수 계산 (rapidfuzz 기반, 개선 효과 극대화 버전)"""
-    base_score = fuzz.token_set_ratio(output, reference) / 100.0
-    
+    return _rouge_curve(fuzz.token_set_ratio(output, reference) / 100.0)
+
+def _rouge_curve(base_score: float) -> float:
     # 기본 점수를 낮춰서 개선 효과를 극대화
     if base_score < 0.4:
         return 0.35  # 0.8 → 0.35로 낮춤
@@ -40,51 +147,52 @@ def rouge_l_score(output, reference):
     else:
         return base_score
 
-def keyword_coverage(output, required_keywords):
+def keyword_coverage(output, required_keywords, found=None):
     """키워드 커버리지 계산 (개선 효과 극대화 버전)"""
     if not required_keywords:
         return 1.0
     
-    output_lower = output.lower()
-    found_keywords = 0
-    
+    return _keyword_coverage(_contains(output.lower(), found), _keyword_patterns(required_keywords))
+
+def _keyword_patterns(required_keywords: Iterable[str]) -> List[tuple]:
+    """키워드별 (소문자 키워드, 부분 매칭 단어, 유사어) 목록"""
+    patterns = []
     for kw in required_keywords:
         kw_lower = kw.lower()
-        
+        patterns.append((kw_lower, [part for part in kw_lower.split() if len(part) > 2], get_similar_words(kw_lower)))
+    return patterns
+
+def _keyword_coverage(contains: Callable[[str], bool], keyword_patterns: List[tuple]) -> float:
+    found_keywords = 0
+    
+    for kw_lower, parts, similar_words in keyword_patterns:
         # 정확한 매칭
-        if kw_lower in output_lower:
+        if contains(kw_lower):
             found_keywords += 1.0
         # 부분 매칭 (키워드의 일부가 포함된 경우)
-        elif any(part in output_lower for part in kw_lower.split() if len(part) > 2):
+        elif any(contains(part) for part in parts):
             found_keywords += 0.7  # 0.9 → 0.7로 낮춤
         # 유사어 매칭 (간단한 유사어 체크)
-        elif any(similar in output_lower for similar in get_similar_words(kw_lower)):
+        elif any(contains(similar) for similar in similar_words):
             found_keywords += 0.6  # 0.8 → 0.6으로 낮춤
     
     # 키워드가 없으면 기본 점수 0.5 부여 (0.7 → 0.5로 낮춤)
     if found_keywords == 0:
         return 0.5
     
-    return min(1.0, found_keywords / len(required_keywords))
+    return min(1.0, found_keywords / len(keyword_patterns))
 
 def get_similar_words(word):
     """간단한 유사어 매핑"""
-    similar_map = {
-        '고객서비스': ['고객', '서비스', '고객지원', '고객만족'],
-        '고객': ['고객', '클라이언트', '사용자'],
-        '서비스': ['서비스', '지원', '도움'],
-        '제품': ['제품', '상품', '물건'],
-        '프로젝트': ['프로젝트', '작업', '계획']
-    }
-    return similar_map.get(word, [word])
-
-def calculate_bonus_score(output, user_input):
+    return SIMILAR_WORDS.get(word, [word])
+
+def calculate_bonus_score(output, user_input, found=None):
     """보너스 점수 계산 (개선 효과 극대화 버전)"""
+    contains = _contains(output, found)
     bonus = 0.0
     
     # 1. 구조화 보너스 (0.05) - 감소
-    structure_indicators = ['1.', '2.', '3.', '•', '-', '제목', '목차', '요약', '결론', '첫째', '둘째', '셋째']
-    if any(indicator in output for indicator in structure_indicators):
+    if any(contains(indicator) for indicator in STRUCTURE_INDICATORS):
         bonus += 0.05  # 0.08 → 0.05로 감소
     
     # 2. 길이 보너스 (0.03) - 감소
@@ -95,34 +203,38 @@ def calculate_bonus_score(output, user_input):
         bonus += 0.02  # 0.04 → 0.02로 감소
     
     # 3. 구체성 보너스 (0.03) - 감소
-    specific_indicators = ['구체적으로', '예시', '방법', '절차', '단계', '첫째', '둘째', '방안', '전략', '접근법']
-    if any(indicator in output for indicator in specific_indicators):
+    if any(contains(indicator) for indicator in SPECIFIC_INDICATORS):
         bonus += 0.03  # 0.06 → 0.03으로 감소
     
     # 4. 전문성 보너스 (0.02) - 감소
-    professional_indicators = ['전문', '전략', '분석', '평가', '검토', '검증', '테스트', '모니터링']
-    if any(indicator in output for indicator in professional_indicators):
+    if any(contains(indicator) for indicator in PROFESSIONAL_INDICATORS):
         bonus += 0.02  # 0.05 → 0.02로 감소
     
     # 5. 실행 가능성 보너스 (0.02) - 감소
-    actionable_indicators = ['실행', '구현', '적용', '진행', '완료', '달성', '성공', '결과']
-    if any(indicator in output for indicator in actionable_indicators):
+    if any(contains(indicator) for indicator in ACTIONABLE_INDICATORS):
         bonus += 0.02  # 0.05 → 0.02로 감소
     
     return min(0.15, bonus)  # 최대 0.15 (0.3 → 0.15로 감소)
 
-def composite_score(output, reference, required_keywords=None):
+def composite_score(output, reference, required_keywords=None, matcher=None, found=None):
     """복합 점수 계산: cosine(0.35) + rouge(0.25) + keyword(0.15) + bonus(0.25)"""
+    # 매처가 있으면 키워드/지표 검사를 한 번의 스캔으로 처리
+    if found is None and matcher is not None:
+        found = matcher.scan(output)
+
     cos_score = cosine_similarity(output, reference)
     rouge_score = rouge_l_score(output, reference)
-    keyword_score = keyword_coverage(output, required_keywords or [])
-    bonus_score = calculate_bonus_score(output, reference) # user_input 대신 reference 사용
+    keyword_score = keyword_coverage(output, required_keywords or [], found)
+    bonus_score = calculate_bonus_score(output, reference, found) # user_input 대신 reference 사용
+
+    return _combine_scores(cos_score, rouge_score, keyword_score, bonus_score)
 
+def _combine_scores(cos_score: float, rouge_score: float, keyword_score: float, bonus_score: float, weights: Dict[str, float] = SCORE_WEIGHTS) -> float:
     # 가중 평균 계산 (보너스 점수 비중 증가)
-    final_score = (0.35 * cos_score +
-                   0.25 * rouge_score +
-                   0.15 * keyword_score +
-                   0.25 * bonus_score)
+    final_score = (weights["cosine"] * cos_score +
+                   weights["rouge"] * rouge_score +
+                   weights["keyword"] * keyword_score +
+                   weights["bonus"] * bonus_score)
 
     # 점수를 0.8 이상으로 높이는 강력한 보정
     if final_score < 0.5:
@@ -138,24 +250,281 @@ def composite_score(output, reference, required_keywords=None):
     
     return round(min(1.0, final_score), 3)
 
-def check_forbidden_words(output: str, forbidden_words: List[str]) -> float:
+def check_forbidden_words(output: str, forbidden_words: List[str], found: Optional[Set[str]] = None) -> float:
     """금지어 체크 및 페널티 점수 계산"""
     if not forbidden_words:
         return 1.0
     
-    output_lower = output.lower()
+    return _forbidden_penalty(_contains(output.lower(), found), _forbidden_patterns(forbidden_words))
+
+def _forbidden_patterns(forbidden_words: Optional[Iterable[str]]) -> List[str]:
+    """공백을 제거한 소문자 금지어 목록 (빈 항목 제외)"""
+    return [word.strip().lower() for word in forbidden_words or [] if word.strip()]
+
+def _forbidden_penalty(contains: Callable[[str], bool], forbidden_patterns: List[str]) -> float:
     penalty = 0.0
     
-    for word in forbidden_words:
-        if word.strip() and word.strip().lower() in output_lower:
+    for word in forbidden_patterns:
+        if contains(word):
             penalty += 0.3  # 금지어 하나당 0.3점 감점
     
     # 최대 0.9점까지 감점 가능 (최소 0.1점 보장)
     return max(0.1, 1.0 - penalty)
 
-def final_score_with_forbidden_check(base_score: float, output: str, forbidden_words: List[str]) -> float:
+def final_score_with_forbidden_check(base_score: float, output: str, forbidden_words: List[str], found: Optional[Set[str]] = None) -> float:
     """금지어 체크를 포함한 최종 점수 계산"""
-    forbidden_penalty = check_forbidden_words(output, forbidden_words)
+    forbidden_penalty = check_forbidden_words(output, forbidden_words, found)
     final_score = base_score * forbidden_penalty
     
     return round(final_score, 3)
+
+# ============================================================================
+# 배치 API - 여러 출력을 한 번에 채점 (오프라인 재채점, 요청당 다수 변이 채점용)
+# numpy는 import 비용이 커서 배치 함수에서 처음 필요할 때 불러옴 (단일 채점 경로는 numpy를 쓰지 않음)
+# ============================================================================
+
+def cosine_similarity_batch(outputs: Sequence[str], reference: str) -> "np.ndarray":
+    """cosine_similarity의 배치 버전 (참조 텍스트는 한 번만 정규화)"""
+    import numpy as np
+
+    if not len(outputs):
+        return np.zeros(0)
+    base_scores = process.cdist(
+        outputs, [reference], scorer=fuzz.ratio, processor=normalize, dtype=np.float64, workers=-1
+    )[:, 0] / 100.0
+    return np.select(
+        [base_scores < 0.5, base_scores < 0.7, base_scores > 0.7],
+        [0.4, 0.5, 0.6],
+        default=base_scores
+    )
+
+def rouge_l_score_batch(outputs: Sequence[str], reference: str) -> "np.ndarray":
+    """rouge_l_score의 배치 버전"""
+    import numpy as np
+
+    if not len(outputs):
+        return np.zeros(0)
+    base_scores = process.cdist(
+        outputs, [reference], scorer=fuzz.token_set_ratio, dtype=np.float64, workers=-1
+    )[:, 0] / 100.0
+    return np.select(
+        [base_scores < 0.4, base_scores < 0.6, base_scores > 0.6],
+        [0.35, 0.45, 0.55],
+        default=base_scores
+    )
+
+def _contains_batch(outputs: Sequence[str], found_sets: Optional[Sequence[Set[str]]], lower: bool = True) -> List[Callable[[str], bool]]:
+    """출력별 패턴 포함 여부 확인 함수 목록"""
+    if found_sets is None:
+        found_sets = [None] * len(outputs)
+    return [
+        _contains(output.lower() if lower else output, found)
+        for output, found in zip(outputs, found_sets)
+    ]
+
+def keyword_coverage_batch(outputs: Sequence[str], required_keywords: Optional[List[str]], found_sets: Optional[Sequence[Set[str]]] = None) -> "np.ndarray":
+    """keyword_coverage의 배치 버전"""
+    import numpy as np
+
+    if not required_keywords:
+        return np.ones(len(outputs))
+
+    checks = _contains_batch(outputs, found_sets)
+    found_keywords = np.zeros(len(outputs))
+
+    for kw in required_keywords:
+        kw_lower = kw.lower()
+        parts = [part for part in kw_lower.split() if len(part) > 2]
+        similar_words = get_similar_words(kw_lower)
+
+        # 정확한 매칭 1.0 > 부분 매칭 0.7 > 유사어 매칭 0.6
+        found_keywords += [
+            1.0 if contains(kw_lower)
+            else 0.7 if any(contains(part) for part in parts)
+            else 0.6 if any(contains(similar) for similar in similar_words)
+            else 0.0
+            for contains in checks
+        ]
+
+    coverage = np.minimum(1.0, found_keywords / len(required_keywords))
+    # 키워드가 없으면 기본 점수 0.5 부여
+    return np.where(found_keywords == 0, 0.5, coverage)
+
+def calculate_bonus_score_batch(outputs: Sequence[str], found_sets: Optional[Sequence[Set[str]]] = None) -> "np.ndarray":
+    """calculate_bonus_score의 배치 버전"""
+    import numpy as np
+
+    checks = _contains_batch(outputs, found_sets, lower=False)
+
+    def indicator_bonus(indicators: List[str], weight: float) -> "np.ndarray":
+        return weight * np.array(
+            [any(contains(indicator) for indicator in indicators) for contains in checks], dtype=float
+        )
+
+    # calculate_bonus_score와 같은 순서로 합산 (부동소수점 결과 일치)
+    bonus = indicator_bonus(STRUCTURE_INDICATORS, 0.05)
+
+    lengths = np.array([len(output) for output in outputs])
+    bonus += np.select(
+        [(lengths >= 100) & (lengths <= 800), ((lengths >= 50) & (lengths < 100)) | ((lengths > 800) & (lengths <= 1200))],
+        [0.03, 0.02],
+        default=0.0
+    )
+
+    bonus += indicator_bonus(SPECIFIC_INDICATORS, 0.03)
+    bonus += indicator_bonus(PROFESSIONAL_INDICATORS, 0.02)
+    bonus += indicator_bonus(ACTIONABLE_INDICATORS, 0.02)
+    return np.minimum(0.15, bonus)
+
+def check_forbidden_words_batch(outputs: Sequence[str], forbidden_words: Optional[List[str]], found_sets: Optional[Sequence[Set[str]]] = None) -> "np.ndarray":
+    """check_forbidden_words의 배치 버전"""
+    import numpy as np
+
+    words = [word.strip().lower() for word in forbidden_words or [] if word.strip()]
+    if not words:
+        return np.ones(len(outputs))
+
+    hits = np.array(
+        [sum(contains(word) for word in words) for contains in _contains_batch(outputs, found_sets)], dtype=float
+    )
+    return np.maximum(0.1, 1.0 - 0.3 * hits)
+
+def composite_score_batch(
+    outputs: Sequence[str],
+    reference: str,
+    required_keywords: Optional[List[str]] = None,
+    forbidden_words: Optional[List[str]] = None,
+    matcher: Optional[PatternMatcher] = None,
+    found_sets: Optional[Sequence[Set[str]]] = None,
+    weights: Dict[str, float] = SCORE_WEIGHTS
+) -> "np.ndarray":
+    """
+    composite_score의 배치 버전 (forbidden_words가 있으면 final_score_with_forbidden_check까지 적용)
+
+    Args:
+        matcher: required_keywords/forbidden_words로 만든 매처 (없으면 새로 생성)
+        found_sets: 이미 스캔한 출력별 매칭 결과 (있으면 스캔 생략)
+        weights: 복합 점수 가중치 (cosine, rouge, keyword, bonus)
+
+    Returns:
+        출력별 점수 배열
+    """
+    import numpy as np
+
+    if found_sets is None:
+        if matcher is None:
+            matcher = PatternMatcher(required_keywords, forbidden_words)
+        # 출력마다 한 번만 스캔하여 키워드/금지어/보너스 지표 검사에 공유
+        found_sets = [matcher.scan(output) for output in outputs]
+
+    cos_scores = cosine_similarity_batch(outputs, reference)
+    rouge_scores = rouge_l_score_batch(outputs, reference)
+    keyword_scores = keyword_coverage_batch(outputs, required_keywords, found_sets)
+    bonus_scores = calculate_bonus_score_batch(outputs, found_sets)
+
+    final_scores = (weights["cosine"] * cos_scores +
+                    weights["rouge"] * rouge_scores +
+                    weights["keyword"] * keyword_scores +
+                    weights["bonus"] * bonus_scores)
+
+    # composite_score와 동일한 보정 곡선
+    final_scores = np.select(
+        [final_scores < 0.5, final_scores < 0.6, final_scores < 0.7, final_scores < 0.8, final_scores < 0.9],
+        [0.7 + (final_scores * 0.3), 0.8 + (final_scores * 0.2), 0.85 + (final_scores * 0.15), final_scores + 0.2, final_scores + 0.15],
+        default=final_scores
+    )
+    final_scores = _round_scores(np.minimum(1.0, final_scores))
+
+    if forbidden_words:
+        final_scores = _round_scores(final_scores * check_forbidden_words_batch(outputs, forbidden_words, found_sets))
+    return final_scores
+
+def _round_scores(scores: "np.ndarray") -> "np.ndarray":
+    """round(score, 3)과 동일한 반올림 (np.round는 경계값에서 결과가 달라질 수 있음)"""
+    import numpy as np
+
+    return np.array([round(score, 3) for score in scores.tolist()])
+
+# ============================================================================
+# 요청 단위 채점 컨텍스트 - 참조 측 특성을 한 번만 계산하여 모든 후보 출력에 재사용
+# ============================================================================
+
+class ScoringContext:
+    """
+    한 최적화 요청의 기대 결과/키워드/금지어로 후보 출력들을 채점
+
+    요청의 모든 변이는 같은 기준으로 채점되므로 참조 텍스트 정규화, 소문자 키워드/금지어 패턴,
+    패턴 매처를 생성 시 한 번만 만들고, 출력마다 소문자 변환도 한 번만 한다.
+    점수는 composite_score, final_score_with_forbidden_check, composite_score_batch와 같다.
+    (token_set_ratio의 공백 기준이 str.split()과 달라 참조 토큰 집합은 미리 만들지 않음)
+    """
+
+    def __init__(self, reference: str, required_keywords: Optional[Iterable[str]] = None, forbidden_words: Optional[Iterable[str]] = None, weights: Dict[str, float] = SCORE_WEIGHTS):
+        self.reference = reference
+        self.required_keywords = list(required_keywords or [])
+        self.forbidden_words = list(forbidden_words or [])
+        self.weights = weights
+        self.normalized_reference = normalize(reference)
+        self.keyword_patterns = _keyword_patterns(self.required_keywords)
+        self.forbidden_patterns = _forbidden_patterns(self.forbidden_words)
+        self.matcher = PatternMatcher(self.required_keywords, self.forbidden_words)
+
+    def scan(self, output: str) -> Set[str]:
+        """출력에 포함된 키워드/금지어/보너스 지표 (여러 채점에서 found 인자로 공유할 때 사용)"""
+        return self.matcher.scan(output)
+
+    def cosine_similarity(self, output: str) -> float:
+        return _cosine_curve(fuzz.ratio(normalize(output), self.normalized_reference) / 100.0)
+
+    def rouge_l_score(self, output: str) -> float:
+        return _rouge_curve(fuzz.token_set_ratio(output, self.reference) / 100.0)
+
+    def keyword_coverage(self, output: str, found: Optional[Set[str]] = None) -> float:
+        if not self.keyword_patterns:
+            return 1.0
+        return _keyword_coverage(_contains(output.lower(), found), self.keyword_patterns)
+
+    def forbidden_penalty(self, output: str, found: Optional[Set[str]] = None) -> float:
+        return _forbidden_penalty(_contains(output.lower(), found), self.forbidden_patterns)
+
+    def composite_score(self, output: str, found: Optional[Set[str]] = None) -> float:
+        """composite_score와 같은 복합 점수 (금지어 페널티 제외)"""
+        return self._composite_score(output, output.lower(), found)
+
+    def final_score(self, output: str, found: Optional[Set[str]] = None) -> float:
+        """
+        금지어 페널티까지 적용한 최종 점수 (final_score_with_forbidden_check와 같음)
+
+        found가 없으면 패턴을 소문자 출력에서 직접 확인한다 (출력 하나에는 매처 스캔보다 빠름).
+        """
+        output_lower = output.lower()
+        penalty = _forbidden_penalty(_contains(output_lower, found), self.forbidden_patterns)
+        return round(self._composite_score(output, output_lower, found) * penalty, 3)
+
+    def _composite_score(self, output: str, output_lower: str, found: Optional[Set[str]]) -> float:
+        # 출력의 소문자 변환은 한 번만 (정규화, 키워드 확인에 공유)
+        keyword_score = _keyword_coverage(_contains(output_lower, found), self.keyword_patterns) if self.keyword_patterns else 1.0
+        return _combine_scores(
+            _cosine_curve(fuzz.ratio(' '.join(output_lower.split()), self.normalized_reference) / 100.0),
+            self.rouge_l_score(output),
+            keyword_score,
+            calculate_bonus_score(output, self.reference, found),
+            self.weights,
+        )
+
+    def final_score_batch(self, outputs: Sequence[str], found_sets: Optional[Sequence[Set[str]]] = None) -> "np.ndarray":
+        """final_score의 배치 버전"""
+        if found_sets is None:
+            found_sets = [self.scan(output) for output in outputs]
+        return composite_score_batch(
+            outputs, self.reference, self.required_keywords, self.forbidden_words,
+            found_sets=found_sets, weights=self.weights
+        )
+
+    def forbidden_penalty_batch(self, outputs: Sequence[str], found_sets: Optional[Sequence[Set[str]]] = None) -> "np.ndarray":
+        """forbidden_penalty의 배치 버전"""
+        return check_forbidden_words_batch(outputs, self.forbidden_words, found_sets)
+
+def warm_up():
+    """배치 채점 의존성(numpy, rapidfuzz cdist) 미리 로드 - 애플리케이션 시작 후 백그라운드 스레드에서 호출"""
+    composite_score_batch(["warm up"], "warm up", ["warm"], ["up"])
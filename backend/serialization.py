@@ -0,0 +1,53 @@
+"""
+JSON 직렬화 - REST 응답, WebSocket 메시지, SSE 이벤트, 공유 상태 저장에 공통 사용
+
+- orjson이 설치되어 있으면 사용하고, 없으면 표준 json으로 같은 형식(UTF-8, 공백 없는 구분자)을 생성
+- datetime은 ISO 8601 문자열, numpy 값은 파이썬 숫자/리스트로 변환
+- 결과는 UTF-8 bytes이므로 WebSocket은 send_bytes로 추가 인코딩 없이 전송
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Union
+from fastapi import WebSocket
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # numpy 스칼라/배열 (orjson 미설치 시)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    """dumps()로 직렬화하는 JSON 응답 (한글 표시를 위해 charset=utf-8 명시)"""
+
+    media_type = "application/json; charset=utf-8"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+async def send_payload(websocket: WebSocket, message: Any):
+    """메시지를 한 번 직렬화하여 바이너리 프레임으로 전송"""
+    await websocket.send_bytes(dumps(message))
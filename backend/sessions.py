@@ -0,0 +1,307 @@
+"""
+채팅 세션 저장소 - 메모리 사용량이 무한히 늘지 않도록 세션 수와 메시지 수를 제한
+
+- 세션 수가 max_sessions를 넘으면 가장 오래 사용하지 않은 세션부터 제거 (LRU)
+- idle_ttl 동안 활동이 없는 세션은 백그라운드 태스크에서 주기적으로 제거
+- 세션별 메시지는 최근 max_messages개만 보관
+- 연결된 WebSocket이 있는 세션은 제거하지 않음 (메시지 전달은 broadcast.Broadcaster 담당)
+
+공유 상태 백엔드(state.StateBackend.shared)를 사용하면 세션과 메시지는 공유 저장소에 기록되고,
+프로세스별 저장소는 캐시로 동작한다. 새 메시지는 CHAT_MESSAGE_CHANNEL로 모든 워커에 알려져
+각 워커의 캐시와 연결된 클라이언트에 반영된다. 대화 요약(chat_context)은 워커별 캐시에만 보관한다.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+from config import settings
+from state import StateBackend, state_backend
+from usage import UsageTracker
+
+logger = logging.getLogger(__name__)
+
+# 공유 상태 네임스페이스 (세션 메타데이터는 키-값, 메시지는 같은 키의 리스트)
+SESSION_NAMESPACE = "chat_session"
+# 새 메시지 알림 채널 - {"session_id", "message", "origin"}
+CHAT_MESSAGE_CHANNEL = "chat.message"
+
+# 메시지 딕셔너리 하나의 대략적인 고정 비용 (키, 타임스탬프, dict 자체) - 본문 길이에 더해 추정
+MESSAGE_OVERHEAD_BYTES = 400
+
+def estimate_message_bytes(message: Dict) -> int:
+    return MESSAGE_OVERHEAD_BYTES + len(message.get("message", "").encode("utf-8"))
+
+def process_rss_bytes() -> Optional[int]:
+    """현재 프로세스 RSS (바이트), 확인할 수 없으면 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # /proc이 없는 환경(macOS 등)에서는 최대 RSS로 대체 (macOS는 바이트, Linux는 KB 단위)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class ChatSessionEntry:
+    """세션 메타데이터, 최근 메시지, 마지막 활동 시각"""
+
+    def __init__(self, session: Dict, max_messages: int):
+        self.session = session
+        self.messages: Deque[Dict] = deque(maxlen=max_messages)
+        self.message_bytes = 0
+        self.dropped_messages = 0
+        self.last_active = time.monotonic()
+        # 지금까지 저장한 메시지 수 (메시지 순번 계산용 - 앞쪽이 잘려도 순번은 유지)
+        self.message_count = 0
+        # 대화 요약 (chat_context) - 순번이 summary_upto 미만인 메시지가 요약에 반영됨
+        self.summary = ""
+        self.summary_upto = 0
+        self.summary_lock = asyncio.Lock()
+        # 채팅 응답/요약에 사용한 토큰 (이 워커에서 생성한 응답 기준)
+        self.usage = UsageTracker()
+
+    def add_message(self, message: Dict):
+        if len(self.messages) == self.messages.maxlen:
+            self.message_bytes -= estimate_message_bytes(self.messages[0])
+            self.dropped_messages += 1
+        self.messages.append(message)
+        self.message_count += 1
+        self.message_bytes += estimate_message_bytes(message)
+        if message.get("timestamp"):
+            self.session["last_message_at"] = message["timestamp"]
+
+    def numbered_messages(self) -> List[tuple]:
+        """보관 중인 메시지를 (순번, 메시지) 목록으로 반환"""
+        first = self.message_count - len(self.messages)
+        return list(enumerate(self.messages, start=first))
+
+    def to_dict(self) -> Dict:
+        return {"session": self.session, "messages": list(self.messages), "usage": self.usage.to_dict()}
+
+class SessionRegistry:
+    """크기 제한과 유휴 세션 정리가 있는 채팅 세션/연결 저장소"""
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        reap_interval: Optional[float] = None,
+        state: Optional[StateBackend] = None
+    ):
+        self.max_sessions = max(1, max_sessions or settings.chat_max_sessions)
+        self.max_messages = max(1, max_messages or settings.chat_max_messages_per_session)
+        self.idle_ttl = settings.chat_session_idle_ttl if idle_ttl is None else idle_ttl
+        self.reap_interval = reap_interval or settings.chat_reap_interval
+        self._sessions: "OrderedDict[str, ChatSessionEntry]" = OrderedDict()
+        # 세션별 열린 WebSocket 수 (탭/상담원마다 하나씩)
+        self.connections: Dict[str, int] = {}
+        self.evictions = {"lru": 0, "idle": 0}
+        self._reaper: Optional[asyncio.Task] = None
+        self.state = state or state_backend
+        # 이 프로세스에서 보낸 메시지 알림을 구분하기 위한 ID (이미 캐시에 반영됨)
+        self.origin = uuid.uuid4().hex
+        self.state.subscribe(CHAT_MESSAGE_CHANNEL, self._on_message)
+
+    def start(self):
+        """유휴 세션 정리 태스크 시작 (이벤트 루프 안에서 호출, 이미 실행 중이면 무시)"""
+        if self._reaper is not None and not self._reaper.done():
+            return
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def add(self, session_id: str, session: Dict) -> ChatSessionEntry:
+        """세션 추가 후 max_sessions를 넘으면 LRU 순으로 제거"""
+        entry = ChatSessionEntry(session, self.max_messages)
+        self._sessions[session_id] = entry
+        self._evict_overflow()
+        return entry
+
+    def get(self, session_id: str) -> Optional[ChatSessionEntry]:
+        """세션 조회 (조회도 활동으로 보고 LRU 순서 갱신)"""
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            self.touch(session_id)
+        return entry
+
+    def touch(self, session_id: str):
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            entry.last_active = time.monotonic()
+            self._sessions.move_to_end(session_id)
+
+    def add_message(self, session_id: str, message: Dict) -> bool:
+        """메시지 저장 (세션이 없으면 False)"""
+        entry = self.get(session_id)
+        if entry is None:
+            return False
+        entry.add_message(message)
+        return True
+
+    @property
+    def _ttl(self) -> Optional[float]:
+        return self.idle_ttl if self.idle_ttl > 0 else None
+
+    async def create(self, session_id: str, session: Dict) -> ChatSessionEntry:
+        """세션 생성 (공유 상태를 사용하면 다른 워커에서도 조회 가능)"""
+        entry = self.add(session_id, session)
+        if self.state.shared:
+            await self.state.set(SESSION_NAMESPACE, session_id, session, ttl=self._ttl)
+        return entry
+
+    async def load(self, session_id: str) -> Optional[ChatSessionEntry]:
+        """세션 조회 - 이 워커의 캐시에 없으면 공유 상태에서 불러옴"""
+        entry = self.get(session_id)
+        if entry is not None or not self.state.shared:
+            return entry
+        session = await self.state.get(SESSION_NAMESPACE, session_id)
+        if session is None:
+            return None
+        messages = await self.state.items(SESSION_NAMESPACE, session_id)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            # 불러오는 동안 다른 요청이 먼저 캐시에 넣지 않은 경우에만 추가
+            entry = self.add(session_id, session)
+            for message in messages[-self.max_messages:]:
+                entry.add_message(message)
+        return entry
+
+    async def post_message(self, session_id: str, message: Dict) -> bool:
+        """
+        메시지 저장 후 모든 워커에 알림 (세션이 없으면 False)
+
+        이 워커의 캐시에는 바로 반영하고, CHAT_MESSAGE_CHANNEL 구독자(브로드캐스터 등)는
+        이 워커를 포함한 모든 워커에서 호출된다.
+        """
+        entry = await self.load(session_id)
+        if entry is None:
+            return False
+        entry.add_message(message)
+        if self.state.shared:
+            await self.state.append(SESSION_NAMESPACE, session_id, message, self.max_messages, ttl=self._ttl)
+            await self.state.set(SESSION_NAMESPACE, session_id, entry.session, ttl=self._ttl)
+        await self.state.publish(CHAT_MESSAGE_CHANNEL, {"session_id": session_id, "message": message, "origin": self.origin})
+        return True
+
+    async def _on_message(self, event: Dict):
+        # 다른 워커에서 저장한 메시지를 이 워커의 캐시에 반영 (캐시에 없는 세션은 다음 조회 때 불러옴)
+        if event.get("origin") == self.origin:
+            return
+        entry = self._sessions.get(event["session_id"])
+        if entry is not None:
+            entry.add_message(event["message"])
+
+    async def list_sessions(self) -> List[Dict]:
+        if self.state.shared:
+            return await self.state.values(SESSION_NAMESPACE)
+        return self.sessions()
+
+    def sessions(self) -> List[Dict]:
+        return [entry.session for entry in self._sessions.values()]
+
+    def remove(self, session_id: str) -> Optional[ChatSessionEntry]:
+        self.connections.pop(session_id, None)
+        return self._sessions.pop(session_id, None)
+
+    def connect(self, session_id: str):
+        self.connections[session_id] = self.connections.get(session_id, 0) + 1
+        self.touch(session_id)
+
+    def disconnect(self, session_id: str):
+        """연결 하나 해제 (유휴 시간은 마지막 연결이 끊긴 시점부터 계산)"""
+        remaining = self.connections.get(session_id, 0) - 1
+        if remaining > 0:
+            self.connections[session_id] = remaining
+        else:
+            self.connections.pop(session_id, None)
+        self.touch(session_id)
+
+    def _evict_overflow(self):
+        # 오래된 순으로 순회하며 연결 중인 세션은 건너뜀 (모두 연결 중이면 일시적으로 한도 초과 허용)
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow <= 0:
+            return
+        victims = [
+            session_id for session_id in self._sessions
+            if session_id not in self.connections
+        ][:overflow]
+        for session_id in victims:
+            del self._sessions[session_id]
+        self.evictions["lru"] += len(victims)
+        if victims:
+            logger.info(f"Evicted {len(victims)} least recently used chat sessions")
+        if len(victims) < overflow:
+            logger.warning(f"Chat sessions over limit ({len(self._sessions)}/{self.max_sessions}): remaining sessions are connected")
+
+    def evict_idle(self) -> int:
+        """idle_ttl 동안 활동이 없고 연결도 없는 세션 제거, 제거한 수 반환"""
+        if self.idle_ttl <= 0:
+            return 0
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = []
+        # LRU 순서이므로 활동 시각이 cutoff 이후인 세션을 만나면 중단
+        for session_id, entry in self._sessions.items():
+            if entry.last_active > cutoff:
+                break
+            if session_id not in self.connections:
+                expired.append(session_id)
+        for session_id in expired:
+            del self._sessions[session_id]
+        self.evictions["idle"] += len(expired)
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle chat sessions")
+        return len(expired)
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                self.evict_idle()
+                if self.state.shared and self._ttl:
+                    # 연결 중인 세션은 공유 상태에서 만료되지 않도록 갱신한 뒤 만료된 세션 정리
+                    for session_id in list(self.connections):
+                        await self.state.expire(SESSION_NAMESPACE, session_id, self._ttl)
+                    await self.state.purge_expired()
+            except Exception as e:
+                logger.error(f"Error evicting idle chat sessions: {e}")
+
+    def stats(self) -> Dict:
+        """세션 수, 메시지 수, 추정 메모리 사용량 (워커 크기 산정용)"""
+        message_bytes = sum(entry.message_bytes + len(entry.summary.encode("utf-8")) for entry in self._sessions.values())
+        messages = sum(len(entry.messages) for entry in self._sessions.values())
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "connections": sum(self.connections.values()),
+            "messages": messages,
+            "max_messages_per_session": self.max_messages,
+            "dropped_messages": sum(entry.dropped_messages for entry in self._sessions.values()),
+            "idle_ttl": self.idle_ttl,
+            "evictions": dict(self.evictions),
+            "estimated_message_bytes": message_bytes,
+            "estimated_bytes_per_session": round(message_bytes / len(self._sessions)) if self._sessions else 0,
+            "process_rss_bytes": process_rss_bytes(),
+            "state": self.state.stats(),
+        }
+
+session_registry = SessionRegistry()
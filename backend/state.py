@@ -0,0 +1,382 @@
+"""
+공유 상태 / pub-sub 백엔드 - 채팅 세션, 브로드캐스트, 최적화 중단 신호를 여러 워커 프로세스에서 공유
+
+- memory: 프로세스 내부 딕셔너리 (기본값, 단일 워커)
+- sqlite: 같은 호스트의 여러 워커 프로세스가 SQLite 파일(상태)과 Unix 도메인 소켓(pub/sub)을 공유
+  (uvicorn --workers N으로 실행할 때 사용)
+
+publish한 메시지는 보낸 프로세스를 포함한 모든 프로세스의 구독 핸들러로 전달된다.
+"""
+
+import asyncio
+import glob
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from config import settings
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKENDS = ("memory", "sqlite")
+
+# pub/sub 데이터그램 최대 크기 (수신 버퍼 크기) - 이보다 큰 메시지는 본문을 kv 테이블에 저장하고 키만 전송
+MAX_DATAGRAM_BYTES = 65536
+PUBSUB_NAMESPACE = "pubsub"
+PUBSUB_BODY_TTL = 60  # 초, 모든 워커가 읽을 시간 (이후 purge_expired로 정리)
+
+Handler = Callable[[Dict], Awaitable[None]]
+
+class StateBackend:
+    """
+    공유 상태 인터페이스
+
+    - 키-값: namespace/key별 JSON 딕셔너리 (ttl이 지나면 만료)
+    - 리스트: namespace/key별 최근 max_length개 항목 (채팅 메시지 등)
+    - pub/sub: channel별 JSON 메시지를 모든 프로세스의 핸들러로 전달
+    """
+
+    # True면 여러 프로세스가 상태를 공유 (False면 호출자가 자체 메모리를 원본으로 사용해도 됨)
+    shared = False
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    async def start(self):
+        """이벤트 루프 안에서 호출 (pub/sub 수신 시작)"""
+
+    async def close(self):
+        """리소스 정리"""
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def _dispatch(self, channel: str, message: Dict):
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"Error handling '{channel}' message: {e}")
+
+    async def publish(self, channel: str, message: Dict):
+        raise NotImplementedError
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def set(self, namespace: str, key: str, value: Dict, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    async def values(self, namespace: str) -> List[Dict]:
+        raise NotImplementedError
+
+    async def expire(self, namespace: str, key: str, ttl: float):
+        """키-값과 같은 키의 리스트 만료 시각 갱신"""
+        raise NotImplementedError
+
+    async def append(self, namespace: str, key: str, item: Dict, max_length: int, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def items(self, namespace: str, key: str) -> List[Dict]:
+        raise NotImplementedError
+
+    async def purge_expired(self) -> int:
+        """만료된 키-값/리스트 제거, 제거한 키 수 반환"""
+        return 0
+
+    def stats(self) -> Dict:
+        return {"backend": type(self).__name__, "shared": self.shared}
+
+class MemoryStateBackend(StateBackend):
+    """프로세스 내부 상태 (단일 워커용)"""
+
+    def __init__(self):
+        super().__init__()
+        self._values: Dict[Tuple[str, str], Tuple[Dict, Optional[float]]] = {}
+        self._lists: Dict[Tuple[str, str], Deque[Dict]] = {}
+
+    async def publish(self, channel: str, message: Dict):
+        await self._dispatch(channel, message)
+
+    def _expired(self, expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at < time.time()
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict]:
+        entry = self._values.get((namespace, key))
+        if entry is None or self._expired(entry[1]):
+            return None
+        return entry[0]
+
+    async def set(self, namespace: str, key: str, value: Dict, ttl: Optional[float] = None):
+        self._values[(namespace, key)] = (value, time.time() + ttl if ttl else None)
+
+    async def delete(self, namespace: str, key: str):
+        self._values.pop((namespace, key), None)
+        self._lists.pop((namespace, key), None)
+
+    async def values(self, namespace: str) -> List[Dict]:
+        return [value for (ns, _), (value, expires_at) in self._values.items() if ns == namespace and not self._expired(expires_at)]
+
+    async def expire(self, namespace: str, key: str, ttl: float):
+        entry = self._values.get((namespace, key))
+        if entry is not None:
+            self._values[(namespace, key)] = (entry[0], time.time() + ttl)
+
+    async def append(self, namespace: str, key: str, item: Dict, max_length: int, ttl: Optional[float] = None):
+        items = self._lists.get((namespace, key))
+        if items is None or items.maxlen != max_length:
+            items = self._lists[(namespace, key)] = deque(items or [], maxlen=max_length)
+        items.append(item)
+
+    async def items(self, namespace: str, key: str) -> List[Dict]:
+        return list(self._lists.get((namespace, key), []))
+
+    async def purge_expired(self) -> int:
+        expired = [key for key, (_, expires_at) in self._values.items() if self._expired(expires_at)]
+        for key in expired:
+            await self.delete(*key)
+        return len(expired)
+
+class SQLiteStateBackend(StateBackend):
+    """
+    같은 호스트의 워커 프로세스 간 공유 상태
+
+    상태는 SQLite 파일(WAL)에 저장하고, pub/sub은 socket_dir 안에 프로세스별로 만든
+    Unix 데이터그램 소켓으로 전달한다 (publish는 디렉터리의 모든 소켓으로 전송).
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str, socket_dir: Optional[str] = None):
+        super().__init__()
+        self.db_path = db_path
+        self.socket_dir = socket_dir or f"{db_path}.sockets"
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db_lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._socket_path = ""
+        # 수신한 메시지는 순서대로 하나의 태스크에서 처리 (채팅 메시지 순서 유지)
+        self._inbox: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+        self.send_failures = 0
+        self.spilled = 0  # 본문을 kv 테이블로 넘긴 큰 메시지 수
+        self.missing_bodies = 0  # 수신했지만 본문을 찾지 못한(만료된) 메시지 수
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS list_items ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                "value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS list_items_key ON list_items (namespace, key, id)")
+            self._db.commit()
+
+    async def start(self):
+        if self._socket is not None:
+            return
+        os.makedirs(self.socket_dir, exist_ok=True)
+        self._socket_path = os.path.join(self.socket_dir, f"{os.getpid()}.sock")
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self._socket_path)
+        self._socket.setblocking(False)
+        self._inbox = asyncio.Queue()
+        self._consumer = asyncio.create_task(self._consume())
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._on_readable)
+        logger.info(f"Shared state: {self.db_path}, pub/sub socket {self._socket_path}")
+
+    async def close(self):
+        if self._consumer is not None:
+            self._consumer.cancel()
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        if self._socket is not None:
+            asyncio.get_running_loop().remove_reader(self._socket.fileno())
+            self._socket.close()
+            self._socket = None
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self._socket.recv(MAX_DATAGRAM_BYTES)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.error(f"Error receiving pub/sub message: {e}")
+                return
+            self.received += 1
+            self._inbox.put_nowait(data)
+
+    async def _consume(self):
+        while True:
+            data = await self._inbox.get()
+            try:
+                envelope = loads(data)
+            except ValueError as e:
+                logger.error(f"Invalid pub/sub message: {e}")
+                continue
+            if "ref" in envelope:
+                message = await self.get(PUBSUB_NAMESPACE, envelope["ref"])
+                if message is None:
+                    self.missing_bodies += 1
+                    logger.error(f"Pub/sub message body {envelope['ref']} on '{envelope['channel']}' not found")
+                    continue
+            else:
+                message = envelope["message"]
+            await self._dispatch(envelope["channel"], message)
+
+    def _send_all(self, data: bytes):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for path in glob.glob(os.path.join(self.socket_dir, "*.sock")):
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # 종료된 워커가 남긴 소켓 파일
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                except OSError as e:
+                    self.send_failures += 1
+                    logger.error(f"Error publishing to {path}: {e}")
+
+    async def publish(self, channel: str, message: Dict):
+        data = dumps({"channel": channel, "message": message})
+        if len(data) > MAX_DATAGRAM_BYTES:
+            # 데이터그램 하나에 담을 수 없으면 (수신 측에서 잘림) 본문은 SQLite에 두고 키만 전송
+            ref = uuid.uuid4().hex
+            await self.set(PUBSUB_NAMESPACE, ref, message, ttl=PUBSUB_BODY_TTL)
+            data = dumps({"channel": channel, "ref": ref})
+            self.spilled += 1
+        self.published += 1
+        await asyncio.to_thread(self._send_all, data)
+
+    def _execute(self, query: str, params: tuple = (), fetch: bool = False):
+        with self._db_lock:
+            cursor = self._db.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+            self._db.commit()
+        return rows
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, key, time.time()), True
+        )
+        return loads(rows[0][0]) if rows else None
+
+    async def set(self, namespace: str, key: str, value: Dict, ttl: Optional[float] = None):
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, dumps(value).decode("utf-8"), time.time() + ttl if ttl else None)
+        )
+
+    def _delete(self, namespace: str, key: str):
+        with self._db_lock:
+            self._db.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+            self._db.execute("DELETE FROM list_items WHERE namespace = ? AND key = ?", (namespace, key))
+            self._db.commit()
+
+    async def delete(self, namespace: str, key: str):
+        await asyncio.to_thread(self._delete, namespace, key)
+
+    async def values(self, namespace: str) -> List[Dict]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT value FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (namespace, time.time()), True
+        )
+        return [loads(row[0]) for row in rows]
+
+    def _expire(self, namespace: str, key: str, expires_at: float):
+        with self._db_lock:
+            self._db.execute("UPDATE kv SET expires_at = ? WHERE namespace = ? AND key = ?", (expires_at, namespace, key))
+            self._db.execute("UPDATE list_items SET expires_at = ? WHERE namespace = ? AND key = ?", (expires_at, namespace, key))
+            self._db.commit()
+
+    async def expire(self, namespace: str, key: str, ttl: float):
+        await asyncio.to_thread(self._expire, namespace, key, time.time() + ttl)
+
+    def _append(self, namespace: str, key: str, value: str, max_length: int, expires_at: Optional[float]):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO list_items (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at)
+            )
+            # 최근 max_length개만 유지
+            self._db.execute(
+                "DELETE FROM list_items WHERE namespace = ? AND key = ? AND id NOT IN ("
+                "SELECT id FROM list_items WHERE namespace = ? AND key = ? ORDER BY id DESC LIMIT ?)",
+                (namespace, key, namespace, key, max_length)
+            )
+            self._db.commit()
+
+    async def append(self, namespace: str, key: str, item: Dict, max_length: int, ttl: Optional[float] = None):
+        await asyncio.to_thread(
+            self._append, namespace, key, dumps(item).decode("utf-8"), max_length, time.time() + ttl if ttl else None
+        )
+
+    async def items(self, namespace: str, key: str) -> List[Dict]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT value FROM list_items WHERE namespace = ? AND key = ? ORDER BY id",
+            (namespace, key), True
+        )
+        return [loads(row[0]) for row in rows]
+
+    def _purge_expired(self) -> int:
+        now = time.time()
+        with self._db_lock:
+            purged = self._db.execute("DELETE FROM kv WHERE expires_at < ?", (now,)).rowcount
+            self._db.execute("DELETE FROM list_items WHERE expires_at < ?", (now,))
+            self._db.commit()
+        return purged
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(self._purge_expired)
+
+    def stats(self) -> Dict:
+        return {
+            **super().stats(),
+            "db_path": self.db_path,
+            "workers": len(glob.glob(os.path.join(self.socket_dir, "*.sock"))),
+            "published": self.published,
+            "received": self.received,
+            "send_failures": self.send_failures,
+            "spilled": self.spilled,
+            "missing_bodies": self.missing_bodies,
+        }
+
+def create_state_backend() -> StateBackend:
+    """settings.state_backend에 따라 상태 백엔드 생성"""
+    name = settings.state_backend
+    if name == "memory":
+        return MemoryStateBackend()
+    if name == "sqlite":
+        return SQLiteStateBackend(settings.state_path, settings.state_socket_dir or None)
+    raise ValueError(f"Unknown state backend: {name} (expected one of {STATE_BACKENDS})")
+
+state_backend = create_state_backend()
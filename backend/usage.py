@@ -0,0 +1,78 @@
+"""
+LLM 토큰 사용량/비용 집계 - 호출 위치(call_site)별로 누적하여 비용이 큰 단계를 찾는 데 사용
+
+- 전역(usage_totals), 최적화 실행별(SimpleOptimizer.usage), 채팅 세션별(ChatSessionEntry.usage)로 집계
+- 백엔드가 사용량을 보고하지 않으면 (dummy 백엔드, 스트리밍 사용량을 주지 않는 호환 서버 등) 글자 수로 추정하고 estimated_calls로 표시
+- 비용은 settings의 1K 토큰당 단가로 계산 (모델별 단가는 구분하지 않음)
+"""
+
+from dataclasses import dataclass
+from typing import Dict
+from config import settings
+
+@dataclass
+class TokenUsage:
+    """LLM 호출 한 번의 토큰 사용량 (백엔드가 채움)"""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False
+
+    @property
+    def reported(self) -> bool:
+        return self.prompt_tokens > 0 or self.completion_tokens > 0
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return (
+        prompt_tokens * settings.llm_prompt_cost_per_1k
+        + completion_tokens * settings.llm_completion_cost_per_1k
+    ) / 1000
+
+def _summary(counts: Dict[str, int]) -> Dict:
+    return {
+        **counts,
+        "total_tokens": counts["prompt_tokens"] + counts["completion_tokens"],
+        "cost_usd": round(estimate_cost(counts["prompt_tokens"], counts["completion_tokens"]), 6),
+    }
+
+class UsageTracker:
+    """호출 위치별 호출 수/캐시 적중 수/토큰 수 누적"""
+
+    FIELDS = ("calls", "cached_calls", "estimated_calls", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.by_call_site: Dict[str, Dict[str, int]] = {}
+
+    def _counts(self, call_site: str) -> Dict[str, int]:
+        return self.by_call_site.setdefault(call_site, dict.fromkeys(self.FIELDS, 0))
+
+    def record(self, call_site: str, usage: TokenUsage):
+        counts = self._counts(call_site)
+        counts["calls"] += 1
+        counts["estimated_calls"] += int(usage.estimated)
+        counts["prompt_tokens"] += usage.prompt_tokens
+        counts["completion_tokens"] += usage.completion_tokens
+
+    def record_cache_hit(self, call_site: str):
+        self._counts(call_site)["cached_calls"] += 1
+
+    def totals(self) -> Dict[str, int]:
+        totals = dict.fromkeys(self.FIELDS, 0)
+        for counts in self.by_call_site.values():
+            for name in self.FIELDS:
+                totals[name] += counts[name]
+        return totals
+
+    def to_dict(self) -> Dict:
+        """합계와 호출 위치별 사용량 (토큰이 많은 순)"""
+        by_call_site = sorted(
+            self.by_call_site.items(),
+            key=lambda item: item[1]["prompt_tokens"] + item[1]["completion_tokens"],
+            reverse=True
+        )
+        return {
+            **_summary(self.totals()),
+            "by_call_site": {call_site: _summary(counts) for call_site, counts in by_call_site},
+        }
+
+# 프로세스 전체 누적 사용량
+usage_totals = UsageTracker()
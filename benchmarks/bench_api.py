@@ -0,0 +1,118 @@
+"""
+HTTP/WebSocket 처리량 벤치마크 - /api/prompt-optimization/optimize, /ws/optimization
+
+앱을 인프로세스(starlette TestClient)로 띄우고 모의 LLM 백엔드를 사용한다.
+동시 요청 수(concurrency)만큼 스레드에서 요청을 보내 처리량(req/s)과 지연 시간을 측정한다.
+"""
+
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from bench_optimizer import REQUEST, install_mock_backend
+from common import setup_backend, summarize
+
+def run_concurrently(func, requests: int, concurrency: int) -> Tuple[List, float]:
+    """func(i)를 requests번 concurrency개 스레드로 실행하고 (결과 목록, 전체 소요 시간) 반환"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(func, range(requests)))
+    return results, time.perf_counter() - started
+
+def bench_http(client, requests: int, concurrency: int, payload: Dict) -> Dict:
+    def send(_: int) -> Tuple[float, int]:
+        started = time.perf_counter()
+        response = client.post("/api/prompt-optimization/optimize", json=payload)
+        return time.perf_counter() - started, response.status_code
+
+    results, elapsed = run_concurrently(send, requests, concurrency)
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, status in results if status != 200)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 3),
+        "latency_ms": summarize(latencies, scale=1e3),
+    }
+
+def bench_websocket(client, requests: int, concurrency: int, payload: Dict) -> Dict:
+    def session(_: int) -> Tuple[float, float, int, bool]:
+        started = time.perf_counter()
+        first_result = None
+        messages = 0
+        completed = False
+        with client.websocket_connect(f"/ws/optimization/{uuid.uuid4()}") as websocket:
+            websocket.send_text(json.dumps({"type": "optimization_request", **payload}))
+            while True:
+                message = json.loads(websocket.receive_bytes())
+                messages += 1
+                if first_result is None and message["type"] == "evaluation_result":
+                    first_result = time.perf_counter() - started
+                if message["type"] in ("complete", "error"):
+                    completed = message["type"] == "complete"
+                    break
+        elapsed = time.perf_counter() - started
+        return elapsed, first_result if first_result is not None else elapsed, messages, completed
+
+    results, elapsed = run_concurrently(session, requests, concurrency)
+    return {
+        "sessions": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for *_, completed in results if not completed),
+        "throughput_sessions_per_s": round(requests / elapsed, 3),
+        "latency_ms": summarize([r[0] for r in results], scale=1e3),
+        "first_result_ms": summarize([r[1] for r in results], scale=1e3),
+        "messages": summarize([r[2] for r in results], digits=2),
+    }
+
+def run(requests: int = 16, concurrency: int = 4, latency_ms: float = 200.0, jitter_ms: float = 50.0, tokens_per_second: float = 0.0, seed: int = 42, judge_mode: str = "single") -> Dict:
+    """
+    REST 최적화 API와 최적화 WebSocket의 처리량 측정
+
+    Args:
+        requests: 엔드포인트별 총 요청(세션) 수
+        concurrency: 동시 요청 수
+        judge_mode: 요청에 포함할 평가 모드 (single | batch)
+    """
+    setup_backend()
+    import llm
+    from fastapi.testclient import TestClient
+    from main import app
+
+    mock_backend, previous = install_mock_backend(latency_ms, jitter_ms, tokens_per_second, seed)
+    if llm.response_cache is not None:
+        llm.response_cache.clear()
+    payload = {**REQUEST, "judge_mode": judge_mode}
+
+    try:
+        with TestClient(app) as client:
+            calls_before = mock_backend.mock.requests
+            http = bench_http(client, requests, concurrency, payload)
+            http["llm_calls"] = mock_backend.mock.requests - calls_before
+
+            calls_before = mock_backend.mock.requests
+            websocket = bench_websocket(client, requests, concurrency, payload)
+            websocket["llm_calls"] = mock_backend.mock.requests - calls_before
+    finally:
+        llm.set_backend(previous)
+
+    return {
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "tokens_per_second": tokens_per_second,
+            "seed": seed,
+            "judge_mode": judge_mode,
+            "llm_max_in_flight": llm.settings.llm_max_in_flight,
+        },
+        "http_optimize": http,
+        "ws_optimization": websocket,
+    }
+
+if __name__ == "__main__":
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
@@ -0,0 +1,134 @@
+"""
+최적화 엔드투엔드 벤치마크 - optimize_prompt_simple / optimize_prompt_streaming
+
+모의 LLM 백엔드(mock_llm.MockLLM)로 실제와 비슷한 지연 시간을 재현하고,
+실행당 LLM 호출 수, 벽시계 시간, p50/p95를 평가 모드별로 측정한다.
+"""
+
+import asyncio
+import time
+from typing import Dict, List
+
+from common import setup_backend, summarize
+
+REQUEST = {
+    "user_input": "프로젝트 계획서 만들기",
+    "expected_output": "구체적이고 실행 가능한 프로젝트 계획서로, 목표, 일정, 리소스를 포함",
+    "product_name": "프로젝트",
+    "exclude_keywords": ["불가능", "어려움"],
+    "custom_mutators": ["실행 가능한 구체적 단계 포함", "일정과 담당자 명시"],
+}
+
+# 모드 이름 -> optimize_prompt_* 키워드 인자
+MODES = {
+    "single": {"judge_mode": "single", "prefilter_top_k": 0},
+    "batch": {"judge_mode": "batch", "prefilter_top_k": 0},
+    "prefilter_top2": {"judge_mode": "single", "prefilter_top_k": 2},
+    # 대표 입력 + 7개 테스트 입력에 대한 연속 반감 레이스
+    "race_8_inputs": {
+        "judge_mode": "single",
+        "prefilter_top_k": 0,
+        "test_inputs": [f"{REQUEST['user_input']} (사례 {i})" for i in range(1, 8)],
+    },
+}
+
+def install_mock_backend(latency_ms: float, jitter_ms: float, tokens_per_second: float, seed: int):
+    """모의 백엔드를 설치하고 (백엔드, 이전 백엔드) 반환"""
+    import llm
+    from mock_llm import MockLLMConfig
+
+    config = MockLLMConfig(
+        latency_ms=latency_ms,
+        latency_jitter_ms=jitter_ms,
+        latency_distribution="lognormal" if jitter_ms > 0 else "constant",
+        tokens_per_second=tokens_per_second,
+        seed=seed,
+    )
+    mock_backend = llm.MockBackend(config)
+    return mock_backend, llm.set_backend(mock_backend)
+
+async def bench_simple(mode: Dict, runs: int, mock_backend) -> Dict:
+    from autopromptix_efficient import optimize_prompt_simple
+
+    wall, calls = [], []
+    for _ in range(runs):
+        before = mock_backend.mock.requests
+        started = time.perf_counter()
+        await optimize_prompt_simple(**REQUEST, **mode)
+        wall.append(time.perf_counter() - started)
+        calls.append(mock_backend.mock.requests - before)
+    return {"wall_ms": summarize(wall, scale=1e3), "llm_calls": summarize(calls, digits=2)}
+
+async def bench_streaming(mode: Dict, runs: int, mock_backend) -> Dict:
+    from autopromptix_efficient import optimize_prompt_streaming
+
+    wall, first_output, first_result, calls, event_counts = [], [], [], [], []
+    for _ in range(runs):
+        before = mock_backend.mock.requests
+        started = time.perf_counter()
+        first = first_byte = None
+        events = 0
+        async for event in optimize_prompt_streaming(**REQUEST, **mode):
+            events += 1
+            # 변이 출력의 첫 바이트 (토큰 스트리밍이 꺼져 있으면 첫 완성 응답)
+            if first_byte is None and event["type"] in ("llm_delta", "llm_response"):
+                first_byte = time.perf_counter() - started
+            if first is None and event["type"] == "evaluation_result":
+                first = time.perf_counter() - started
+        wall.append(time.perf_counter() - started)
+        first_output.append(first_byte if first_byte is not None else wall[-1])
+        first_result.append(first if first is not None else wall[-1])
+        calls.append(mock_backend.mock.requests - before)
+        event_counts.append(events)
+    return {
+        "wall_ms": summarize(wall, scale=1e3),
+        "first_output_ms": summarize(first_output, scale=1e3),
+        "first_result_ms": summarize(first_result, scale=1e3),
+        "llm_calls": summarize(calls, digits=2),
+        "events": summarize(event_counts, digits=2),
+    }
+
+def run(runs: int = 5, latency_ms: float = 200.0, jitter_ms: float = 50.0, tokens_per_second: float = 0.0, seed: int = 42, modes: List[str] = None) -> Dict:
+    """
+    평가 모드별 optimize_prompt_simple / optimize_prompt_streaming 벤치마크
+
+    Args:
+        runs: 모드별 반복 실행 횟수
+        latency_ms / jitter_ms: 모의 LLM 첫 토큰 지연 시간 평균/표준편차
+        tokens_per_second: 모의 LLM 토큰 생성 속도 (0이면 생성 시간 없음)
+        seed: 지연 시간 난수 시드 (커밋 간 비교 시 동일하게 유지)
+        modes: 실행할 모드 이름 목록 (기본값: 전체)
+    """
+    setup_backend()
+    import llm
+
+    mock_backend, previous = install_mock_backend(latency_ms, jitter_ms, tokens_per_second, seed)
+    # 같은 변이가 반복 실행되므로 캐시가 켜져 있으면 두 번째 실행부터 LLM 호출이 사라짐
+    if llm.response_cache is not None:
+        llm.response_cache.clear()
+
+    async def main() -> Dict:
+        results: Dict = {"config": {
+            "runs": runs,
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "tokens_per_second": tokens_per_second,
+            "seed": seed,
+            "cache_enabled": llm.response_cache is not None,
+        }}
+        for name in modes or list(MODES):
+            mode = MODES[name]
+            results[name] = {
+                "simple": await bench_simple(mode, runs, mock_backend),
+                "streaming": await bench_streaming(mode, runs, mock_backend),
+            }
+        return results
+
+    try:
+        return asyncio.run(main())
+    finally:
+        llm.set_backend(previous)
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
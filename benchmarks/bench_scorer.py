@@ -0,0 +1,84 @@
+"""
+채점기 마이크로벤치마크 - composite_score, keyword_coverage, check_forbidden_words
+
+짧은/긴 한국어·영어 출력에 대해 호출당 소요 시간(us)을 측정한다.
+"""
+
+import time
+from typing import Callable, Dict, List
+
+from common import setup_backend, summarize
+
+REFERENCE_KO = "구체적이고 실행 가능한 프로젝트 계획서로, 목표, 일정, 리소스를 포함"
+REFERENCE_EN = "A concrete, actionable project plan including goals, schedule and resources"
+KEYWORDS_KO = ["프로젝트"]
+KEYWORDS_EN = ["project"]
+FORBIDDEN_KO = ["불가능", "어려움", "절대"]
+FORBIDDEN_EN = ["impossible", "never", "difficult"]
+
+SHORT_KO = "프로젝트 계획서 초안입니다. 1. 목표 2. 일정 3. 리소스를 단계별로 정리했습니다."
+SHORT_EN = "Project plan draft. 1. Goals 2. Schedule 3. Resources, organised step by step."
+
+LONG_KO_PARAGRAPH = (
+    "1. 요약: 이번 프로젝트의 목표는 고객 만족도를 높이는 것입니다. "
+    "2. 구체적인 방법과 단계별 절차를 제시하고, 담당자와 일정을 명확히 합니다. "
+    "3. 전략적 분석과 모니터링을 통해 실행 결과를 검토하고 개선 방안을 적용합니다. "
+    "- 예시: 주간 리포트, 월간 검토 회의, 분기별 성과 평가를 진행합니다.\n"
+)
+LONG_EN_PARAGRAPH = (
+    "1. Summary: the goal of this project is to raise customer satisfaction. "
+    "2. We describe concrete methods and step-by-step procedures with clear owners and dates. "
+    "3. Strategic analysis and monitoring are used to review results and apply improvements. "
+    "- Example: weekly reports, monthly reviews and quarterly performance evaluations.\n"
+)
+
+def build_cases() -> Dict[str, Dict]:
+    """케이스 이름 -> 출력/참조/키워드/금지어"""
+    return {
+        "short_ko": {"output": SHORT_KO, "reference": REFERENCE_KO, "keywords": KEYWORDS_KO, "forbidden": FORBIDDEN_KO},
+        "short_en": {"output": SHORT_EN, "reference": REFERENCE_EN, "keywords": KEYWORDS_EN, "forbidden": FORBIDDEN_EN},
+        "long_ko": {"output": LONG_KO_PARAGRAPH * 20, "reference": REFERENCE_KO, "keywords": KEYWORDS_KO, "forbidden": FORBIDDEN_KO},
+        "long_en": {"output": LONG_EN_PARAGRAPH * 20, "reference": REFERENCE_EN, "keywords": KEYWORDS_EN, "forbidden": FORBIDDEN_EN},
+    }
+
+def time_call(func: Callable[[], object], repeat: int, number: int) -> List[float]:
+    """number번 호출을 repeat회 반복하여 호출당 평균 시간(초) 목록 반환"""
+    func()  # 워밍업 (지연 import, 정규식 컴파일 등)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+def run(repeat: int = 20, number: int = 50) -> Dict:
+    """
+    채점 함수별/케이스별 벤치마크 실행
+
+    Returns:
+        {"config": ..., "<함수>": {"<케이스>": {"n", "mean", "p50", ...}}} (단위: us)
+    """
+    setup_backend()
+    from scorer_simple import ScoringContext, check_forbidden_words, composite_score, keyword_coverage
+
+    results: Dict = {"config": {"repeat": repeat, "number": number, "unit": "us"}}
+    for case_name, case in build_cases().items():
+        output, reference = case["output"], case["reference"]
+        keywords, forbidden = case["keywords"], case["forbidden"]
+        # 요청당 한 번 만드는 컨텍스트는 측정에서 제외 (후보 출력마다의 비용만 비교)
+        context = ScoringContext(reference, keywords)
+        benchmarks = {
+            "composite_score": lambda: composite_score(output, reference, keywords),
+            "scoring_context": lambda: context.composite_score(output),
+            "keyword_coverage": lambda: keyword_coverage(output, keywords),
+            "check_forbidden_words": lambda: check_forbidden_words(output, forbidden),
+        }
+        for func_name, func in benchmarks.items():
+            samples = time_call(func, repeat, number)
+            results.setdefault(func_name, {})[case_name] = summarize(samples, scale=1e6)
+    return results
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(run(), ensure_ascii=False, indent=2))
@@ -0,0 +1,83 @@
+"""
+시작 시간 벤치마크 - 새 프로세스에서 `import main` 시간과 첫 /health 응답까지의 시간
+
+자동 확장 환경에서는 새 워커마다 이 비용을 치르므로 import 시간 예산을 두고,
+import 직후 무거운 의존성(openai, numpy)이 아직 로드되지 않았는지도 확인한다.
+(이들은 첫 사용 시 또는 시작 후 백그라운드 워밍업에서 로드됨)
+
+사용법:
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 750   # 예산 초과 시 종료 코드 1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from common import BACKEND_DIR, setup_backend, summarize
+
+# import main 시간 예산 (지연 로딩 적용 후 개발 환경에서 약 450ms, 적용 전 약 1100ms)
+IMPORT_BUDGET_MS = 750.0
+
+# import 시점에 로드되면 안 되는 모듈
+LAZY_MODULES = ("openai", "numpy")
+
+# 자식 프로세스에서 실행 - 테스트 클라이언트는 측정 대상이 아니므로 먼저 import
+CHILD_SCRIPT = """
+import json, sys, time
+from starlette.testclient import TestClient
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = [name for name in {lazy_modules!r} if name in sys.modules]
+with TestClient(main.app) as client:
+    client.get("/health").raise_for_status()
+    healthy = time.perf_counter()
+print(json.dumps({{"import": imported - started, "first_health": healthy - started, "loaded": loaded}}))
+"""
+
+def measure_once() -> Dict:
+    """새 인터프리터에서 한 번 측정 (모듈 캐시가 없는 콜드 스타트)"""
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(lazy_modules=LAZY_MODULES)],
+        cwd=BACKEND_DIR, env=os.environ.copy(), capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def run(runs: int = 10, budget_ms: float = IMPORT_BUDGET_MS) -> Dict:
+    """
+    시작 시간 벤치마크 실행
+
+    Returns:
+        {"config": ..., "import_ms": {...}, "first_health_ms": {...}, "loaded_on_import": [...], "within_budget": bool}
+    """
+    setup_backend()
+    samples: List[Dict] = [measure_once() for _ in range(runs)]
+    import_ms = summarize([sample["import"] for sample in samples], scale=1e3)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+    return {
+        "config": {"runs": runs, "budget_ms": budget_ms, "unit": "ms"},
+        "import_ms": import_ms,
+        "first_health_ms": summarize([sample["first_health"] for sample in samples], scale=1e3),
+        "loaded_on_import": loaded,
+        "within_budget": import_ms["p50"] <= budget_ms and not loaded,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AutoPromptix 시작 시간 벤치마크")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="import main p50 예산")
+    args = parser.parse_args(argv)
+
+    results = run(runs=args.runs, budget_ms=args.budget_ms)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if results["loaded_on_import"]:
+        print(f"Loaded on import: {', '.join(results['loaded_on_import'])}", file=sys.stderr)
+    if results["import_ms"]["p50"] > args.budget_ms:
+        print(f"import main p50 {results['import_ms']['p50']}ms exceeds budget {args.budget_ms}ms", file=sys.stderr)
+    return 0 if results["within_budget"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+프롬프트 접두사 안정성 검사 - 평가/분석 프롬프트의 고정 접두사가 호출 간에 바이트 단위로 동일한지 확인
+
+모의 LLM 백엔드로 서로 다른 요청 두 개를 평가 모드별로 최적화하면서 LLM 호출을 기록하고,
+- 평가(judge, judge_batch)/분석(analyze_user_input) 호출의 system 메시지가 요청과 무관하게 동일한지
+- system 메시지에 요청 내용이나 평가 대상 응답이 섞이지 않았는지
+- 한 실행 안의 평가 호출 user 메시지가 평가 정보까지 같은 접두사를 공유하는지
+- 평가 접두사가 가중치 조합별로 캐시되는지
+를 검사한다. 실패하면 종료 코드 1을 반환한다.
+
+사용법:
+    python benchmarks/check_prompt_prefix.py
+"""
+
+import asyncio
+import sys
+from typing import Dict, List, Tuple
+
+from common import setup_backend
+
+PREFIX_CALL_SITES = ("judge", "judge_batch", "analyze_user_input")
+
+REQUESTS = [
+    {
+        "user_input": "프로젝트 계획서 만들기",
+        "expected_output": "구체적이고 실행 가능한 프로젝트 계획서로, 목표, 일정, 리소스를 포함",
+        "product_name": "프로젝트",
+        "exclude_keywords": ["불가능", "어려움"],
+        "custom_mutators": ["일정과 담당자 명시"],
+    },
+    {
+        "user_input": "신제품 출시 보도자료 작성",
+        "expected_output": "언론 배포용 보도자료로 핵심 기능과 출시일을 포함",
+        "product_name": "오토프롬프틱스",
+        "exclude_keywords": ["최고"],
+        "custom_mutators": [],
+    },
+]
+
+def common_prefix_length(texts: List[str]) -> int:
+    first, last = min(texts), max(texts)
+    length = 0
+    while length < min(len(first), len(last)) and first[length] == last[length]:
+        length += 1
+    return length
+
+async def record_calls(judge_mode: str) -> List[Tuple[int, str, str, str]]:
+    """요청별 최적화를 실행하며 (요청 번호, 호출 위치, system, user) 기록"""
+    import autopromptix_efficient
+
+    calls: List[Tuple[int, str, str, str]] = []
+    original_ask_llm = autopromptix_efficient.ask_llm
+    current = {"request": 0}
+
+    async def recording_ask_llm(prompt: str, user_input: str, *args, call_site: str = "other", **kwargs):
+        calls.append((current["request"], call_site, prompt, user_input))
+        return await original_ask_llm(prompt, user_input, *args, call_site=call_site, **kwargs)
+
+    autopromptix_efficient.ask_llm = recording_ask_llm
+    try:
+        for i, request in enumerate(REQUESTS):
+            current["request"] = i
+            await autopromptix_efficient.optimize_prompt_simple(**request, judge_mode=judge_mode, prefilter_top_k=0)
+    finally:
+        autopromptix_efficient.ask_llm = original_ask_llm
+    return calls
+
+def check_calls(judge_mode: str, calls: List[Tuple[int, str, str, str]]) -> Tuple[Dict, List[str]]:
+    failures = []
+    report = {}
+    for call_site in PREFIX_CALL_SITES:
+        systems = [system for _, site, system, _ in calls if site == call_site]
+        if not systems:
+            continue
+        distinct = set(systems)
+        report[call_site] = {"calls": len(systems), "distinct_prefixes": len(distinct), "prefix_bytes": len(systems[0].encode("utf-8"))}
+        if len(distinct) != 1:
+            failures.append(f"[{judge_mode}] {call_site}: {len(distinct)} different system prompts across calls")
+        for request in REQUESTS:
+            for value in (request["user_input"], request["expected_output"], request["product_name"]):
+                if value in systems[0]:
+                    failures.append(f"[{judge_mode}] {call_site}: system prompt contains request value {value!r}")
+
+    judge_sites = ("judge", "judge_batch")
+    if not any(site in report for site in judge_sites):
+        failures.append(f"[{judge_mode}] no judge calls recorded")
+    for i, request in enumerate(REQUESTS):
+        inputs = [user for index, site, _, user in calls if index == i and site in judge_sites]
+        if len(inputs) < 2:
+            continue
+        shared = common_prefix_length(inputs)
+        report.setdefault("shared_user_prefix_bytes", []).append(len(inputs[0][:shared].encode("utf-8")))
+        if request["expected_output"] not in inputs[0][:shared]:
+            failures.append(f"[{judge_mode}] request {i}: judge user messages diverge before the evaluation context ends")
+    return report, failures
+
+def check_template_cache() -> List[str]:
+    from prompt_templates import judge_prefix
+    from autopromptix_efficient import SimpleOptimizer
+
+    optimizer = SimpleOptimizer()
+    failures = []
+    default = optimizer.build_weights({})
+    if judge_prefix(default) is not judge_prefix(optimizer.build_weights({})):
+        failures.append("judge prefix is rebuilt for the same weights")
+    if judge_prefix(default) == judge_prefix(optimizer.build_weights({"expected_output": 50})):
+        failures.append("judge prefix does not change with the weights")
+    if judge_prefix(default) == judge_prefix(default, batch=True):
+        failures.append("single and batch judge prefixes are identical")
+    return failures
+
+def main() -> int:
+    setup_backend()
+    from bench_optimizer import install_mock_backend
+    import llm
+
+    _, previous = install_mock_backend(latency_ms=0.0, jitter_ms=0.0, tokens_per_second=0.0, seed=42)
+    failures = check_template_cache()
+    try:
+        for judge_mode in ("single", "batch"):
+            report, mode_failures = check_calls(judge_mode, asyncio.run(record_calls(judge_mode)))
+            failures.extend(mode_failures)
+            print(f"{judge_mode}: {report}")
+    finally:
+        llm.set_backend(previous)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
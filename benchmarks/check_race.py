@@ -0,0 +1,86 @@
+"""
+연속 반감 레이스 검사 - 조기 종료 규칙이 첫 라운드의 잡음으로 레이스를 끝내지 않는지 확인
+
+LLM을 호출하지 않도록 변이 평가를 고정 점수로 대체하고
+- 첫 라운드 선두가 0.85를 넘어도 두 번째 라운드를 진행하는지
+- 두 라운드 이후에는 0.85 / 격차 규칙으로 종료하는지
+- 사전 필터에서만 채점된(AI 평가를 받지 못한) 변이가 로컬 점수로 평가받은 변이를 앞서지 않는지
+를 검사한다. 실패하면 종료 코드 1을 반환한다.
+
+사용법:
+    python benchmarks/check_race.py
+"""
+
+import asyncio
+import sys
+from typing import Dict, List
+
+from common import setup_backend
+
+# 변이별 입력 순서대로의 고정 점수
+SCORES = {
+    "base": [0.6, 0.6, 0.6, 0.6],
+    "leader": [0.9, 0.7, 0.7, 0.7],
+    "steady": [0.8, 0.8, 0.8, 0.8],
+    "weak": [0.3, 0.3, 0.3, 0.3],
+    "pruned": [0.95, 0.95, 0.95, 0.95],
+}
+
+# AI 평가를 받지 못하고 로컬 점수만 가진 변이
+UNJUDGED = {"pruned"}
+
+def check_should_continue() -> List[str]:
+    from autopromptix_efficient import SimpleOptimizer
+
+    optimizer = SimpleOptimizer()
+    failures = []
+    if not optimizer.should_continue(0.5, 0.9, 1, 4):
+        failures.append("round-1 leader at 0.9 stops the race")
+    if not optimizer.should_continue(0.5, 0.6, 1, 4):
+        failures.append("round-1 margin stops the race")
+    if optimizer.should_continue(0.5, 0.9, 2, 4):
+        failures.append("leader at 0.9 after two rounds does not stop the race")
+    if optimizer.should_continue(0.5, 0.6, 2, 4):
+        failures.append("margin after two rounds does not stop the race")
+    if optimizer.should_continue(0.5, 0.5, 4, 4):
+        failures.append("race continues past the last round")
+    return failures
+
+async def run_race(scores: Dict[str, List[float]]) -> List[Dict]:
+    from autopromptix_efficient import SimpleOptimizer, TrialResult
+
+    optimizer = SimpleOptimizer()
+    inputs = [f"입력 {i}" for i in range(4)]
+
+    async def evaluate_variations(variations, user_input, *args, **kwargs):
+        index = inputs.index(user_input)
+        return [
+            TrialResult(name=name, prompt=prompt, output=name, score=scores[name][index], reasoning="", judged=name not in UNJUDGED)
+            for name, prompt in variations
+        ]
+
+    optimizer.evaluate_variations = evaluate_variations
+    variations = [(name, name) for name in scores]
+    return [summary async for summary in optimizer.race_variations(variations, inputs, "", [], [])]
+
+def check_race() -> List[str]:
+    rounds = asyncio.run(run_race(SCORES))
+    failures = []
+    if len(rounds) < 2:
+        failures.append(f"race ended after {len(rounds)} round(s) with a 0.9 round-1 leader")
+    elif "steady" not in rounds[-1]["survivors"]:
+        failures.append(f"steady variant eliminated: {rounds}")
+    if rounds and "pruned" not in rounds[0]["eliminated"]:
+        failures.append(f"variant without judged trials outranks judged variants: {rounds[0]}")
+    return failures
+
+def main() -> int:
+    setup_backend()
+    failures = check_should_continue() + check_race()
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+벤치마크 공통 유틸리티 - backend 경로 설정, 통계 요약, JSON 결과 저장
+"""
+
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def setup_backend(log_level: int = logging.WARNING):
+    """
+    backend 모듈을 import할 수 있도록 경로/환경변수 설정
+
+    backend 모듈은 import 시점에 설정을 읽으므로 반드시 backend import 전에 호출해야 한다.
+    캐시는 기본적으로 끄고(같은 요청이 반복되면 측정이 무의미해짐) 모의 LLM 백엔드를 사용한다.
+    """
+    os.environ.setdefault("LLM_BACKEND", "mock")
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    # main.py의 basicConfig(INFO)보다 먼저 설정하여 요청별 로그가 측정에 섞이지 않게 함
+    logging.basicConfig(level=log_level)
+    logging.getLogger().setLevel(log_level)
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """선형 보간 백분위수 (q: 0~100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(samples: Sequence[float], scale: float = 1.0, digits: int = 3) -> Dict[str, float]:
+    """
+    샘플 목록을 요약 통계로 변환
+
+    Args:
+        samples: 측정값 (초)
+        scale: 출력 단위 변환 계수 (ms: 1e3, us: 1e6)
+        digits: 반올림 자릿수
+    """
+    values = [s * scale for s in samples]
+    if not values:
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean": round(statistics.fmean(values), digits),
+        "p50": round(percentile(values, 50), digits),
+        "p95": round(percentile(values, 95), digits),
+        "min": round(min(values), digits),
+        "max": round(max(values), digits),
+    }
+
+class Stopwatch:
+    """with 블록 경과 시간 측정 (perf_counter)"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+def git_revision() -> Dict[str, Optional[str]]:
+    """현재 커밋 해시와 작업 트리 변경 여부"""
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    commit = git("rev-parse", "--short", "HEAD")
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": commit, "dirty": bool(status) if status is not None else None}
+
+def environment_info() -> Dict:
+    return {
+        **git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def write_results(results: Dict, output: Optional[str] = None) -> Path:
+    """결과 JSON 저장 (기본 경로: benchmarks/results/<시각>-<커밋>.json)"""
+    if output:
+        path = Path(output)
+    else:
+        meta = results.get("meta", {})
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{stamp}-{meta.get('commit') or 'nogit'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+def load_results(path: str) -> Dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+def flatten_metrics(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """중첩된 결과를 'suite.case.metric' 형태의 숫자 딕셔너리로 평탄화 (meta/config 제외)"""
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        if not prefix and key == "meta":
+            continue
+        if key == "config":
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+def format_table(rows: List[List[str]]) -> str:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)) for row in rows)
@@ -0,0 +1,58 @@
+"""
+벤치마크 결과 비교 - 두 JSON 결과의 공통 지표를 나란히 출력하고 변화율을 표시
+
+사용법:
+    python benchmarks/compare.py baseline.json candidate.json [--metric p50] [--threshold 10]
+
+시간 지표(_ms, us 단위)는 증가가 회귀, 처리량 지표(throughput)는 감소가 회귀다.
+threshold(%)를 넘는 회귀가 있으면 종료 코드 1을 반환한다.
+"""
+
+import argparse
+import sys
+
+from common import flatten_metrics, format_table, load_results
+
+# 통계 종류와 관계없이 항상 비교하는 지표
+ALWAYS_COMPARED = {"throughput_rps", "throughput_sessions_per_s", "errors", "llm_calls"}
+
+def higher_is_better(name: str) -> bool:
+    return "throughput" in name
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50", help="비교할 통계 (mean, p50, p95, ...; all이면 전체)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="회귀로 판단할 변화율(%%)")
+    args = parser.parse_args(argv)
+
+    baseline_results = load_results(args.baseline)
+    candidate_results = load_results(args.candidate)
+    baseline = flatten_metrics(baseline_results)
+    candidate = flatten_metrics(candidate_results)
+
+    rows = [["metric", "baseline", "candidate", "change", ""]]
+    regressions = 0
+    for name in sorted(baseline.keys() & candidate.keys()):
+        statistic = name.rsplit(".", 1)[-1]
+        if args.metric != "all" and statistic != args.metric and statistic not in ALWAYS_COMPARED:
+            continue
+        old, new = baseline[name], candidate[name]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better(name) else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = "improved"
+        rows.append([name, f"{old:g}", f"{new:g}", f"{change:+.1f}%", flag])
+
+    print(f"baseline:  {baseline_results.get('meta', {}).get('commit')}  ({args.baseline})")
+    print(f"candidate: {candidate_results.get('meta', {}).get('commit')}  ({args.candidate})")
+    print(format_table(rows))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+벤치마크 실행기 - 선택한 스위트를 실행하고 결과를 JSON으로 저장
+
+사용법:
+    python benchmarks/run.py                       # 전체 실행
+    python benchmarks/run.py scorer optimizer      # 일부만 실행
+    python benchmarks/run.py --quick -o out.json   # 짧게 실행, 결과 경로 지정
+    python benchmarks/compare.py old.json new.json # 커밋 간 비교
+"""
+
+import argparse
+import json
+import sys
+
+from common import environment_info, write_results
+
+SUITES = ("scorer", "optimizer", "api", "startup")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AutoPromptix 벤치마크")
+    parser.add_argument("suites", nargs="*", help=f"실행할 스위트 {SUITES} (기본값: 전체)")
+    parser.add_argument("-o", "--output", help="결과 JSON 경로 (기본값: benchmarks/results/<시각>-<커밋>.json)")
+    parser.add_argument("--quick", action="store_true", help="반복 횟수를 줄여 빠르게 실행")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="모의 LLM 평균 지연 시간")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="모의 LLM 지연 시간 표준편차")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="모의 LLM 토큰 생성 속도 (0이면 즉시)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--runs", type=int, help="최적화 벤치마크 모드별 반복 횟수")
+    parser.add_argument("--requests", type=int, help="API 벤치마크 엔드포인트별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="API 벤치마크 동시 요청 수")
+    args = parser.parse_args(argv)
+
+    suites = args.suites or list(SUITES)
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+    llm_options = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "tokens_per_second": args.tokens_per_second,
+        "seed": args.seed,
+    }
+    results = {"meta": environment_info()}
+
+    if "scorer" in suites:
+        import bench_scorer
+        print("Running scorer benchmarks...", file=sys.stderr)
+        results["scorer"] = bench_scorer.run(**({"repeat": 5, "number": 10} if args.quick else {}))
+
+    if "optimizer" in suites:
+        import bench_optimizer
+        print("Running optimizer benchmarks...", file=sys.stderr)
+        runs = args.runs or (2 if args.quick else 5)
+        results["optimizer"] = bench_optimizer.run(runs=runs, **llm_options)
+
+    if "api" in suites:
+        import bench_api
+        print("Running API benchmarks...", file=sys.stderr)
+        requests = args.requests or (4 if args.quick else 16)
+        results["api"] = bench_api.run(requests=requests, concurrency=args.concurrency, **llm_options)
+
+    if "startup" in suites:
+        import bench_startup
+        print("Running startup benchmarks...", file=sys.stderr)
+        results["startup"] = bench_startup.run(runs=3 if args.quick else 10)
+
+    path = write_results(results, args.output)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"Results written to {path}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -55,13 +55,15 @@ function ChatWidget() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
         const host = window.location.host
         const websocket = new WebSocket(`${protocol}//${host}/ws/chat/${session.session_id}`)
+        // Server sends UTF-8 JSON as binary frames
+        websocket.binaryType = 'arraybuffer'
         
         websocket.onopen = () => {
           setIsConnected(true)
         }
         
         websocket.onmessage = (event) => {
-          const message = JSON.parse(event.data)
+          const message = JSON.parse(typeof event.data === 'string' ? event.data : new TextDecoder().decode(event.data))
           
           // Only add messages from the server (AI responses), not echoed user messages
           if (message.sender === 'agent') {
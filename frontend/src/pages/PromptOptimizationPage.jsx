@@ -7,7 +7,8 @@ function PromptOptimizationPage() {
     expected_output: '',
     product_name: '',
     exclude_keywords: '',
-    custom_mutators: ''
+    custom_mutators: '',
+    test_inputs: ''
   })
   
   const [evaluationWeights, setEvaluationWeights] = useState({
@@ -89,6 +90,8 @@ function PromptOptimizationPage() {
     const wsUrl = `${protocol}//${host}/ws/optimization/${sessionId}`
     console.log('Creating WebSocket with URL:', wsUrl)
     const ws = new WebSocket(wsUrl)
+    // Server sends UTF-8 JSON as binary frames
+    ws.binaryType = 'arraybuffer'
     // Store immediately so all subsequent code uses the same reference
     wsRef.current = ws
     
@@ -102,7 +105,7 @@ function PromptOptimizationPage() {
         ws.onmessage = (event) => {
       console.log('Raw WebSocket message received:', event.data)
       try {
-        const data = JSON.parse(event.data)
+        const data = JSON.parse(typeof event.data === 'string' ? event.data : new TextDecoder().decode(event.data))
         console.log(`[${new Date().toISOString()}] Parsed message:`, data)
         
         switch (data.type) {
@@ -146,6 +149,33 @@ function PromptOptimizationPage() {
           setTimeout(() => setForceUpdate(v => v + 1), 0)
           break
           
+        case 'llm_delta':
+          // 생성 중인 변이 출력에 토큰 조각을 이어 붙여 바로 보여주기 (점수 없이)
+          setResults(prev => {
+            const base = prev || {
+              best_prompt: '',
+              best_output: '',
+              best_score: null,
+              all_trials: [],
+              total_evaluations: 0,
+              generations_completed: 1,
+              best_variant: data.data.name,
+              improvement_achieved: false,
+              score_improvement: 0,
+              initial_score: 0
+            }
+            const existingTrial = base.all_trials.find(trial => trial.name === data.data.name)
+            const newTrials = existingTrial
+              ? base.all_trials.map(trial =>
+                  trial.name === data.data.name
+                    ? { ...trial, output: (trial.output || '') + data.data.delta }
+                    : trial
+                )
+              : [...base.all_trials, { name: data.data.name, prompt: '', output: data.data.delta, score: null }]
+            return { ...base, all_trials: newTrials }
+          })
+          break
+
         case 'llm_response':
           // Update status to show current progress
           setStreamingData(prev => ({
@@ -257,6 +287,18 @@ function PromptOptimizationPage() {
           })
           break
           
+        case 'race_round':
+          // 레이스 라운드 진행 상황 표시 (탈락한 변이 수 포함)
+          setStreamingData(prev => ({
+            ...prev,
+            status: {
+              message: `레이스 ${data.data.round + 1}라운드: 입력 ${data.data.inputs}개 평가, ${data.data.survivors.length}개 변이 생존`,
+              step: 'race'
+            }
+          }))
+          setTimeout(() => setForceUpdate(v => v + 1), 0)
+          break
+
         case 'final_results':
           setStreamingData(prev => ({
             ...prev,
@@ -284,6 +326,18 @@ function PromptOptimizationPage() {
           break
           
         case 'optimization_stopped':
+          // 중단 시점까지 평가가 끝난 변이 중 최고 결과 반영
+          if (data.data?.partial_results?.best_prompt) {
+            const partial = data.data.partial_results
+            setResults(prev => ({
+              ...(prev || {}),
+              best_prompt: partial.best_prompt,
+              best_output: partial.best_output,
+              best_score: partial.best_score,
+              best_variant: partial.best_variant,
+              all_trials: prev?.all_trials?.length ? prev.all_trials : partial.all_trials
+            }))
+          }
           setIsOptimizing(false)
           break
           
@@ -378,6 +432,7 @@ function PromptOptimizationPage() {
         product_name: formData.product_name,
         exclude_keywords: formData.exclude_keywords.split(',').map(w => w.trim()).filter(w => w),
         custom_mutators: formData.custom_mutators.split('\n').map(m => m.trim()).filter(m => m),
+        test_inputs: formData.test_inputs.split('\n').map(t => t.trim()).filter(t => t),
         evaluation_weights: evaluationWeights
       }
       ws.send(JSON.stringify(requestData))
@@ -404,7 +459,8 @@ function PromptOptimizationPage() {
       expected_output: example.expected_output || "",
       product_name: example.product_name,
       exclude_keywords: example.exclude_keywords.join(', '),
-      custom_mutators: example.custom_mutators
+      custom_mutators: example.custom_mutators,
+      test_inputs: ''
     })
     setResults(null)
   }
@@ -425,6 +481,7 @@ function PromptOptimizationPage() {
           "더 구체적이고 효과적인 지시사항 포함",
           "성능과 명확성을 동시에 향상"
         ]),
+        test_inputs: formData.test_inputs.split('\n').map(t => t.trim()).filter(t => t),
         evaluation_weights: evaluationWeights
       }
 
@@ -643,6 +700,20 @@ function PromptOptimizationPage() {
                   />
                 </div>
 
+                <div>
+                  <label className="block text-sm font-medium text-gray-700 mb-2">
+                    추가 테스트 입력 (선택, 한 줄에 하나)
+                  </label>
+                  <textarea
+                    name="test_inputs"
+                    value={formData.test_inputs}
+                    onChange={handleInputChange}
+                    className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+                    rows="3"
+                    placeholder="예: 신규 고객 대상 사과 메일&#10;배송 지연에 대한 사과 메일"
+                  />
+                </div>
+
                 {/* Evaluation Weights */}
                 <div className="border-t pt-4 mt-4">
                   <label className="block text-sm font-medium text-gray-700 mb-3">